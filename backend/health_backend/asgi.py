@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'health_backend.settings')
 
 application = get_asgi_application()
+
+# Load the recommendation model once per worker, before the first request.
+from tracker import recommendations  # noqa: E402
+recommendations.preload()
@@ -0,0 +1,14 @@
+"""
+URL configuration used for requests served by the ASGI application.
+
+Same routes as health_backend.urls, with tracker's native async read views in
+front (see tracker.async_views.AsyncReadRoutingMiddleware).
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include('tracker.async_urls')),
+]
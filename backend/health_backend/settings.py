@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tracker.instrumentation.PerformanceMiddleware',
+    'tracker.async_views.AsyncReadRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,6 +60,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'health_backend.urls'
 
+# Requests served through asgi.py use this URLconf, which puts the native async
+# read views in front of the regular API (see tracker.async_views).
+ASGI_URLCONF = 'health_backend.asgi_urls'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -84,9 +90,80 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Local stand-in for a read replica: a second SQLite file refreshed from the
+    # primary with `manage.py sync_replica`. Point it at a real replica in production.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+    # Local stand-ins for reading shards (see READING_SHARDS). Create their
+    # schema with `manage.py migrate --database shard_0` (and shard_1).
+    'shard_0': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.shard0.sqlite3',
+    },
+    'shard_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.shard1.sqlite3',
+    },
+}
+
+# Aliases that serve API reads (see tracker.replicas); empty keeps every read on
+# the primary. A user's reads stick to the primary for REPLICA_STICKY_SECONDS
+# after they write; that pin needs a shared cache, so replicas are unused with LocMemCache.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['tracker.sharding.ShardRouter', 'tracker.replicas.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
+# Aliases that hold per-user readings, rollups, tombstones and alerts, split by
+# user id (see tracker.sharding); empty keeps them on the primary. After changing
+# the list, move existing users with `manage.py rebalance_shards`.
+READING_SHARDS = []
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per-process; use a shared backend (e.g. Redis or Memcached) in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'health-tracker',
     }
 }
 
+# Seconds a cached dashboard summary may live before it is rebuilt (see tracker.caching)
+SUMMARY_CACHE_TIMEOUT = 300
+
+# Personalized anomaly scoring (see tracker.baselines): a reading whose largest
+# |z-score| against the user's own running baseline reaches the threshold is
+# alerted on once the baseline holds enough readings. Set a half-life in days
+# to let older readings count for less.
+READING_ANOMALY_THRESHOLD = 3.0
+READING_BASELINE_MIN_READINGS = 10
+READING_BASELINE_HALF_LIFE_DAYS = None
+
+# Upper bound in seconds on cached trend analytics; a write invalidates them sooner (see tracker.analytics)
+ANALYTICS_CACHE_TIMEOUT = 3600
+
+# Recommendations (see tracker.recommendations). Without a model artifact (.npz)
+# the built-in stand-in model is used. Requests arriving within the batch wait
+# are scored together; a request waits at most the timeout for its batch.
+RECOMMENDATION_MODEL_PATH = None
+RECOMMENDATION_BATCH_SIZE = 64
+RECOMMENDATION_BATCH_WAIT_MS = 2
+RECOMMENDATION_TIMEOUT_SECONDS = 1.0
+RECOMMENDATION_CACHE_SIZE = 10000
+RECOMMENDATION_CACHE_TTL = 3600
+RECOMMENDATION_MIN_SCORE = 0.5
+RECOMMENDATION_LIMIT = 5
+
+# Key for the pseudonymized user ids of export_dataset (see tracker.dataset);
+# falls back to SECRET_KEY. Keep it stable so exports can be joined.
+DATASET_PSEUDONYM_KEY = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -133,13 +210,45 @@ AUTH_USER_MODEL = 'tracker.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tracker.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Clients opt into the orjson renderer with Accept: application/vnd.tracker.fast+json;
+    # list 'tracker.renderers.FastJSONRenderer' first to make it the default.
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'tracker.renderers.FastJSONVendorRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Keyset pagination for reading list endpoints (see tracker.pagination)
+READING_PAGE_SIZE = 50
+READING_MAX_PAGE_SIZE = 500
+
+# Serve reading lists from .values() rows instead of ReadingSerializer instances
+READING_FAST_SERIALIZER = True
+
+# Abnormal-reading alert outbox (see tracker.alerts and the process_alerts command)
+ALERT_MAX_ATTEMPTS = 5
+ALERT_RETRY_BASE_SECONDS = 60
+ALERT_RETRY_MAX_SECONDS = 3600
+ALERT_CLAIM_LEASE_SECONDS = 300
+
+# Per-request performance instrumentation (see tracker.instrumentation).
+# Unsampled requests only feed the duration histograms.
+PERF_INSTRUMENTATION_ENABLED = True
+PERF_SAMPLE_RATE = 1.0
+
+# Seconds an authenticated user may be served from the cache (see tracker.authentication)
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Delta sync (see tracker.sync): changes per response and how long tombstones are kept
+SYNC_PAGE_SIZE = 200
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
 
 from datetime import timedelta
 
@@ -149,6 +258,14 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_REFRESH_SERIALIZER': 'tracker.serializers.TokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'tracker.serializers.TokenVerifySerializer',
 }
 
+# Refresh-token blacklist Bloom filter (see tracker/tokens.py); prune expired
+# tokens with `manage.py prune_tokens`.
+JWT_BLACKLIST_FILTER_ERROR_RATE = 0.001
+# None detects from the cache backend; the filter is skipped unless the cache is shared.
+JWT_BLACKLIST_SHARED_CACHE = None
+
 CORS_ALLOW_ALL_ORIGINS = True  # 🔓 For dev only! Use CORS_ALLOW_ORIGINS in production
\ No newline at end of file
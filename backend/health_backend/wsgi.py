@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'health_backend.settings')
 
 application = get_wsgi_application()
+
+# Load the recommendation model once per worker, before the first request.
+from tracker import recommendations  # noqa: E402
+recommendations.preload()
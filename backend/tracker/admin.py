@@ -1,7 +1,67 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
-from .models import User, Reading
+from .models import AlertRule, User, Reading
+
+# -----------------------------
+# Estimated Count Paginator
+# -----------------------------
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids an exact COUNT(*) over an unfiltered table.
+    Uses the planner's row estimate on PostgreSQL and MAX(id) elsewhere;
+    filtered changelists still get an exact count.
+    """
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return super().count
+        model = self.object_list.model
+        connection = connections[self.object_list.db]
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            else:
+                cursor.execute(
+                    f"SELECT MAX({connection.ops.quote_name(model._meta.pk.column)}) "
+                    f"FROM {connection.ops.quote_name(table)}"
+                )
+            row = cursor.fetchone()
+        estimate = row[0] if row and row[0] is not None else 0
+        if estimate <= 0:
+            return super().count
+        return estimate
+
+# -----------------------------
+# User ID Filter
+# -----------------------------
+class UserIdFilter(admin.SimpleListFilter):
+    """
+    Filter readings by ?user=<id> without listing every user in the sidebar.
+    Users are picked via the email search or the link from the user admin.
+    """
+    title = _('user')
+    parameter_name = 'user'
+
+    def lookups(self, request, model_admin):
+        user_id = self.value()
+        if user_id and user_id.isdigit():
+            user = User.objects.filter(pk=user_id).only('email').first()
+            if user:
+                return [(user_id, user.email)]
+        return []
+
+    def queryset(self, request, queryset):
+        user_id = self.value()
+        if user_id and user_id.isdigit():
+            return queryset.filter(user_id=int(user_id))
+        return queryset
 
 # -----------------------------
 # Inline Reading Admin
@@ -39,7 +99,9 @@ class UserAdmin(BaseUserAdmin):
 
     readonly_fields = ('last_login', 'date_joined')  # ✅ add date_joined here
     ordering = ('email',)
-    search_fields = ('email',)
+    search_fields = ('^email',)  # Prefix match, so the email index can be used
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     add_fieldsets = (
         (None, {
@@ -53,12 +115,18 @@ class UserAdmin(BaseUserAdmin):
 # -----------------------------
 @admin.register(Reading)
 class ReadingAdmin(admin.ModelAdmin):
-    list_display = ('user_email', 'systolic', 'diastolic', 'get_blood_pressure_category', 'glucose_level', 'glucose_unit', 'get_glucose_in_mmol_l', 'created_at')
-    list_filter = ('glucose_unit', 'created_at', 'user')
-    search_fields = ('user__email', 'notes', 'systolic', 'diastolic', 'glucose_level')
+    list_display = ('user_email', 'systolic', 'diastolic', 'bp_category', 'glucose_level', 'glucose_unit', 'get_glucose_in_mmol_l', 'created_at')
+    list_filter = ('glucose_unit', 'bp_category', 'is_abnormal', UserIdFilter)
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    search_fields = ('user__email',)
+    search_help_text = _('Exact reading ID / systolic / diastolic / glucose value, or the start of a user email.')
+    autocomplete_fields = ('user',)
     ordering = ['-created_at']
     readonly_fields = ('created_at', 'updated_at', 'get_blood_pressure_category', 'get_glucose_in_mg_dl', 'get_glucose_in_mmol_l')
     list_per_page = 25
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -82,10 +150,40 @@ class ReadingAdmin(admin.ModelAdmin):
             return qs.filter(user=request.user)
         return qs
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Numbers match ID and numeric fields exactly; anything else is an email prefix.
+        Avoids the CAST ... LIKE full scans of icontains on numeric columns.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            number = float(term)
+        except ValueError:
+            return queryset.filter(user__email__startswith=term.lower()), False
+
+        condition = Q(glucose_level=number)
+        if number.is_integer():
+            value = int(number)
+            condition |= Q(pk=value) | Q(systolic=value) | Q(diastolic=value)
+        return queryset.filter(condition), False
+
     def has_add_permission(self, request):
         return request.user.has_perm('readings.can_view_all_readings') or request.user.is_staff
 
     def has_change_permission(self, request, obj=None):
         if obj and not request.user.has_perm('readings.can_view_all_readings'):
             return obj.user == request.user
-        return super().has_change_permission(request, obj)
\ No newline at end of file
+        return super().has_change_permission(request, obj)
+
+# -----------------------------
+# Alert Rule Admin
+# -----------------------------
+@admin.register(AlertRule)
+class AlertRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'metric', 'operator', 'threshold', 'window', 'min_count', 'condition', 'user', 'is_active')
+    list_filter = ('metric', 'condition', 'is_active')
+    list_editable = ('threshold', 'is_active')
+    search_fields = ('name', 'user__email')
+    autocomplete_fields = ('user',)
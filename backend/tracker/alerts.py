@@ -0,0 +1,168 @@
+"""
+Abnormal-reading alert outbox.
+
+Writers only insert an Alert row inside their own transaction (`enqueue`). The
+process_alerts worker claims due alerts in batches, delivers a batch over a
+single mail connection and records per-alert state, retrying failures with
+exponential backoff.
+"""
+import datetime
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Alert
+from . import baselines, rules, sharding
+
+logger = logging.getLogger(__name__)
+
+ALERT_SUBJECT = 'Abnormal Health Reading Alert'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _reason(reading, reasons):
+    if reading.pk in reasons:
+        return f" ({', '.join(reasons[reading.pk])})"
+    if baselines.is_anomalous(reading):
+        return " (unusual compared with your own recent readings)"
+    return ""
+
+
+def compose_message(user, readings, reasons=None):
+    """`reasons` maps reading ids to the names of the alert rules they matched."""
+    reasons = reasons or {}
+    lines = [
+        f"- Blood Pressure: {reading.systolic}/{reading.diastolic}, "
+        f"Glucose: {reading.glucose_level} {reading.glucose_unit}"
+        + _reason(reading, reasons)
+        for reading in readings
+    ]
+    header = (
+        "An abnormal health reading was recorded:"
+        if len(readings) == 1
+        else f"{len(readings)} abnormal health readings were recorded:"
+    )
+    return (
+        f"Hi {user.get_full_name() or 'User'},\n\n"
+        f"{header}\n"
+        + "\n".join(lines)
+        + "\n\nPlease consult your doctor if necessary."
+    )
+
+
+def enqueue(user, readings):
+    """
+    Queue one alert covering every reading in `readings` that an alert rule
+    flags or that is anomalous for the user (score them with
+    baselines.apply_readings first). Call inside the transaction that writes
+    the readings, after saving them; returns the Alert or None.
+    """
+    reasons = rules.evaluate(readings)
+    abnormal = [reading for reading in readings if reading.pk in reasons or baselines.is_anomalous(reading)]
+    if not abnormal:
+        return None
+    alert = Alert.objects.create(
+        user=user,
+        recipient=user.email,
+        subject=ALERT_SUBJECT,
+        body=compose_message(user, abnormal, reasons),
+    )
+    alert.readings.add(*abnormal)
+    return alert
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def claim_batch(batch_size=100):
+    """Atomically claim up to `batch_size` due alerts for this worker and return them."""
+    now = timezone.now()
+    lease_expired = now - datetime.timedelta(seconds=_setting('ALERT_CLAIM_LEASE_SECONDS', 300))
+    token = uuid.uuid4()
+
+    due = Q(status=Alert.STATUS_PENDING, next_attempt_at__lte=now) | Q(
+        # A worker died mid-batch; its claim has lapsed.
+        status=Alert.STATUS_SENDING, claimed_at__lt=lease_expired
+    )
+    with sharding.atomic():
+        ids = list(Alert.objects.filter(due).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+        # The status re-check makes the claim safe against concurrent workers.
+        Alert.objects.filter(due, id__in=ids).update(
+            status=Alert.STATUS_SENDING, claim_token=token, claimed_at=now
+        )
+    return list(Alert.objects.filter(claim_token=token, status=Alert.STATUS_SENDING).order_by('id'))
+
+
+def _retry_delay(attempts):
+    base = _setting('ALERT_RETRY_BASE_SECONDS', 60)
+    cap = _setting('ALERT_RETRY_MAX_SECONDS', 3600)
+    return datetime.timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def deliver(alerts):
+    """Send claimed alerts over one mail connection; return (sent, failed) counts."""
+    if not alerts:
+        return 0, 0
+    max_attempts = _setting('ALERT_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Could not open mail connection: {e}")
+        connection = None
+
+    for alert in alerts:
+        alert.attempts += 1
+        try:
+            if connection is None:
+                raise ConnectionError("mail connection unavailable")
+            message = EmailMessage(
+                subject=alert.subject,
+                body=alert.body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[alert.recipient],
+                connection=connection,
+            )
+            connection.send_messages([message])
+        except Exception as e:
+            failed += 1
+            alert.last_error = str(e)
+            if alert.attempts >= max_attempts:
+                alert.status = Alert.STATUS_FAILED
+                logger.error(f"Alert {alert.pk} failed permanently after {alert.attempts} attempts: {e}")
+            else:
+                alert.status = Alert.STATUS_PENDING
+                alert.next_attempt_at = timezone.now() + _retry_delay(alert.attempts)
+        else:
+            sent += 1
+            alert.status = Alert.STATUS_SENT
+            alert.sent_at = timezone.now()
+            alert.last_error = ''
+        alert.claim_token = None
+
+    if connection is not None:
+        connection.close()
+
+    Alert.objects.bulk_update(
+        alerts, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'claim_token']
+    )
+    return sent, failed
+
+
+def process_batch(batch_size=100):
+    """Claim and deliver one batch from every shard; return (sent, failed)."""
+    sent = failed = 0
+    for alias in sharding.all_shards():
+        with sharding.on_shard(alias):
+            shard_sent, shard_failed = deliver(claim_batch(batch_size))
+        sent += shard_sent
+        failed += shard_failed
+    return sent, failed
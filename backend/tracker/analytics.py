@@ -0,0 +1,231 @@
+"""
+Per-user trend analytics computed with NumPy.
+
+`analyze` loads a user's readings in a time window as column arrays, using
+values_list rather than model instances. It computes every result with
+vectorized operations:
+- moving averages per calendar day
+- a least-squares trend slope
+- variability (SD and coefficient of variation)
+- glucose time-in-range
+- time-of-day profiles
+- the distribution of BP categories
+
+For a year of readings the computations take a few milliseconds; fetching the
+rows is most of the cost. `get_analytics` caches results under the user's data
+version, so they are recomputed only after the user's next write (or once
+ANALYTICS_CACHE_TIMEOUT passes, since the window slides).
+NumPy is optional: without it `available()` is False and the endpoint answers 503.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Reading
+from . import caching
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; analytics are unavailable without it.
+    np = None
+
+METRICS = ('systolic', 'diastolic', 'glucose_mg_dl')
+# (name, first local hour) for the time-of-day profile
+DAY_PERIODS = (('night', 0), ('morning', 6), ('afternoon', 12), ('evening', 18))
+# Consensus glucose target range in mg/dL
+GLUCOSE_TARGET_LOW = 70.0
+GLUCOSE_TARGET_HIGH = 180.0
+
+DEFAULT_DAYS = 90
+MAX_DAYS = 730
+DEFAULT_WINDOW = 7
+MAX_WINDOW = 90
+
+
+def available():
+    return np is not None
+
+
+def _num(value, digits=2):
+    """Round a numpy scalar for JSON; NaN becomes None."""
+    value = float(value)
+    return None if value != value else round(value, digits)
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+def load_columns(user, days=DEFAULT_DAYS):
+    """The user's readings from the last `days` days as a dict of arrays, oldest first."""
+    since = timezone.now() - datetime.timedelta(days=days)
+    rows = list(
+        Reading.objects.for_user(user).filter(created_at__gte=since)
+        .order_by('created_at', 'id')
+        .values_list('created_at', *METRICS, 'bp_category')
+    )
+    created, systolic, diastolic, glucose, category = zip(*rows) if rows else ((),) * 5
+    count = len(rows)
+    # Local calendar day and hour; converting here is far cheaper than
+    # TruncDate/ExtractHour, which SQLite evaluates through Python functions.
+    zone = timezone.get_current_timezone()
+    local = [value.astimezone(zone) for value in created]
+    return {
+        'timestamp': np.fromiter((value.timestamp() for value in created), dtype=np.float64, count=count),
+        'day': np.fromiter((value.toordinal() for value in local), dtype=np.int64, count=count),
+        'hour': np.fromiter((value.hour for value in local), dtype=np.int64, count=count),
+        'systolic': np.array(systolic, dtype=np.float64),
+        'diastolic': np.array(diastolic, dtype=np.float64),
+        # A missing glucose value becomes NaN.
+        'glucose_mg_dl': np.array(glucose, dtype=np.float64),
+        'bp_category': np.array(category, dtype=object),
+    }
+
+
+# -----------------------------
+# Computations
+# -----------------------------
+def variability(values):
+    """Mean, sample SD, coefficient of variation (%) and range of `values`, ignoring NaN."""
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {'mean': None, 'sd': None, 'cv_percent': None, 'min': None, 'max': None}
+    mean = values.mean()
+    sd = values.std(ddof=1) if values.size > 1 else 0.0
+    return {
+        'mean': _num(mean),
+        'sd': _num(sd),
+        'cv_percent': _num(sd / mean * 100) if mean else None,
+        'min': _num(values.min()),
+        'max': _num(values.max()),
+    }
+
+
+def trend_per_day(timestamps, values):
+    """Least-squares slope of `values` against time, in units per day (None below two readings)."""
+    keep = ~np.isnan(values)
+    x = timestamps[keep] / 86400.0
+    y = values[keep]
+    if x.size < 2:
+        return None
+    x = x - x.mean()
+    denominator = np.dot(x, x)
+    if not denominator:
+        return None
+    return _num(np.dot(x, y - y.mean()) / denominator, 4)
+
+
+def moving_averages(columns, window=DEFAULT_WINDOW):
+    """
+    Trailing `window`-day averages of each metric, one entry per day that has
+    readings. Every reading in the window carries equal weight.
+    """
+    day = columns['day']
+    if not day.size:
+        return []
+    first = day.min()
+    index = day - first
+    length = int(index.max()) + 1
+    # Cumulative per-day sums make each window sum a single subtraction.
+    lower = np.maximum(np.arange(length) + 1 - window, 0)
+    per_day = np.bincount(index, minlength=length)
+    present = per_day > 0
+
+    averages = {}
+    for metric in METRICS:
+        values = columns[metric]
+        keep = ~np.isnan(values)
+        sums = np.concatenate(([0.0], np.cumsum(np.bincount(index[keep], weights=values[keep], minlength=length))))
+        counts = np.concatenate(([0], np.cumsum(np.bincount(index[keep], minlength=length))))
+        window_counts = counts[1:] - counts[lower]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages[metric] = (sums[1:] - sums[lower]) / window_counts
+
+    return [
+        {
+            'date': datetime.date.fromordinal(int(first + offset)).isoformat(),
+            **{metric: _num(averages[metric][offset]) for metric in METRICS},
+        }
+        for offset in np.flatnonzero(present)
+    ]
+
+
+def glucose_in_range(glucose):
+    """Share of glucose readings below, inside and above the target range, in percent."""
+    glucose = glucose[~np.isnan(glucose)]
+    result = {'low_mg_dl': GLUCOSE_TARGET_LOW, 'high_mg_dl': GLUCOSE_TARGET_HIGH}
+    if not glucose.size:
+        return {**result, 'below_percent': None, 'in_range_percent': None, 'above_percent': None}
+    below = np.count_nonzero(glucose < GLUCOSE_TARGET_LOW)
+    above = np.count_nonzero(glucose > GLUCOSE_TARGET_HIGH)
+    return {
+        **result,
+        'below_percent': _num(below / glucose.size * 100),
+        'in_range_percent': _num((glucose.size - below - above) / glucose.size * 100),
+        'above_percent': _num(above / glucose.size * 100),
+    }
+
+
+def time_of_day(columns):
+    """Reading count and mean of each metric per period of the (local) day."""
+    starts = np.array([start for _, start in DAY_PERIODS])
+    period = np.searchsorted(starts, columns['hour'], side='right') - 1
+    counts = np.bincount(period, minlength=len(DAY_PERIODS))
+    means = {}
+    for metric in METRICS:
+        values = columns[metric]
+        keep = ~np.isnan(values)
+        totals = np.bincount(period[keep], weights=values[keep], minlength=len(DAY_PERIODS))
+        present = np.bincount(period[keep], minlength=len(DAY_PERIODS))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[metric] = totals / present
+    return {
+        name: {'count': int(counts[slot]), **{metric: _num(means[metric][slot]) for metric in METRICS}}
+        for slot, (name, _) in enumerate(DAY_PERIODS)
+    }
+
+
+def bp_categories(categories):
+    """Reading count per BP category, every category included."""
+    distribution = {value: 0 for value, _ in Reading.BP_CATEGORIES}
+    labels, counts = np.unique(categories.astype(str), return_counts=True)
+    distribution.update(zip(labels.tolist(), counts.tolist()))
+    return distribution
+
+
+# -----------------------------
+# Entry Points
+# -----------------------------
+def analyze(user, days=DEFAULT_DAYS, window=DEFAULT_WINDOW) -> dict:
+    """Compute the full analytics payload for `user` over the last `days` days."""
+    columns = load_columns(user, days)
+    return {
+        'days': days,
+        'window': window,
+        'count': int(columns['timestamp'].size),
+        'metrics': {
+            metric: {
+                **variability(columns[metric]),
+                'trend_per_day': trend_per_day(columns['timestamp'], columns[metric]),
+            }
+            for metric in METRICS
+        },
+        'moving_averages': moving_averages(columns, window),
+        'glucose_in_range': glucose_in_range(columns['glucose_mg_dl']),
+        'time_of_day': time_of_day(columns),
+        'bp_categories': bp_categories(columns['bp_category']),
+    }
+
+
+def _analytics_key(user_id, version, days, window):
+    return f"tracker:analytics:{user_id}:{version}:{days}:{window}"
+
+
+def get_analytics(user, days=DEFAULT_DAYS, window=DEFAULT_WINDOW) -> dict:
+    key = _analytics_key(user.pk, caching.get_user_version(user.pk), days, window)
+    result = cache.get(key)
+    if result is None:
+        result = analyze(user, days, window)
+        cache.set(key, result, timeout=getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 3600))
+    return result
@@ -0,0 +1,17 @@
+from django.urls import path, include
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+# ASGI URLconf: native async read views first, the regular API behind them.
+urlpatterns = [
+    path('v1/', include([
+        path('readings/', async_views.reading_list, name='readings-list'),
+        path('readings/recent/', async_views.recent_readings, name='readings-recent_readings'),
+        path('readings/abnormal/', async_views.abnormal_readings, name='readings-abnormal_readings'),
+        path('readings/<int:pk>/', async_views.reading_detail, name='readings-detail'),
+        path('users/', async_views.user_list, name='users-list'),
+        path('users/<int:pk>/', async_views.user_detail, name='users-detail'),
+        path('users/me/recommendations/', async_views.user_recommendations, name='users-recommendations'),
+    ])),
+] + sync_urlpatterns
@@ -0,0 +1,196 @@
+"""
+Native async implementations of the hot read endpoints.
+
+Under ASGI, AsyncReadRoutingMiddleware switches the request to
+settings.ASGI_URLCONF. That URLconf sends GET/HEAD on the readings list,
+recent, abnormal and detail routes, on the user profile and on the user's
+recommendations to the views below.
+Every other method is handed to the regular DRF viewset. The views
+authenticate with CachedJWTAuthentication.aauthenticate and read through the
+async ORM and cache, on a replica when tracker.replicas allows it. Bodies,
+pagination links and ETag/304 handling match the sync viewsets, but the
+responses are JSON only (no browsable API).
+
+Async ORM calls run in Django's sync_to_async executor, so the SQL counts in
+Server-Timing do not include them.
+"""
+import functools
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .conditional import build_validators, is_not_modified, set_validator_headers
+from .models import Reading, User
+from .pagination import ReadingCursorPagination
+from .serializers import FastReadingSerializer, ReadingSerializer, UserSerializer
+from .views import ReadingViewSet, UserViewSet
+from . import caching, recommendations, replicas, rules, sharding
+
+_authenticator = CachedJWTAuthentication()
+# The sync views' default renderer; the async views do no content negotiation.
+_renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+
+# -----------------------------
+# Routing
+# -----------------------------
+class AsyncReadRoutingMiddleware:
+    """Route requests served through the ASGI handler to settings.ASGI_URLCONF."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if urlconf:
+            request.urlconf = urlconf
+        return await self.get_response(request)
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _json(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(_renderer.render(data), status=status_code, content_type='application/json')
+
+
+def _error(exc):
+    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = _json(detail, exc.status_code)
+    if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+        response['WWW-Authenticate'] = _authenticator.authenticate_header(None)
+    return response
+
+
+def async_reads(sync_view, conditional=True):
+    """
+    Serve GET/HEAD with the decorated coroutine and everything else with `sync_view`.
+    The coroutine is called as handler(request, user, *args, **kwargs) after
+    authentication and, with `conditional`, the conditional-GET check against
+    the user's data version.
+    """
+    sync_view = sync_to_async(sync_view)
+
+    def decorator(handler):
+        @csrf_exempt
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_view(request, *args, **kwargs)
+            try:
+                result = await _authenticator.aauthenticate(request)
+                if result is None:
+                    raise NotAuthenticated()
+                request.user = user = result[0]
+                if not user.is_active:
+                    raise NotAuthenticated()
+
+                etag = last_modified = None
+                if conditional:
+                    etag, last_modified = build_validators(request, *await caching.aget_user_validators(user.pk))
+                if conditional and is_not_modified(request, etag, last_modified):
+                    response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                else:
+                    shard = await sharding.ashard_for_user(user.pk)
+                    with replicas.read_from(await replicas.achoose_read_alias(user.pk)), sharding.on_shard(shard):
+                        response = await handler(request, user, *args, **kwargs)
+            except APIException as e:
+                return _error(e)
+            if conditional:
+                set_validator_headers(response, etag, last_modified)
+            return response
+        return view
+    return decorator
+
+
+async def _reading_page(request, queryset):
+    paginator = ReadingCursorPagination()
+    drf_request = Request(request)
+    if getattr(settings, 'READING_FAST_SERIALIZER', False):
+        page = await paginator.apaginate_queryset(queryset.values(*FastReadingSerializer.values_fields), drf_request)
+        data = FastReadingSerializer.serialize(page)
+    else:
+        page = await paginator.apaginate_queryset(queryset, drf_request)
+        data = ReadingSerializer(page, many=True).data
+    return _json(paginator.get_paginated_data(data))
+
+
+# -----------------------------
+# Readings
+# -----------------------------
+reading_collection = ReadingViewSet.as_view({'get': 'list', 'post': 'create'}, basename='readings', detail=False)
+reading_member = ReadingViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+    basename='readings', detail=True
+)
+
+
+@async_reads(reading_collection)
+async def reading_list(request, user):
+    category = request.GET.get('category')
+    if category:
+        return await _reading_page(request, Reading.objects.by_category(user, category))
+    return await _reading_page(request, Reading.objects.for_user(user))
+
+
+@async_reads(ReadingViewSet.as_view({'get': 'recent_readings'}, basename='readings', detail=False))
+async def recent_readings(request, user):
+    return await _reading_page(request, Reading.objects.recent_readings(user=user))
+
+
+@async_reads(ReadingViewSet.as_view({'get': 'abnormal_readings'}, basename='readings', detail=False))
+async def abnormal_readings(request, user):
+    rule_set = await rules.aget_rule_set()
+    return await _reading_page(request, Reading.objects.abnormal_readings(user=user, rule_set=rule_set))
+
+
+@async_reads(reading_member)
+async def reading_detail(request, user, pk):
+    reading = await Reading.objects.for_user(user).filter(pk=pk).afirst()
+    if reading is None:
+        raise NotFound("No Reading matches the given query.")
+    return _json(ReadingSerializer(reading).data)
+
+
+# -----------------------------
+# Users
+# -----------------------------
+@async_reads(UserViewSet.as_view({'get': 'list', 'post': 'create'}, basename='users', detail=False))
+async def user_list(request, user):
+    users = [profile async for profile in User.objects.filter(id=user.pk)]
+    return _json(UserSerializer(users, many=True).data)
+
+
+@async_reads(UserViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+    basename='users', detail=True
+))
+async def user_detail(request, user, pk):
+    profile = await User.objects.filter(id=user.pk, pk=pk).afirst()
+    if profile is None:
+        raise NotFound("No User matches the given query.")
+    return _json(UserSerializer(profile).data)
+
+
+# Recommendations also change with the daily feature rebuild and the model, which
+# the data version does not track; like the sync view, send no validators.
+@async_reads(UserViewSet.as_view({'get': 'recommendations'}, basename='users', detail=False), conditional=False)
+async def user_recommendations(request, user):
+    # Awaiting the micro-batch here keeps concurrent requests in one predict call.
+    return _json(await recommendations.aget_recommendations(user))
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import caching
+
+
+# -----------------------------
+# Cached JWT Authentication
+# -----------------------------
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from a short-TTL cache.
+
+    Entries are keyed by user id and the user's 'auth' cache version, which is
+    bumped whenever the User is saved or deleted (password change, deactivation,
+    profile edit). They hold the user's fields except the password hash, plus
+    the digest the revoke check compares; users built from them have the
+    password deferred. The active and revoked-token checks run on every
+    request, so revocation behaves exactly as with the stock class.
+    """
+    def _cache_key(self, user_id, version=None):
+        if version is None:
+            version = caching.get_user_version(user_id, scope='auth')
+        return f"tracker:auth-entry:{user_id}:{version}"
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def _cached_fields(self):
+        return [field.attname for field in self.user_model._meta.concrete_fields if field.attname != 'password']
+
+    def _entry(self, user):
+        """What is cached for `user`: (database, field values, revoke digest)."""
+        values = [getattr(user, name) for name in self._cached_fields()]
+        return user._state.db, values, get_md5_hash_password(user.password)
+
+    def _from_entry(self, entry):
+        db, values, revoke_digest = entry
+        return self.user_model.from_db(db, self._cached_fields(), values), revoke_digest
+
+    def _timeout(self):
+        return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        key = self._cache_key(user_id)
+        entry = cache.get(key)
+        if entry is not None:
+            return self._check_user(*self._from_entry(entry), validated_token)
+        try:
+            user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        entry = self._entry(user)
+        cache.set(key, entry, timeout=self._timeout())
+        return self._check_user(user, entry[2], validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        key = self._cache_key(user_id, await caching.aget_user_version(user_id, scope='auth'))
+        entry = await cache.aget(key)
+        if entry is not None:
+            return self._check_user(*self._from_entry(entry), validated_token)
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        entry = self._entry(user)
+        await cache.aset(key, entry, timeout=self._timeout())
+        return self._check_user(user, entry[2], validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of authenticate() for the native async views. Token
+        decoding is CPU-only; the user lookup goes through the async cache and ORM.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def _check_user(self, user, revoke_digest, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revoke_digest:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,233 @@
+"""
+Per-user running baselines and personalized anomaly scores.
+
+The fixed thresholds behind Reading.is_abnormal miss readings that are
+unremarkable for the population but far off a patient's own norm. Each user
+has a ReadingBaseline row with the running weighted mean and sum of squared
+deviations (M2) of every metric. Every write updates it in O(1) with Welford's
+method, so scoring never re-scans history:
+- `apply_readings` scores new readings against the baseline, then folds them in.
+- `replace` retracts an edited reading's stored values, then rescores and adds it.
+- `discard` retracts a deleted reading.
+
+With READING_BASELINE_HALF_LIFE_DAYS set, older readings count for less: every
+weight halves once per half-life. The decay is applied lazily to the row's
+totals before each update. A reading's own weight follows from its created_at,
+so it can still be retracted exactly later.
+
+A reading's `anomaly_score` is its largest |z-score| over the metrics. Each
+metric's SD has a floor, so a very steady history does not make small changes
+look extreme. Once a baseline holds READING_BASELINE_MIN_READINGS readings,
+scores at or above READING_ANOMALY_THRESHOLD are alerted on like abnormal
+readings. Readings stored before baselines existed are folded in by the
+rebuild_baselines command.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Reading, ReadingBaseline
+from . import sharding
+
+# Smallest SD used for scoring, per metric (mmHg, mmHg, mg/dL)
+MIN_STD_DEV = {'systolic': 4.0, 'diastolic': 3.0, 'glucose': 10.0}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _values(source):
+    """Metric values of a reading, or of a dict of its BASELINE_FIELDS."""
+    if not isinstance(source, dict):
+        source = {field: getattr(source, field) for field in Reading.BASELINE_FIELDS}
+    return {
+        metric: float(source[field])
+        for metric, field in zip(ReadingBaseline.METRICS, Reading.BASELINE_FIELDS)
+    }
+
+
+def _remember(reading):
+    reading._baseline_values = {field: getattr(reading, field) for field in Reading.BASELINE_FIELDS}
+
+
+# -----------------------------
+# Welford updates
+# -----------------------------
+def _half_life_seconds():
+    days = _setting('READING_BASELINE_HALF_LIFE_DAYS', None)
+    return days * 86400 if days else None
+
+
+def _decay_to(baseline, moment):
+    """Age the baseline's weights from its reference time to `moment`."""
+    half_life = _half_life_seconds()
+    if baseline.reference_at is not None and moment <= baseline.reference_at:
+        return
+    if half_life and baseline.reference_at is not None:
+        factor = 0.5 ** ((moment - baseline.reference_at).total_seconds() / half_life)
+        baseline.weight *= factor
+        for metric in ReadingBaseline.METRICS:
+            setattr(baseline, f"{metric}_m2", getattr(baseline, f"{metric}_m2") * factor)
+    baseline.reference_at = moment
+
+
+def _weight(baseline, created_at):
+    """Current weight of a reading recorded at `created_at` (always 1 without decay)."""
+    half_life = _half_life_seconds()
+    if not half_life or created_at is None or baseline.reference_at is None:
+        return 1.0
+    return 0.5 ** (max((baseline.reference_at - created_at).total_seconds(), 0.0) / half_life)
+
+
+def _add(baseline, values, weight):
+    baseline.count += 1
+    baseline.weight += weight
+    for metric, value in values.items():
+        mean = getattr(baseline, f"{metric}_mean")
+        delta = value - mean
+        mean += delta * weight / baseline.weight
+        setattr(baseline, f"{metric}_mean", mean)
+        setattr(baseline, f"{metric}_m2", getattr(baseline, f"{metric}_m2") + weight * delta * (value - mean))
+
+
+def _remove(baseline, values, weight):
+    if baseline.count <= 0:
+        return
+    remaining = baseline.weight - weight
+    baseline.count -= 1
+    if baseline.count == 0 or remaining <= 1e-9:
+        baseline.count, baseline.weight = 0, 0.0
+        for metric in ReadingBaseline.METRICS:
+            setattr(baseline, f"{metric}_mean", 0.0)
+            setattr(baseline, f"{metric}_m2", 0.0)
+        return
+    for metric, value in values.items():
+        mean = getattr(baseline, f"{metric}_mean")
+        previous = (baseline.weight * mean - weight * value) / remaining
+        m2 = getattr(baseline, f"{metric}_m2") - weight * (value - previous) * (value - mean)
+        setattr(baseline, f"{metric}_mean", previous)
+        setattr(baseline, f"{metric}_m2", max(m2, 0.0))
+    baseline.weight = remaining
+
+
+def score(baseline, values):
+    """Largest |z-score| of `values` against `baseline`, or None while it is too small."""
+    if baseline.count < _setting('READING_BASELINE_MIN_READINGS', 10):
+        return None
+    return round(max(
+        abs(value - getattr(baseline, f"{metric}_mean")) / max(baseline.std_dev(metric) or 0.0, MIN_STD_DEV[metric])
+        for metric, value in values.items()
+    ), 2)
+
+
+def is_anomalous(reading):
+    """Whether a scored reading is far enough off its user's baseline to alert on."""
+    return reading.anomaly_score is not None and reading.anomaly_score >= _setting('READING_ANOMALY_THRESHOLD', 3.0)
+
+
+# -----------------------------
+# Write hooks
+# -----------------------------
+def _locked(user_id):
+    baseline, _ = ReadingBaseline.objects.select_for_update().get_or_create(user_id=user_id)
+    return baseline
+
+
+def apply_readings(readings):
+    """Score newly created readings against their user's baseline, then fold them in."""
+    by_user = {}
+    for reading in readings:
+        by_user.setdefault(reading.user_id, []).append(reading)
+
+    now = timezone.now()
+    for user_id, batch in by_user.items():
+        with sharding.atomic():
+            baseline = _locked(user_id)
+            _decay_to(baseline, now)
+            for reading in sorted(batch, key=lambda reading: (reading.created_at, reading.pk)):
+                values = _values(reading)
+                reading.anomaly_score = score(baseline, values)
+                _add(baseline, values, _weight(baseline, reading.created_at))
+                _remember(reading)
+            baseline.save()
+            Reading.objects.bulk_update(batch, ['anomaly_score'])
+
+
+def replace(reading):
+    """Swap an updated reading's previously stored values for its new ones and rescore it."""
+    previous = getattr(reading, '_baseline_values', None)
+    values = _values(reading)
+    if previous is None or _values(previous) == values:
+        return
+    with sharding.atomic():
+        baseline = _locked(reading.user_id)
+        _decay_to(baseline, timezone.now())
+        weight = _weight(baseline, reading.created_at)
+        _remove(baseline, _values(previous), weight)
+        reading.anomaly_score = score(baseline, values)
+        _add(baseline, values, weight)
+        baseline.save()
+        Reading.objects.filter(pk=reading.pk).update(anomaly_score=reading.anomaly_score)
+    _remember(reading)
+
+
+def discard(reading):
+    """Retract a deleted reading from its user's baseline."""
+    with sharding.atomic():
+        baseline = _locked(reading.user_id)
+        _decay_to(baseline, timezone.now())
+        _remove(baseline, _values(getattr(reading, '_baseline_values', reading)), _weight(baseline, reading.created_at))
+        baseline.save()
+
+
+# -----------------------------
+# Full rebuild
+# -----------------------------
+def rebuild(user_ids=None, batch_size=1000):
+    """
+    Recompute baselines for `user_ids` (or every user) by replaying their
+    readings in order, rescoring each against the history before it.
+    """
+    for alias in sharding.all_shards():
+        with sharding.on_shard(alias):
+            _rebuild_shard(user_ids, batch_size)
+
+
+def _rebuild_shard(user_ids, batch_size):
+    readings = Reading.objects.all()
+    baselines = ReadingBaseline.objects.all()
+    if user_ids is not None:
+        readings = readings.filter(user_id__in=user_ids)
+        baselines = baselines.filter(user_id__in=user_ids)
+    rows = (
+        readings.order_by('user_id', 'created_at', 'id')
+        .values_list('id', 'user_id', 'created_at', 'anomaly_score', *Reading.BASELINE_FIELDS)
+        .iterator(chunk_size=batch_size)
+    )
+
+    now = timezone.now()
+    with sharding.atomic():
+        baselines.delete()
+        baseline, scored, finished = None, [], []
+        for pk, user_id, created_at, stored_score, *stored in rows:
+            if baseline is None or baseline.user_id != user_id:
+                if baseline is not None:
+                    _decay_to(baseline, now)
+                    finished.append(baseline)
+                baseline = ReadingBaseline(user_id=user_id)
+            values = _values(dict(zip(Reading.BASELINE_FIELDS, stored)))
+            # Replay in time order: each reading has weight 1 when it is recorded.
+            _decay_to(baseline, created_at)
+            anomaly_score = score(baseline, values)
+            if anomaly_score != stored_score:
+                # bulk_update skips auto_now; delta sync and exports pick rows up by updated_at.
+                scored.append(Reading(pk=pk, anomaly_score=anomaly_score, updated_at=now))
+            _add(baseline, values, 1.0)
+            if len(scored) >= batch_size:
+                Reading.objects.bulk_update(scored, ['anomaly_score', 'updated_at'])
+                scored = []
+        if baseline is not None:
+            _decay_to(baseline, now)
+            finished.append(baseline)
+        Reading.objects.bulk_update(scored, ['anomaly_score', 'updated_at'], batch_size=batch_size)
+        ReadingBaseline.objects.bulk_create(finished, batch_size=batch_size)
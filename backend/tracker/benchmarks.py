@@ -0,0 +1,112 @@
+"""
+Micro-benchmarks for the tracker hot paths.
+
+Each size runs against a freshly generated synthetic population in a throwaway
+test database and records wall-clock timings and SQL query counts, so results
+from different branches can be compared as JSON.
+"""
+import platform
+import statistics
+import time
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Reading
+from .serializers import FastReadingSerializer, ReadingSerializer
+from . import analytics, synthetic
+
+
+def _timed(fn, repeat, setup=None):
+    timings, queries = [], 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = len(captured.captured_queries)
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': queries,
+    }
+
+
+def _benchmarks(user, client):
+    readings = Reading.objects.filter(user=user).order_by('-created_at', 'id')
+    counter = iter(range(10 ** 9))
+
+    def register_setup():
+        # The registration endpoint is throttled per IP through the cache.
+        cache.clear()
+
+    def register():
+        email = f"bench-{next(counter)}@example.com"
+        client.post(reverse('register'), {
+            'email': email, 'first_name': 'Bench', 'last_name': 'User',
+            'password': 'bench-Pass-123', 'password2': 'bench-Pass-123',
+        }, format='json')
+
+    def create_reading():
+        client.post(reverse('readings-list'), {
+            'user': user.pk, 'systolic': 150, 'diastolic': 95, 'glucose_level': 120.0,
+        }, format='json')
+
+    cases = [
+        ('manager.recent_readings', lambda: list(Reading.objects.recent_readings(user)), None),
+        ('manager.abnormal_readings', lambda: list(Reading.objects.abnormal_readings(user)), None),
+        ('serializer.reading_list', lambda: ReadingSerializer(list(readings), many=True).data, None),
+        ('serializer.fast_reading_list', lambda: FastReadingSerializer.serialize(
+            readings.values(*FastReadingSerializer.values_fields)), None),
+        ('api.readings_list', lambda: client.get(reverse('readings-list')), None),
+        ('api.readings_recent', lambda: client.get(reverse('readings-recent_readings')), None),
+        ('api.readings_abnormal', lambda: client.get(reverse('readings-abnormal_readings')), None),
+        ('api.reading_create', create_reading, None),
+        ('api.register', register, register_setup),
+    ]
+    if analytics.available():
+        cases.append(('analytics.analyze_year', lambda: analytics.analyze(user, days=365), None))
+    return cases
+
+
+def run(sizes=(10, 100, 1000), users=5, repeat=5, seed=0, only=None):
+    """Run every benchmark at each readings-per-user size and return a JSON-ready dict."""
+    results = []
+    for size in sizes:
+        # Earlier sizes stay in the table; every query measured here is scoped to one user.
+        people = synthetic.generate(users=users, readings_per_user=size, seed=seed, email_prefix=f"bench{size}")
+        user = people[0]
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        for name, fn, setup in _benchmarks(user, client):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            cache.clear()
+            results.append({'name': name, 'readings_per_user': size, 'users': users, **_timed(fn, repeat, setup)})
+
+    return {
+        'meta': {
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'seed': seed,
+            'sizes': list(sizes),
+            'users': users,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
@@ -0,0 +1,111 @@
+"""
+Per-user cache helpers.
+
+Every user has a version counter in the cache that is bumped whenever their
+profile or readings change. Cached per-user objects embed that version in their
+key, so a bump invalidates all of them at once without knowing their keys, and
+stale entries simply age out.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reading
+from .serializers import ReadingSerializer
+
+
+def _version_key(user_id, scope='data'):
+    return f"tracker:user-{scope}-version:{user_id}"
+
+
+def _modified_key(user_id):
+    return f"tracker:user-modified:{user_id}"
+
+
+def get_user_version(user_id, scope='data') -> int:
+    key = _version_key(user_id, scope)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_user_validators(user_id):
+    """Return (version, last_modified_timestamp) for a user; the timestamp may be None."""
+    values = cache.get_many([_version_key(user_id), _modified_key(user_id)])
+    version = values.get(_version_key(user_id))
+    if version is None:
+        version = get_user_version(user_id)
+    return version, values.get(_modified_key(user_id))
+
+
+async def aget_user_version(user_id, scope='data') -> int:
+    key = _version_key(user_id, scope)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_user_validators(user_id):
+    """Async counterpart of get_user_validators for the native async views."""
+    values = await cache.aget_many([_version_key(user_id), _modified_key(user_id)])
+    version = values.get(_version_key(user_id))
+    if version is None:
+        version = await aget_user_version(user_id)
+    return version, values.get(_modified_key(user_id))
+
+
+def _bump_user_version(user_id, scope='data'):
+    key = _version_key(user_id, scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+    if scope == 'data':
+        cache.set(_modified_key(user_id), time.time(), timeout=None)
+
+
+def invalidate_user(user_id, scope='data'):
+    """
+    Bump a user's version for `scope`: 'data' covers readings and profile
+    (summary, ETags); 'auth' covers the cached authentication user.
+    """
+    _bump_user_version(user_id, scope)
+    # Bump again after commit: a reader that cached the pre-commit state in
+    # between must not keep serving it.
+    transaction.on_commit(lambda: _bump_user_version(user_id, scope))
+
+
+# -----------------------------
+# Dashboard Summary
+# -----------------------------
+def _summary_key(user_id, version):
+    return f"tracker:summary:{user_id}:{version}"
+
+
+def build_summary(user) -> dict:
+    recent = list(Reading.objects.recent_readings(user).order_by('-created_at', 'id'))
+    latest = recent[0] if recent else Reading.objects.for_user(user).order_by('-created_at', 'id').first()
+    return {
+        'latest_reading': ReadingSerializer(latest).data if latest else None,
+        'recent_readings': ReadingSerializer(recent, many=True).data,
+        'abnormal_count': Reading.objects.abnormal_readings(user).count(),
+        'bmi': user.calculate_bmi(),
+        'generated_at': timezone.now(),
+    }
+
+
+def get_summary(user) -> dict:
+    key = _summary_key(user.pk, get_user_version(user.pk))
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_summary(user)
+        cache.set(key, summary, timeout=getattr(settings, 'SUMMARY_CACHE_TIMEOUT', 300))
+    return summary
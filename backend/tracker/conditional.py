@@ -0,0 +1,91 @@
+"""
+Conditional GET support (ETag / Last-Modified) for per-user API resources.
+
+Validators come from the per-user version counter in tracker.caching, which is
+bumped on every write, so a matching request is answered with 304 before the
+queryset or serializer is touched.
+"""
+import hashlib
+import time
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import caching
+
+
+class NotModified(Exception):
+    pass
+
+
+def build_validators(request, version, modified):
+    """Return (etag, last_modified) for `request` from a user's cache validators."""
+    digest = hashlib.md5(
+        f"{request.user.pk}:{version}:{request.get_full_path()}:{request.META.get('HTTP_ACCEPT', '')}".encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    # HTTP dates have one-second resolution: only advertise Last-Modified once
+    # its second has passed, so a later write in the same second can't hide.
+    last_modified = None
+    if modified is not None and time.time() - modified >= 1:
+        last_modified = int(modified)
+    return quote_etag(digest), last_modified
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return etag in candidates or '*' in candidates
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return (
+        if_modified_since is not None and last_modified is not None
+        and last_modified <= if_modified_since
+    )
+
+
+def set_validator_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin that answers GETs for `conditional_actions` with 304 Not Modified
+    when the client's If-None-Match / If-Modified-Since still matches.
+    """
+    conditional_actions = ()
+
+    def get_conditional_validators(self, request):
+        version, modified = caching.get_user_validators(request.user.pk)
+        return build_validators(request, version, modified)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional_validators = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            etag, last_modified = self.get_conditional_validators(request)
+            self._conditional_validators = (etag, last_modified)
+            if is_not_modified(request, etag, last_modified):
+                raise NotModified()
+
+    def _set_validator_headers(self, response):
+        set_validator_headers(response, *self._conditional_validators)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            self._set_validator_headers(response)
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, '_conditional_validators', None) and response.status_code == status.HTTP_200_OK:
+            self._set_validator_headers(response)
+        return response
@@ -0,0 +1,327 @@
+"""
+Columnar export of the readings history for model training.
+
+`export` writes Reading rows, joined with selected User attributes, to
+compressed Parquet (or Arrow IPC) files:
+- Each shard's id space is cut into ranges of `range_size` ids, and each range
+  becomes one part file. A range is read with keyset queries of `chunk_size`
+  rows, and every chunk is written as its own row group (record batch). Memory
+  stays bounded by one chunk per worker, however large the table is.
+- Ranges are disjoint, so with `workers` > 1 they are exported on a process pool.
+- Readings may live on shards, so there is no SQL join. User attributes are
+  fetched from the primary for each chunk's users. Only USER_FIELDS can be
+  selected. With `pseudonym_key` the user id is replaced by a keyed HMAC
+  (`user_key`); it stays the same across exports made with the same key.
+- Every run covers readings updated up to its watermark, a little before it
+  started. An incremental run exports only the readings created or changed
+  since the previous watermark, plus the ids of readings deleted since then
+  (from their tombstones, so run it more often than SYNC_TOMBSTONE_RETENTION_DAYS).
+  Each run writes a directory of parts and a manifest. `_watermark.json` moves
+  forward only after every part is written.
+
+Reading ids are unique per shard, so rows are identified by (shard, id); a
+reading exported again by a later run replaces the earlier copy. When a user
+moves shards their readings get new ids, and the deletions name the old shard.
+pyarrow is optional; without it `available()` is False and nothing can be exported.
+"""
+import datetime
+import hashlib
+import hmac
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Reading, ReadingTombstone, User
+from . import sharding
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; columnar exports are unavailable without it.
+    pa = pq = None
+
+FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}  # format -> file extension
+COMPRESSIONS = {
+    'parquet': ('zstd', 'lz4', 'snappy', 'gzip', 'none'),
+    'arrow': ('zstd', 'lz4', 'none'),
+}
+READING_FIELDS = (
+    'id', 'created_at', 'updated_at', 'systolic', 'diastolic', 'glucose_level', 'glucose_unit',
+    'glucose_mg_dl', 'bp_category', 'is_abnormal', 'anomaly_score',
+)
+# Profile attributes that may be exported next to readings (never names or contact details)
+USER_FIELDS = ('age', 'weight', 'height', 'has_diabetes', 'has_hypertension', 'date_joined')
+DEFAULT_USER_FIELDS = ('age', 'has_diabetes', 'has_hypertension')
+COLUMN_TYPES = {
+    'id': 'int64', 'created_at': 'timestamp', 'updated_at': 'timestamp', 'systolic': 'int32',
+    'diastolic': 'int32', 'glucose_level': 'float64', 'glucose_unit': 'string', 'glucose_mg_dl': 'float64',
+    'bp_category': 'string', 'is_abnormal': 'bool_', 'anomaly_score': 'float64',
+    'age': 'int32', 'weight': 'float64', 'height': 'float64', 'has_diabetes': 'bool_',
+    'has_hypertension': 'bool_', 'date_joined': 'timestamp',
+}
+WATERMARK_FILE = '_watermark.json'
+MANIFEST_FILE = '_manifest.json'
+# Rows stamped this long before a run starts but committed after it are picked up by the next run.
+WATERMARK_LAG = datetime.timedelta(minutes=5)
+# Users whose attributes are kept between chunks of one part
+USER_CACHE_SIZE = 100_000
+USER_QUERY_SIZE = 1000
+
+
+def available():
+    return pa is not None
+
+
+def pseudonym(user_id, key) -> int:
+    """Stable signed 64-bit stand-in for `user_id` under `key`."""
+    digest = hmac.new(key.encode(), str(user_id).encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+def _arrow_type(kind):
+    if kind == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    return getattr(pa, kind)()
+
+
+def _user_column(pseudonymized):
+    return 'user_key' if pseudonymized else 'user_id'
+
+
+def reading_schema(user_fields=DEFAULT_USER_FIELDS, pseudonymized=False):
+    return pa.schema(
+        [pa.field('shard', pa.string(), nullable=False),
+         pa.field(_user_column(pseudonymized), pa.int64(), nullable=False)]
+        + [pa.field(name, _arrow_type(COLUMN_TYPES[name])) for name in (*READING_FIELDS, *user_fields)]
+    )
+
+
+def deletion_schema(pseudonymized=False):
+    return pa.schema([
+        pa.field('shard', pa.string(), nullable=False),
+        pa.field(_user_column(pseudonymized), pa.int64(), nullable=False),
+        pa.field('id', pa.int64(), nullable=False),
+        pa.field('deleted_at', _arrow_type('timestamp')),
+    ])
+
+
+# -----------------------------
+# Planning
+# -----------------------------
+def _readings(alias, since, until):
+    readings = Reading.objects.using(alias).filter(updated_at__lte=until)
+    if since is not None:
+        readings = readings.filter(updated_at__gt=since)
+    return readings
+
+
+def plan_ranges(until, since=None, range_size=1_000_000):
+    """[(alias, first id, end id)] of disjoint id ranges covering the readings to export."""
+    ranges = []
+    for alias in sharding.all_shards():
+        bounds = _readings(alias, since, until).aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            continue
+        for start in range(bounds['low'], bounds['high'] + 1, range_size):
+            ranges.append((alias, start, min(start + range_size, bounds['high'] + 1)))
+    return ranges
+
+
+def read_watermark(directory):
+    """The watermark of the last completed run into `directory`, or None."""
+    try:
+        with open(os.path.join(directory, WATERMARK_FILE)) as handle:
+            return datetime.datetime.fromisoformat(json.load(handle)['until'])
+    except FileNotFoundError:
+        return None
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+class _UserAttributes:
+    """Selected profile attributes by user id, fetched a chunk's users at a time."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._rows = {}
+
+    def get_many(self, user_ids):
+        if not self.fields:
+            return self._rows
+        missing = [user_id for user_id in user_ids if user_id not in self._rows]
+        if len(self._rows) + len(missing) > USER_CACHE_SIZE:
+            self._rows.clear()
+            missing = list(user_ids)
+        for start in range(0, len(missing), USER_QUERY_SIZE):
+            users = User.objects.filter(id__in=missing[start:start + USER_QUERY_SIZE])
+            self._rows.update((row[0], row[1:]) for row in users.values_list('id', *self.fields))
+        return self._rows
+
+
+class _PartWriter:
+    """Write record batches to `path` via a temporary file renamed into place on close."""
+
+    def __init__(self, path, schema, file_format, compression):
+        self.path, self.schema = path, schema
+        self._temporary = f"{path}.tmp"
+        if file_format == 'parquet':
+            self._writer = pq.ParquetWriter(self._temporary, schema, compression=compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=None if compression == 'none' else compression)
+            self._writer = pa.ipc.new_file(self._temporary, schema, options=options)
+        self.rows = 0
+
+    def write(self, columns):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        if isinstance(self._writer, pa.ipc.RecordBatchFileWriter):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(pa.Table.from_batches([batch], schema=self.schema))
+        self.rows += batch.num_rows
+
+    def close(self, keep=True):
+        self._writer.close()
+        if keep and self.rows:
+            os.replace(self._temporary, self.path)
+        else:
+            os.remove(self._temporary)
+
+
+def _user_ids(user_ids, key):
+    return [pseudonym(user_id, key) for user_id in user_ids] if key else list(user_ids)
+
+
+def export_range(job, alias, start, end):
+    """Write readings with ids in [start, end) on `alias` to one part; return (file name, rows)."""
+    schema = reading_schema(job['user_fields'], bool(job['pseudonym_key']))
+    name = f"part-{alias}-{start:012d}.{FORMATS[job['format']]}"
+    writer = _PartWriter(os.path.join(job['run_directory'], name), schema, job['format'], job['compression'])
+    users = _UserAttributes(job['user_fields'])
+    readings = (
+        _readings(alias, job['since'], job['until'])
+        .filter(id__lt=end).order_by('id').values_list('user_id', *READING_FIELDS)
+    )
+    last = start - 1
+    try:
+        while True:
+            rows = list(readings.filter(id__gt=last)[:job['chunk_size']])
+            if not rows:
+                break
+            last = rows[-1][1]
+            columns = list(zip(*rows))
+            profiles = users.get_many(set(columns[0]))
+            missing = (None,) * len(users.fields)
+            attributes = list(zip(*(profiles.get(user_id, missing) for user_id in columns[0])))
+            writer.write([
+                [alias] * len(rows), _user_ids(columns[0], job['pseudonym_key']), *columns[1:],
+                *attributes,
+            ])
+    except BaseException:
+        writer.close(keep=False)
+        raise
+    writer.close()
+    return (name if writer.rows else None), writer.rows
+
+
+def _export_range(task):
+    return export_range(*task)
+
+
+def _export_deletions(job, alias):
+    """Write the readings deleted on `alias` since the previous watermark; return (file name, rows)."""
+    name = f"deleted-{alias}.{FORMATS[job['format']]}"
+    schema = deletion_schema(bool(job['pseudonym_key']))
+    writer = _PartWriter(os.path.join(job['run_directory'], name), schema, job['format'], job['compression'])
+    tombstones = (
+        ReadingTombstone.objects.using(alias)
+        .filter(deleted_at__gt=job['since'], deleted_at__lte=job['until'])
+        .order_by('id').values_list('shard', 'user_id', 'reading_id', 'deleted_at')
+    )
+    batch = []
+    for row in tombstones.iterator(chunk_size=job['chunk_size']):
+        batch.append(row)
+        if len(batch) >= job['chunk_size']:
+            writer.write(_deletion_columns(alias, batch, job['pseudonym_key']))
+            batch = []
+    if batch:
+        writer.write(_deletion_columns(alias, batch, job['pseudonym_key']))
+    writer.close()
+    return (name if writer.rows else None), writer.rows
+
+
+def _deletion_columns(alias, rows, key):
+    # Tombstones of moved users name the shard that held the old id.
+    shards, user_ids, reading_ids, deleted_at = zip(*rows)
+    return [[shard or alias for shard in shards], _user_ids(user_ids, key), reading_ids, deleted_at]
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+# -----------------------------
+# Entry Point
+# -----------------------------
+def export(directory, file_format='parquet', compression='zstd', user_fields=DEFAULT_USER_FIELDS,
+           pseudonym_key=None, incremental=False, workers=1, range_size=1_000_000, chunk_size=50_000):
+    """
+    Export readings into a new run directory under `directory` and advance its
+    watermark; return the run's manifest. With `incremental`, only readings
+    changed since the last run are exported (everything on the first run).
+    """
+    unknown = set(user_fields) - set(USER_FIELDS)
+    if unknown:
+        raise ValueError(f"Cannot export user fields: {', '.join(sorted(unknown))}.")
+    if compression not in COMPRESSIONS[file_format]:
+        raise ValueError(f"{file_format} files support {', '.join(COMPRESSIONS[file_format])} compression.")
+    since = read_watermark(directory) if incremental else None
+    until = timezone.now() - WATERMARK_LAG
+    kind = 'incremental' if since is not None else 'full'
+    run_directory = os.path.join(directory, f"{kind}-{until:%Y%m%dT%H%M%S.%f}Z")
+    os.makedirs(run_directory, exist_ok=True)
+
+    job = {
+        'run_directory': run_directory, 'format': file_format, 'compression': compression,
+        'user_fields': tuple(user_fields), 'pseudonym_key': pseudonym_key,
+        'since': since, 'until': until, 'chunk_size': chunk_size,
+    }
+    tasks = [(job, *task) for task in plan_ranges(until, since, range_size)]
+    if workers <= 1 or len(tasks) <= 1:
+        parts = list(map(_export_range, tasks))
+    else:
+        # Forked workers must open their own connections rather than share ours.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            parts = list(pool.map(_export_range, tasks))
+    deletions = [_export_deletions(job, alias) for alias in sharding.all_shards()] if since is not None else []
+
+    manifest = {
+        'kind': kind,
+        'since': since.isoformat() if since else None,
+        'until': until.isoformat(),
+        'format': file_format,
+        'compression': compression,
+        'columns': reading_schema(user_fields, bool(pseudonym_key)).names,
+        'pseudonymized': bool(pseudonym_key),
+        'parts': [{'file': name, 'rows': rows} for name, rows in parts if name],
+        'deletions': [{'file': name, 'rows': rows} for name, rows in deletions if name],
+        'rows': sum(rows for _, rows in parts),
+    }
+    with open(os.path.join(run_directory, MANIFEST_FILE), 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+    watermark = os.path.join(directory, WATERMARK_FILE)
+    with open(f"{watermark}.tmp", 'w') as handle:
+        json.dump({'until': until.isoformat(), 'run': os.path.basename(run_directory)}, handle)
+    os.replace(f"{watermark}.tmp", watermark)
+    manifest['directory'] = run_directory
+    return manifest
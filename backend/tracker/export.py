@@ -0,0 +1,92 @@
+"""
+Constant-memory streaming export of a user's readings.
+
+Rows are read with values_list().iterator() so no model instances or serializers
+are built, and are emitted in small text chunks as the cursor advances.
+"""
+import csv
+import json
+
+from .models import Reading
+
+EXPORT_FIELDS = (
+    'id', 'created_at', 'systolic', 'diastolic', 'glucose_level', 'glucose_unit',
+    'glucose_mg_dl', 'bp_category', 'is_abnormal', 'notes',
+)
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+
+class Echo:
+    """File-like object whose write() returns the value, for use with csv.writer."""
+    def write(self, value):
+        return value
+
+
+def export_rows(user, chunk_size=CHUNK_SIZE):
+    return (
+        Reading.objects.for_user(user)
+        .order_by('-created_at', 'id')
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _batched(lines):
+    """Group lines into UTF-8 encoded chunks so each write carries many rows."""
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def stream_csv(user):
+    writer = csv.writer(Echo())
+    created_at = EXPORT_FIELDS.index('created_at')
+
+    def lines():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in export_rows(user):
+            row = list(row)
+            row[created_at] = row[created_at].isoformat()
+            yield writer.writerow(row)
+
+    return _batched(lines())
+
+
+def stream_ndjson(user):
+    def lines():
+        for row in export_rows(user):
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['created_at'] = record['created_at'].isoformat()
+            yield json.dumps(record) + '\n'
+
+    return _batched(lines())
+
+
+def accepts_gzip(header):
+    """
+    Whether an Accept-Encoding header allows gzip. q-values are honoured, so
+    "gzip;q=0" refuses it; a "*" entry covers gzip when it isn't listed.
+    """
+    wildcard = False
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding in ('gzip', 'x-gzip'):
+            return quality > 0
+        if coding == '*':
+            wildcard = quality > 0
+    return wildcard
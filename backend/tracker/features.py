@@ -0,0 +1,237 @@
+"""
+Per-user feature store for the ML models.
+
+Every user has one UserFeatures row holding a fixed-width vector of
+FEATURE_NAMES. The rolling averages, variability and reading frequency are
+derived from the user's day rollups over the last 30 local days (at most 30
+rows); BMI, age and the condition flags come from the profile. Raw readings
+are never scanned:
+- `refresh_users` recomputes the vectors of a few users. The signal handlers
+  call it after a reading write (once the rollups are updated) and after a
+  profile change; the bulk endpoint and synthetic data call it per batch.
+- `rebuild` recomputes everyone in chunks of users, spread over a process pool
+  when `workers` > 1. Run it daily (rebuild_features) so the windows move on
+  for users without new readings.
+- `read_buffer` and `read_matrix` return the vectors of thousands of users as
+  one contiguous float64 buffer, for training-set assembly and batch scoring.
+- `get_features` is the online lookup for one user. It recomputes a vector
+  that was built on an earlier day or with an older FEATURE_VERSION.
+
+Bump FEATURE_VERSION whenever FEATURE_NAMES or their definitions change; rows
+of other versions count as missing until they are rebuilt.
+"""
+import datetime
+import math
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from .models import ReadingRollup, User, UserFeatures
+from . import sharding
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; read_buffer works without it.
+    np = None
+
+FEATURE_VERSION = 1
+FEATURE_NAMES = (
+    'systolic_mean_7d', 'diastolic_mean_7d', 'glucose_mean_7d',
+    'systolic_mean_30d', 'diastolic_mean_30d', 'glucose_mean_30d',
+    'systolic_sd_30d', 'diastolic_sd_30d', 'glucose_sd_30d',
+    'readings_per_day_30d', 'active_days_30d',
+    'bmi', 'age', 'has_diabetes', 'has_hypertension',
+)
+WIDTH = len(FEATURE_NAMES)
+SHORT_WINDOW_DAYS = 7
+LONG_WINDOW_DAYS = 30
+# Profile fields the vector depends on; saves touching none of them skip the refresh.
+PROFILE_FIELDS = frozenset({'age', 'weight', 'height', 'has_diabetes', 'has_hypertension'})
+
+_ROW = struct.Struct(f"<{WIDTH}d")
+MISSING = _ROW.pack(*[math.nan] * WIDTH)
+_ROLLUP_COLUMNS = ('user_id', 'period_start', 'count') + tuple(
+    f"{metric}_{stat}" for metric in ReadingRollup.METRICS for stat in ('sum', 'sum_sq')
+)
+
+
+def available():
+    return np is not None
+
+
+def pack(values) -> bytes:
+    return _ROW.pack(*values)
+
+
+def unpack(vector) -> tuple:
+    return _ROW.unpack(bytes(vector))
+
+
+def as_dict(features) -> dict:
+    """A UserFeatures vector keyed by feature name, NaN as None."""
+    return {
+        name: None if math.isnan(value) else value
+        for name, value in zip(FEATURE_NAMES, unpack(features.vector))
+    }
+
+
+# -----------------------------
+# Computation
+# -----------------------------
+def _day_rollups(user_ids, today):
+    """{user id: [(period_start, count, sums...)]} of the users' day rollups in the long window."""
+    since = today - datetime.timedelta(days=LONG_WINDOW_DAYS - 1)
+    by_alias = {}
+    for user_id in user_ids:
+        by_alias.setdefault(sharding.shard_for_user(user_id) or DEFAULT_DB_ALIAS, []).append(user_id)
+
+    days = {}
+    for alias, ids in by_alias.items():
+        rows = ReadingRollup.objects.using(alias).filter(
+            user_id__in=ids, bucket=ReadingRollup.BUCKET_DAY, period_start__range=(since, today)
+        ).values_list(*_ROLLUP_COLUMNS)
+        for user_id, *row in rows:
+            days.setdefault(user_id, []).append(row)
+    return days
+
+
+def _window(days, since):
+    """(reading count, active days, {metric: (mean, SD)}) over the day rows from `since` on."""
+    rows = [row for row in days if row[0] >= since]
+    count = sum(row[1] for row in rows)
+    stats = {}
+    for index, metric in enumerate(ReadingRollup.METRICS):
+        if not count:
+            stats[metric] = (math.nan, math.nan)
+            continue
+        mean = sum(row[2 + 2 * index] for row in rows) / count
+        squares = sum(row[3 + 2 * index] for row in rows) / count
+        stats[metric] = (mean, math.sqrt(max(squares - mean * mean, 0.0)))
+    return count, len(rows), stats
+
+
+def compute(user, days, today) -> tuple:
+    """The feature values of `user` in FEATURE_NAMES order, from their day rollup rows."""
+    _, _, short = _window(days, today - datetime.timedelta(days=SHORT_WINDOW_DAYS - 1))
+    count, active, long = _window(days, today - datetime.timedelta(days=LONG_WINDOW_DAYS - 1))
+    bmi = user.calculate_bmi()
+    return (
+        *(short[metric][0] for metric in ReadingRollup.METRICS),
+        *(long[metric][0] for metric in ReadingRollup.METRICS),
+        *(long[metric][1] for metric in ReadingRollup.METRICS),
+        count / LONG_WINDOW_DAYS,
+        float(active),
+        math.nan if bmi is None else bmi,
+        math.nan if user.age is None else float(user.age),
+        float(user.has_diabetes),
+        float(user.has_hypertension),
+    )
+
+
+# -----------------------------
+# Updates
+# -----------------------------
+def refresh_users(users):
+    """Recompute and store the feature vectors of `users` (User instances); return the rows."""
+    users = list(users)
+    if not users:
+        return []
+    today = timezone.localdate()
+    days = _day_rollups([user.pk for user in users], today)
+    revision = time.time_ns()
+    rows = [
+        UserFeatures(
+            user_id=user.pk,
+            version=FEATURE_VERSION,
+            revision=revision,
+            vector=pack(compute(user, days.get(user.pk, ()), today)),
+            computed_on=today,
+        )
+        for user in users
+    ]
+    UserFeatures.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['user'],
+        update_fields=['version', 'revision', 'vector', 'computed_on', 'updated_at'],
+    )
+    return rows
+
+
+def _rebuild_chunk(user_ids):
+    users = User.objects.filter(id__in=user_ids).only('id', *PROFILE_FIELDS)
+    return len(refresh_users(users))
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def iter_rebuild(user_ids=None, workers=1, chunk_size=500):
+    """
+    Recompute the vectors of `user_ids` (or every user) in chunks of
+    `chunk_size` users, on `workers` processes; yield each chunk's user count.
+    """
+    if user_ids is None:
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        yield from map(_rebuild_chunk, chunks)
+        return
+    # Forked workers must open their own connections rather than share ours.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(_rebuild_chunk, chunks)
+
+
+def rebuild(user_ids=None, workers=1, chunk_size=500) -> int:
+    """Recompute feature vectors (see iter_rebuild); return the number of users."""
+    return sum(iter_rebuild(user_ids, workers, chunk_size))
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def get_features(user):
+    """`user`'s UserFeatures, recomputed first when missing, from an earlier day or outdated."""
+    features = UserFeatures.objects.filter(user_id=user.pk).first()
+    if features is None or features.version != FEATURE_VERSION or features.computed_on != timezone.localdate():
+        features = refresh_users([user])[0]
+    return features
+
+
+def read_buffer(user_ids=None, chunk_size=1000):
+    """
+    Feature vectors as (user ids, bytearray): WIDTH little-endian float64 per
+    user, back to back. With `user_ids` the rows follow that order and users
+    without current features are all NaN; otherwise every current vector is
+    returned in user id order.
+    """
+    current = UserFeatures.objects.filter(version=FEATURE_VERSION)
+    buffer = bytearray()
+    if user_ids is None:
+        ids = []
+        rows = current.order_by('user_id').values_list('user_id', 'vector').iterator(chunk_size=chunk_size)
+        for user_id, vector in rows:
+            ids.append(user_id)
+            buffer += vector
+        return ids, buffer
+
+    ids = list(user_ids)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        vectors = dict(current.filter(user_id__in=chunk).values_list('user_id', 'vector'))
+        for user_id in chunk:
+            buffer += vectors.get(user_id, MISSING)
+    return ids, buffer
+
+
+def read_matrix(user_ids=None, chunk_size=1000):
+    """read_buffer as NumPy arrays: (user ids, an (n, WIDTH) float64 matrix over the same memory)."""
+    if np is None:
+        raise ImproperlyConfigured("read_matrix needs NumPy; use read_buffer instead.")
+    ids, buffer = read_buffer(user_ids, chunk_size)
+    return np.array(ids, dtype=np.int64), np.frombuffer(buffer, dtype='<f8').reshape(len(ids), WIDTH)
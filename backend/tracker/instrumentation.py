@@ -0,0 +1,231 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware measures every request and, for sampled requests, counts
+SQL queries and DB time through a connection execute_wrapper and collects the
+time spent in serializers and tracker signal handlers. Results are sent as a
+Server-Timing header and a structured log line, and aggregated into per-route
+histograms that /api/v1/metrics/ exposes in Prometheus text format.
+"""
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('tracker.performance')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('tracker_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('sql_count', 'db', 'serializer', 'signal', '_depth')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.signal = 0.0
+        self._depth = {}
+
+
+@contextmanager
+def timer(section):
+    """Add the block's duration to `section` of the current request; nested blocks count once."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    depth = metrics._depth.get(section, 0)
+    metrics._depth[section] = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._depth[section] = depth
+        if depth == 0:
+            setattr(metrics, section, getattr(metrics, section) + time.perf_counter() - start)
+
+
+def timed(section):
+    """Decorator form of `timer`, e.g. for signal receivers."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(section):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.sql_count += 1
+            metrics.db += time.perf_counter() - start
+
+
+# -----------------------------
+# Per-route aggregation
+# -----------------------------
+class RouteHistograms:
+    """Thread-safe in-process histograms and counters keyed by (route, method)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, duration, metrics=None):
+        with self._lock:
+            entry = self._routes.setdefault((route, method), {
+                'buckets': [0] * len(DURATION_BUCKETS),
+                'count': 0,
+                'sum': 0.0,
+                'sampled': 0,
+                'sql_queries': 0,
+                'db_seconds': 0.0,
+                'serializer_seconds': 0.0,
+                'signal_seconds': 0.0,
+            })
+            entry['count'] += 1
+            entry['sum'] += duration
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    entry['buckets'][index] += 1
+            if metrics is not None:
+                entry['sampled'] += 1
+                entry['sql_queries'] += metrics.sql_count
+                entry['db_seconds'] += metrics.db
+                entry['serializer_seconds'] += metrics.serializer
+                entry['signal_seconds'] += metrics.signal
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render_prometheus(self):
+        with self._lock:
+            routes = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._routes.items()}
+
+        lines = [
+            '# HELP tracker_request_duration_seconds View time per route.',
+            '# TYPE tracker_request_duration_seconds histogram',
+        ]
+        for (route, method), entry in sorted(routes.items()):
+            labels = f'route="{route}",method="{method}"'
+            for bound, count in zip(DURATION_BUCKETS, entry['buckets']):
+                lines.append(f'tracker_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'tracker_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f'tracker_request_duration_seconds_sum{{{labels}}} {entry["sum"]:.6f}')
+            lines.append(f'tracker_request_duration_seconds_count{{{labels}}} {entry["count"]}')
+
+        counters = (
+            ('tracker_request_sampled_total', 'sampled', 'Requests with detailed instrumentation.'),
+            ('tracker_request_sql_queries_total', 'sql_queries', 'SQL queries issued by sampled requests.'),
+            ('tracker_request_db_seconds_total', 'db_seconds', 'Database time of sampled requests.'),
+            ('tracker_request_serializer_seconds_total', 'serializer_seconds', 'Serializer time of sampled requests.'),
+            ('tracker_request_signal_seconds_total', 'signal_seconds', 'Signal handler time of sampled requests.'),
+        )
+        for name, key, help_text in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (route, method), entry in sorted(routes.items()):
+                value = entry[key]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f'{name}{{route="{route}",method="{method}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+histograms = RouteHistograms()
+
+
+# -----------------------------
+# Middleware
+# -----------------------------
+class PerformanceMiddleware:
+    """Sync and async capable, so native async views never hop to a thread for it."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'PERF_INSTRUMENTATION_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = self._start()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with self._sql_wrappers(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'PERF_INSTRUMENTATION_ENABLED', True):
+            return await self.get_response(request)
+
+        metrics = self._start()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with self._sql_wrappers(metrics):
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    def _start(self):
+        sampled = random.random() < getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        return RequestMetrics() if sampled else None
+
+    def _sql_wrappers(self, metrics):
+        stack = ExitStack()
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_sql_wrapper))
+        return stack
+
+    def _finish(self, request, response, metrics, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+        histograms.observe(route, request.method, duration, metrics)
+
+        if metrics is not None:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db * 1000:.2f};desc="{metrics.sql_count} queries"',
+                f'serializer;dur={metrics.serializer * 1000:.2f}',
+                f'signal;dur={metrics.signal * 1000:.2f}',
+                f'view;dur={duration * 1000:.2f}',
+            ])
+            logger.info(json.dumps({
+                'route': route,
+                'method': request.method,
+                'status': response.status_code,
+                'sql_queries': metrics.sql_count,
+                'db_ms': round(metrics.db * 1000, 2),
+                'serializer_ms': round(metrics.serializer * 1000, 2),
+                'signal_ms': round(metrics.signal * 1000, 2),
+                'view_ms': round(duration * 1000, 2),
+            }))
+        return response
@@ -0,0 +1,120 @@
+"""
+In-process load test comparing the WSGI and ASGI paths for the read endpoints.
+
+Both modes drive the real handler stacks: django.test.Client (WSGIHandler) and
+AsyncClient (ASGIHandler, routed to tracker.async_views), with `workers`
+workers each. A WSGI worker serves one request at a time. An ASGI worker is an
+event loop that keeps `concurrency / workers` requests in flight.
+`client_delay_ms` models a slow mobile connection draining the response. A sync
+worker is held for that time, while an event loop is free to serve other
+requests. Results are JSON, like tracker.benchmarks.
+"""
+import asyncio
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import synthetic
+
+ROUTES = ('readings-list', 'readings-recent_readings', 'readings-abnormal_readings')
+
+
+def _summary(mode, latencies, elapsed, statuses):
+    latencies.sort()
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status != 200),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'median_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        'max_ms': round(latencies[-1], 3),
+    }
+
+
+def _run_wsgi(urls, headers, requests, workers, delay):
+    def worker(share):
+        client = Client(headers=headers)
+        results = []
+        try:
+            for index in range(share):
+                start = time.perf_counter()
+                response = client.get(urls[index % len(urls)])
+                time.sleep(delay)
+                results.append(((time.perf_counter() - start) * 1000, response.status_code))
+        finally:
+            connections.close_all()
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        shares = [requests // workers + (index < requests % workers) for index in range(workers)]
+        results = [result for batch in pool.map(worker, shares) for result in batch]
+    elapsed = time.perf_counter() - start
+    return _summary('wsgi', [r[0] for r in results], elapsed, [r[1] for r in results])
+
+
+def _run_asgi(urls, headers, requests, workers, concurrency, delay):
+    async def event_loop(share, in_flight):
+        client = AsyncClient()
+        queue = iter(range(share))
+        results = []
+
+        async def lane():
+            for index in queue:
+                start = time.perf_counter()
+                response = await client.get(urls[index % len(urls)], headers=headers)
+                await asyncio.sleep(delay)
+                results.append(((time.perf_counter() - start) * 1000, response.status_code))
+
+        await asyncio.gather(*(lane() for _ in range(max(in_flight, 1))))
+        return results
+
+    def worker(share):
+        try:
+            return asyncio.run(event_loop(share, concurrency // workers))
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        shares = [requests // workers + (index < requests % workers) for index in range(workers)]
+        results = [result for batch in pool.map(worker, shares) for result in batch]
+    elapsed = time.perf_counter() - start
+    return _summary('asgi', [r[0] for r in results], elapsed, [r[1] for r in results])
+
+
+def run(requests=400, workers=2, concurrency=32, client_delay_ms=50, readings=200, seed=0):
+    """Run the same request mix through both handler stacks and return a JSON-ready dict."""
+    user = synthetic.generate(users=1, readings_per_user=readings, seed=seed, email_prefix='load')[0]
+    headers = {'Authorization': f"Bearer {AccessToken.for_user(user)}"}
+    urls = [reverse(route) for route in ROUTES]
+    delay = client_delay_ms / 1000
+
+    wsgi = _run_wsgi(urls, headers, requests, workers, delay)
+    asgi = _run_asgi(urls, headers, requests, workers, concurrency, delay)
+    return {
+        'meta': {
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'routes': list(ROUTES),
+            'requests': requests,
+            'workers': workers,
+            'concurrency': concurrency,
+            'client_delay_ms': client_delay_ms,
+            'readings_per_user': readings,
+        },
+        'results': [wsgi, asgi],
+        'speedup': round(asgi['throughput_rps'] / wsgi['throughput_rps'], 2),
+    }
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import synthetic
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic population of users and readings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of users (default: 10).")
+        parser.add_argument('--readings', type=int, default=100, help="Readings per user (default: 100).")
+        parser.add_argument('--days', type=int, default=365, help="Spread readings over this many days (default: 365).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument('--diabetes-ratio', type=float, default=0.3, help="Share of users with diabetes.")
+        parser.add_argument('--hypertension-ratio', type=float, default=0.4, help="Share of users with hypertension.")
+        parser.add_argument('--abnormal-ratio', type=float, default=0.1, help="Base share of abnormal readings.")
+        parser.add_argument('--mmol-ratio', type=float, default=0.2, help="Share of glucose readings in mmol/L.")
+        parser.add_argument('--email-prefix', default='synthetic', help="Prefix for generated email addresses.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk insert (default: 1000).")
+
+    def handle(self, *args, **options):
+        for ratio in ('diabetes_ratio', 'hypertension_ratio', 'abnormal_ratio', 'mmol_ratio'):
+            if not 0.0 <= options[ratio] <= 1.0:
+                raise CommandError(f"--{ratio.replace('_', '-')} must be between 0 and 1.")
+
+        users = synthetic.generate(
+            users=options['users'],
+            readings_per_user=options['readings'],
+            days=options['days'],
+            seed=options['seed'],
+            diabetes_ratio=options['diabetes_ratio'],
+            hypertension_ratio=options['hypertension_ratio'],
+            abnormal_ratio=options['abnormal_ratio'],
+            mmol_ratio=options['mmol_ratio'],
+            email_prefix=options['email_prefix'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users with {len(users) * options['readings']} readings."
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tracker import alerts
+
+
+class Command(BaseCommand):
+    help = "Deliver queued abnormal-reading alerts from the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help="Alerts claimed and sent per mail connection (default: 100)."
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling for new alerts instead of exiting once the queue is drained."
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help="Seconds to sleep between polls when the queue is empty in --loop mode (default: 5)."
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = alerts.process_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} alerts, {failed} failed")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_sent} sent, {total_failed} failed."))
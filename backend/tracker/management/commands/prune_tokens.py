@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tracker import tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWT refresh tokens in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of outstanding tokens deleted per transaction (default: 1000)."
+        )
+
+    def handle(self, *args, **options):
+        deleted = tokens.prune_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} expired tokens."))
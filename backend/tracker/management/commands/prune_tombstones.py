@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tracker import sync
+
+
+class Command(BaseCommand):
+    help = "Delete reading tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of tombstones deleted per query (default: 1000)."
+        )
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} tombstones."))
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import sharding
+from tracker.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Move users' readings, rollups, tombstones and alerts to the shard they "
+        "belong on under READING_SHARDS (or to --to)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, nargs='+',
+            help="Only move these user ids (default: every user)."
+        )
+        parser.add_argument(
+            '--to',
+            help="Move the users to this shard instead of their home shard."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Rows copied per insert (default: 500)."
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report which users would move."
+        )
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError("READING_SHARDS is empty; there is nothing to rebalance.")
+        target = options['to']
+        if target is not None and target not in settings.DATABASES:
+            raise CommandError(f"Unknown database alias '{target}'.")
+
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        if options['users']:
+            user_ids = user_ids.filter(id__in=options['users'])
+
+        moved_users = moved_readings = 0
+        for user_id in user_ids.iterator():
+            source = sharding.shard_for_user(user_id)
+            destination = target or sharding.home_shard(user_id)
+            if source == destination:
+                continue
+            if options['dry_run']:
+                self.stdout.write(f"User {user_id}: {source} -> {destination}")
+            else:
+                readings = sharding.move_user(user_id, destination, batch_size=options['batch_size'])
+                self.stdout.write(f"User {user_id}: moved {readings} readings from {source} to {destination}")
+                moved_readings += readings
+            moved_users += 1
+
+        verb = "Would move" if options['dry_run'] else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved_users} users ({moved_readings} readings)."))
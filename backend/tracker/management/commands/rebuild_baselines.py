@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from tracker import baselines, caching
+from tracker.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user reading baselines and anomaly scores by replaying raw readings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help="Only rebuild baselines for this user id (repeatable)."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help="Number of users rebuilt per transaction (default: 200)."
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if user_ids is None:
+            user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            baselines.rebuild(batch)
+            # Rescored readings are served from ETag-validated caches and summaries.
+            for user_id in batch:
+                caching.invalidate_user(user_id)
+            self.stdout.write(f"Rebuilt baselines for {start + len(batch)}/{len(user_ids)} users")
+
+        self.stdout.write(self.style.SUCCESS("Baseline rebuild complete."))
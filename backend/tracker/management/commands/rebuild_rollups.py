@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from tracker import caching, rollups
+from tracker.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the day and ISO-week reading rollups from raw readings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help="Only rebuild rollups for this user id (repeatable)."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help="Number of users rebuilt per transaction (default: 200)."
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if user_ids is None:
+            user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            rollups.rebuild(batch)
+            # Stats responses are cached against the user's ETag version.
+            for user_id in batch:
+                caching.invalidate_user(user_id)
+            self.stdout.write(f"Rebuilt rollups for {start + len(batch)}/{len(user_ids)} users")
+
+        self.stdout.write(self.style.SUCCESS("Rollup rebuild complete."))
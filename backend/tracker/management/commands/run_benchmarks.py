@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from tracker import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Time the tracker hot paths on synthetic data in a throwaway test database and write JSON results."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='10,100,1000',
+            help="Comma-separated readings-per-user sizes (default: 10,100,1000)."
+        )
+        parser.add_argument('--users', type=int, default=5, help="Users generated per size (default: 5).")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed repetitions per benchmark (default: 5).")
+        parser.add_argument('--seed', type=int, default=0, help="Synthetic data seed (default: 0).")
+        parser.add_argument(
+            '--only', action='append',
+            help="Only run benchmarks whose name starts with this prefix (repeatable)."
+        )
+        parser.add_argument('--output', help="Write JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            report = benchmarks.run(
+                sizes=sizes,
+                users=options['users'],
+                repeat=options['repeat'],
+                seed=options['seed'],
+                only=options['only'],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['results'])} results to {options['output']}"))
+        else:
+            self.stdout.write(output)
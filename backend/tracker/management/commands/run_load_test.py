@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from tracker import loadtest
+
+
+class Command(BaseCommand):
+    help = "Compare WSGI and ASGI read throughput at equal worker counts in a throwaway test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help="Requests per mode (default: 400).")
+        parser.add_argument('--workers', type=int, default=2, help="Workers per mode (default: 2).")
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help="Requests in flight across all ASGI workers (default: 32)."
+        )
+        parser.add_argument(
+            '--client-delay-ms', type=int, default=50,
+            help="Simulated time a slow client takes to drain each response (default: 50)."
+        )
+        parser.add_argument('--readings', type=int, default=200, help="Readings for the test user (default: 200).")
+        parser.add_argument('--seed', type=int, default=0, help="Synthetic data seed (default: 0).")
+        parser.add_argument('--output', help="Write JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            report = loadtest.run(
+                requests=options['requests'],
+                workers=max(options['workers'], 1),
+                concurrency=options['concurrency'],
+                client_delay_ms=options['client_delay_ms'],
+                readings=options['readings'],
+                seed=options['seed'],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Wrote load test results to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,41 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into the SQLite replica files listed in "
+        "DATABASE_REPLICAS. A local stand-in for replication."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help="Replica aliases to refresh (default: every alias in DATABASE_REPLICAS)."
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or list(settings.DATABASE_REPLICAS)
+        if not aliases:
+            raise CommandError("No replicas given and DATABASE_REPLICAS is empty.")
+
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            replica = settings.DATABASES.get(alias)
+            if replica is None:
+                raise CommandError(f"Unknown database alias '{alias}'.")
+            if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+                raise CommandError("sync_replica only copies between SQLite databases.")
+
+            source = sqlite3.connect(str(primary['NAME']))
+            target = sqlite3.connect(str(replica['NAME']))
+            try:
+                # The online backup API gives a consistent snapshot while the primary is in use.
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} to '{alias}' ({replica['NAME']})."))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_user_has_diabetes_user_has_hypertension'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='reading_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_reading_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(choices=[('day', 'Day'), ('week', 'ISO week')], max_length=4)),
+                ('period_start', models.DateField(help_text='First day of the bucket (Monday for ISO weeks)')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('systolic_min', models.FloatField(null=True)),
+                ('systolic_max', models.FloatField(null=True)),
+                ('systolic_sum', models.FloatField(default=0.0)),
+                ('systolic_sum_sq', models.FloatField(default=0.0)),
+                ('diastolic_min', models.FloatField(null=True)),
+                ('diastolic_max', models.FloatField(null=True)),
+                ('diastolic_sum', models.FloatField(default=0.0)),
+                ('diastolic_sum_sq', models.FloatField(default=0.0)),
+                ('glucose_min', models.FloatField(null=True)),
+                ('glucose_max', models.FloatField(null=True)),
+                ('glucose_sum', models.FloatField(default=0.0)),
+                ('glucose_sum_sq', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['period_start'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'bucket', 'period_start'), name='rollup_user_bucket_period_uniq')],
+            },
+        ),
+    ]
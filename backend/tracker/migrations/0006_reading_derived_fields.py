@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_readingrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reading',
+            name='bp_category',
+            field=models.CharField(blank=True, choices=[('Normal', 'Normal'), ('Elevated', 'Elevated'), ('Hypertension Stage 1', 'Hypertension Stage 1'), ('Hypertension Stage 2', 'Hypertension Stage 2'), ('Hypertensive Crisis', 'Hypertensive Crisis'), ('Unknown', 'Unknown')], editable=False, help_text='Blood pressure category, derived on save', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='reading',
+            name='glucose_mg_dl',
+            field=models.FloatField(editable=False, help_text='Glucose level normalized to mg/dL, derived on save', null=True),
+        ),
+        migrations.AddField(
+            model_name='reading',
+            name='is_abnormal',
+            field=models.BooleanField(default=False, editable=False, help_text='Whether the reading crosses the alert thresholds, derived on save'),
+        ),
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(fields=['user', 'bp_category'], name='reading_user_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(condition=models.Q(('is_abnormal', True)), fields=['user', 'created_at'], name='reading_abnormal_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+
+def categorize(systolic, diastolic):
+    # Mirrors Reading.get_blood_pressure_category at the time of this migration.
+    if systolic < 120 and diastolic < 80:
+        return "Normal"
+    elif 120 <= systolic <= 129 and diastolic < 80:
+        return "Elevated"
+    elif (130 <= systolic <= 139) or (80 <= diastolic <= 89):
+        return "Hypertension Stage 1"
+    elif systolic >= 140 or diastolic >= 90:
+        return "Hypertension Stage 2"
+    return "Unknown"
+
+
+def backfill_derived_fields(apps, schema_editor):
+    Reading = apps.get_model('tracker', 'Reading')
+    alias = schema_editor.connection.alias
+    readings = Reading.objects.using(alias)
+    last_pk = 0
+    while True:
+        # One short transaction per batch, so the table is never locked for the whole backfill.
+        with transaction.atomic(using=alias):
+            batch = list(
+                readings.filter(pk__gt=last_pk).order_by('pk')
+                .only('id', 'systolic', 'diastolic', 'glucose_level', 'glucose_unit')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            for reading in batch:
+                if reading.glucose_unit == 'mmol/L':
+                    reading.glucose_mg_dl = round(reading.glucose_level * 18.0, 2)
+                else:
+                    reading.glucose_mg_dl = reading.glucose_level
+                reading.bp_category = categorize(reading.systolic, reading.diastolic)
+                reading.is_abnormal = (
+                    reading.systolic >= 140 or reading.diastolic >= 90 or reading.glucose_mg_dl >= 200
+                )
+            readings.bulk_update(batch, ['bp_category', 'glucose_mg_dl', 'is_abnormal'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Batches commit on their own; a rerun after a failure just recomputes them.
+    atomic = False
+
+    dependencies = [
+        ('tracker', '0006_reading_derived_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_derived_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_backfill_reading_derived_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reading_id', models.BigIntegerField(help_text='Primary key of the deleted reading')),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at', 'reading_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(fields=['user', 'updated_at'], name='reading_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='readingtombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='readingtombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:21
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Report accounts whose emails differ only by case, then lowercase every email.
+    The Lower(email) unique constraint below cannot be created while duplicates exist.
+    """
+    User = apps.get_model('tracker', 'User')
+    duplicates = list(
+        User.objects.annotate(email_ci=django.db.models.functions.text.Lower('email'))
+        .values('email_ci').annotate(n=Count('id')).filter(n__gt=1).values_list('email_ci', flat=True)
+    )
+    if duplicates:
+        report = []
+        for email in duplicates:
+            accounts = User.objects.filter(email__iexact=email).order_by('id').values_list('id', 'email')
+            report.append(f"  {email}: " + ", ".join(f"#{pk} {value}" for pk, value in accounts))
+        raise RuntimeError(
+            "Cannot add the case-insensitive email constraint; merge or rename these accounts first:\n"
+            + "\n".join(report)
+        )
+
+    for user in User.objects.exclude(email=django.db.models.functions.text.Lower('email')).only('id', 'email'):
+        User.objects.filter(pk=user.pk).update(email=user.email.strip().lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tracker', '0009_alert_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_ci_uniq'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_reading_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reading',
+            name='anomaly_score',
+            field=models.FloatField(editable=False, help_text="Largest |z-score| against the user's own baseline when recorded (see tracker.baselines)", null=True),
+        ),
+        migrations.CreateModel(
+            name='ReadingBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('weight', models.FloatField(default=0.0)),
+                ('reference_at', models.DateTimeField(help_text='Time the weights were last decayed to', null=True)),
+                ('systolic_mean', models.FloatField(default=0.0)),
+                ('systolic_m2', models.FloatField(default=0.0)),
+                ('diastolic_mean', models.FloatField(default=0.0)),
+                ('diastolic_m2', models.FloatField(default=0.0)),
+                ('glucose_mean', models.FloatField(default=0.0)),
+                ('glucose_m2', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='reading_baseline', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:55
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# The fixed thresholds alerting used before rules were configurable.
+DEFAULT_RULES = (
+    ('High systolic pressure', 'systolic', 140.0),
+    ('High diastolic pressure', 'diastolic', 90.0),
+    ('High glucose', 'glucose', 200.0),
+)
+
+
+def seed_default_rules(apps, schema_editor):
+    AlertRule = apps.get_model('tracker', 'AlertRule')
+    AlertRule.objects.using(schema_editor.connection.alias).bulk_create([
+        AlertRule(name=name, metric=metric, operator='gte', threshold=threshold)
+        for name, metric, threshold in DEFAULT_RULES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_reading_baselines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('metric', models.CharField(choices=[('systolic', 'Systolic'), ('diastolic', 'Diastolic'), ('glucose', 'Glucose (mg/dL)')], max_length=10)),
+                ('operator', models.CharField(choices=[('gte', 'At or above'), ('lte', 'At or below')], default='gte', max_length=3)),
+                ('threshold', models.FloatField(help_text='Glucose thresholds are in mg/dL')),
+                ('condition', models.CharField(blank=True, choices=[('', 'Everyone'), ('has_diabetes', 'Users with diabetes'), ('has_hypertension', 'Users with hypertension')], max_length=20)),
+                ('window', models.PositiveSmallIntegerField(default=1, help_text='Number of most recent readings considered', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)])),
+                ('min_count', models.PositiveSmallIntegerField(default=1, help_text='Matching readings needed within the window', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)])),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, help_text='Per-user override; leave empty for a general rule', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alert_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['metric', 'threshold'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('min_count__lte', models.F('window'))), name='alertrule_min_count_lte_window')],
+            },
+        ),
+        migrations.RunPython(seed_default_rules, migrations.RunPython.noop),
+    ]
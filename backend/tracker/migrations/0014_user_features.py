@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_alert_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFeatures',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveSmallIntegerField(help_text='Feature schema version the vector was built with')),
+                ('revision', models.BigIntegerField(default=0)),
+                ('vector', models.BinaryField()),
+                ('computed_on', models.DateField(help_text='Local day the rolling windows end on')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User features',
+                'verbose_name_plural': 'User features',
+            },
+        ),
+    ]
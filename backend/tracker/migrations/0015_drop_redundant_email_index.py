@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_user_features'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='email_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_drop_redundant_email_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readingtombstone',
+            name='shard',
+            field=models.CharField(blank=True, default='', help_text='Database the reading was deleted from, when not this one (set by move_user)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0016_tombstone_origin_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usershard',
+            name='moving',
+            field=models.BooleanField(default=False, help_text='Set while move_user copies the rows; writes are refused'),
+        ),
+    ]
@@ -1,16 +1,37 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from typing import Any, Optional
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db.models import Q
+from django.db.models.functions import Lower
+from . import sharding
 
 # -----------------------------
 # Custom User Manager
 # -----------------------------
 class UserManager(BaseUserManager):
+    @classmethod
+    def normalize_email(cls, email: Optional[str]) -> str:
+        # Emails are stored lowercased so every lookup can use user_email_ci_uniq.
+        return super().normalize_email(email).strip().lower()
+
+    def filter_by_email(self, email: str):
+        """Case-insensitive email lookup served by the unique index on Lower(email)."""
+        return self.alias(email_ci=Lower('email')).filter(email_ci=self.normalize_email(email))
+
+    def email_exists(self, email: str, exclude_pk: Optional[int] = None) -> bool:
+        qs = self.filter_by_email(email)
+        if exclude_pk is not None:
+            qs = qs.exclude(pk=exclude_pk)
+        return qs.exists()
+
+    def get_by_natural_key(self, username: str) -> 'User':
+        # Used by ModelBackend, so JWT token login is case-insensitive too.
+        return self.filter_by_email(username).get()
+
     def create_user(self, email: str, password: Optional[str] = None, **extra_fields: Any) -> 'User':
         if not email:
             raise ValueError("Users must have an email address")
@@ -78,8 +99,8 @@ class User(AbstractBaseUser, PermissionsMixin):
         return None
 
     class Meta:
-        indexes = [
-            models.Index(fields=['email'], name='email_idx'),
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='user_email_ci_uniq'),
         ]
         permissions = [
             ("can_view_health_data", "Can view health-related data"),
@@ -91,18 +112,45 @@ class User(AbstractBaseUser, PermissionsMixin):
 # Reading Manager
 # -----------------------------
 class ReadingManager(models.Manager):
+    def for_user(self, user):
+        """The user's readings, read from their shard when sharding is enabled."""
+        queryset = self.get_queryset()
+        alias = sharding.shard_for_user(getattr(user, 'pk', user))
+        if alias is not None:
+            queryset = queryset.using(alias)
+        return queryset.filter(user=user)
+
+    def create(self, **kwargs):
+        # QuerySet.create saves on the queryset's database, which the router
+        # cannot tie to a user; send it to the user's shard instead.
+        user_id = kwargs.get('user_id', getattr(kwargs.get('user'), 'pk', None))
+        if self._db is None and user_id is not None:
+            alias = sharding.shard_for_write(user_id)
+            if alias is not None:
+                return self.db_manager(alias).create(**kwargs)
+        return super().create(**kwargs)
+
     def recent_readings(self, user, days=7):
         cutoff = timezone.now() - timezone.timedelta(days=days)
-        return self.filter(user=user, created_at__gte=cutoff)
-
-    def abnormal_readings(self, user):
-        return self.filter(
-        Q(user=user) & (
-            Q(systolic__gte=140) |
-            Q(diastolic__gte=90) |
-            Q(glucose_level__gte=200)
-            )
-        )
+        return self.for_user(user).filter(created_at__gte=cutoff)
+
+    def abnormal_readings(self, user, rule_set=None):
+        # The user's alert rules, compiled to the same conditions alerting evaluates.
+        # Async callers pass the rule set from rules.aget_rule_set(), since loading it queries.
+        if rule_set is None:
+            from . import rules
+            rule_set = rules.get_rule_set()
+        return rule_set.filter_flagged(self.for_user(user), user)
+
+    def by_category(self, user, category):
+        return self.for_user(user).filter(bp_category=category)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), so derived columns are filled in here.
+        objs = list(objs)
+        for obj in objs:
+            obj.refresh_derived_fields()
+        return super().bulk_create(objs, *args, **kwargs)
 
 
     # UPDATED METHOD
@@ -121,7 +169,9 @@ class ReadingManager(models.Manager):
         )
         # Run model-level validation before committing to the database.
         reading.full_clean()
-        reading.save(using=self._db)
+        using = self._db or sharding.shard_for_write(user.pk)
+        with transaction.atomic(using=using):
+            reading.save(using=using)
         return reading
 
 # -----------------------------
@@ -132,11 +182,31 @@ class Reading(models.Model):
         ('mg/dL', 'mg/dL'),
         ('mmol/L', 'mmol/L'),
     )
+    BP_CATEGORIES = (
+        ('Normal', 'Normal'),
+        ('Elevated', 'Elevated'),
+        ('Hypertension Stage 1', 'Hypertension Stage 1'),
+        ('Hypertension Stage 2', 'Hypertension Stage 2'),
+        ('Hypertensive Crisis', 'Hypertensive Crisis'),
+        ('Unknown', 'Unknown'),
+    )
+
+    # Fixed clinical alert thresholds
+    ABNORMAL_SYSTOLIC = 140
+    ABNORMAL_DIASTOLIC = 90
+    ABNORMAL_GLUCOSE_MG_DL = 200.0
 
+    # Columns derived from the raw values on every write
+    DERIVED_FIELDS = ('bp_category', 'glucose_mg_dl', 'is_abnormal')
+    DERIVED_SOURCE_FIELDS = ('systolic', 'diastolic', 'glucose_level', 'glucose_unit')
+
+    # No database-level constraint: with sharding the row may live on a
+    # different database than its user (see tracker.sharding).
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='readings',
+        db_constraint=False,
         help_text="User who recorded this reading"
     )
     systolic = models.PositiveIntegerField(
@@ -169,9 +239,42 @@ class Reading(models.Model):
         help_text="Date and time when the reading was last updated",
         auto_now=True
     )
+    bp_category = models.CharField(
+        help_text="Blood pressure category, derived on save",
+        max_length=32,
+        choices=BP_CATEGORIES,
+        blank=True,
+        editable=False
+    )
+    glucose_mg_dl = models.FloatField(
+        help_text="Glucose level normalized to mg/dL, derived on save",
+        null=True,
+        editable=False
+    )
+    is_abnormal = models.BooleanField(
+        help_text="Whether the reading crosses the alert thresholds, derived on save",
+        default=False,
+        editable=False
+    )
+    anomaly_score = models.FloatField(
+        help_text="Largest |z-score| against the user's own baseline when recorded (see tracker.baselines)",
+        null=True,
+        editable=False
+    )
 
     objects = ReadingManager()
 
+    # Stored values tracker.baselines retracts when a reading changes
+    BASELINE_FIELDS = ('systolic', 'diastolic', 'glucose_mg_dl')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(field in loaded for field in cls.BASELINE_FIELDS):
+            instance._baseline_values = {field: loaded[field] for field in cls.BASELINE_FIELDS}
+        return instance
+
     def clean(self):
         # This validation runs when full_clean() is called.
         if self.systolic is not None and self.diastolic is not None:
@@ -179,6 +282,22 @@ class Reading(models.Model):
                 raise ValidationError("Systolic blood pressure must be greater than diastolic blood pressure.")
         super().clean()
 
+    def refresh_derived_fields(self):
+        self.bp_category = self.get_blood_pressure_category()
+        self.glucose_mg_dl = self.get_glucose_in_mg_dl() if self.glucose_level is not None else None
+        self.is_abnormal = (
+            (self.systolic is not None and self.systolic >= self.ABNORMAL_SYSTOLIC) or
+            (self.diastolic is not None and self.diastolic >= self.ABNORMAL_DIASTOLIC) or
+            (self.glucose_mg_dl is not None and self.glucose_mg_dl >= self.ABNORMAL_GLUCOSE_MG_DL)
+        )
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.DERIVED_SOURCE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | set(self.DERIVED_FIELDS)
+        super().save(*args, **kwargs)
+
     def get_blood_pressure_category(self) -> str:
         if self.systolic is None or self.diastolic is None:
             return "Unknown"
@@ -215,7 +334,328 @@ class Reading(models.Model):
         indexes = [
             models.Index(fields=['user'], name='reading_user_idx'),
             models.Index(fields=['created_at'], name='reading_recorded_idx'),
+            # Serves keyset pagination: WHERE user = ? ORDER BY created_at DESC, id
+            models.Index(fields=['user', '-created_at', 'id'], name='reading_user_created_idx'),
+            models.Index(fields=['user', 'bp_category'], name='reading_user_category_idx'),
+            # Serves delta sync: WHERE user = ? AND updated_at > ? ORDER BY updated_at, id
+            models.Index(fields=['user', 'updated_at'], name='reading_user_updated_idx'),
+            models.Index(
+                fields=['user', 'created_at'], name='reading_abnormal_idx',
+                condition=Q(is_abnormal=True)
+            ),
         ]
         permissions = [
             ("can_view_all_readings", "Can view all users' health readings"),
-        ]
\ No newline at end of file
+        ]
+
+# -----------------------------
+# Reading Rollups
+# -----------------------------
+class ReadingRollup(models.Model):
+    """
+    Pre-aggregated per-user statistics for one day or one ISO week of readings.
+    Kept up to date by tracker.rollups so trend charts read one row per bucket.
+    """
+    BUCKET_DAY = 'day'
+    BUCKET_WEEK = 'week'
+    BUCKETS = (
+        (BUCKET_DAY, 'Day'),
+        (BUCKET_WEEK, 'ISO week'),
+    )
+    METRICS = ('systolic', 'diastolic', 'glucose')
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reading_rollups',
+        db_constraint=False,
+    )
+    bucket = models.CharField(max_length=4, choices=BUCKETS)
+    period_start = models.DateField(help_text="First day of the bucket (Monday for ISO weeks)")
+    count = models.PositiveIntegerField(default=0)
+
+    systolic_min = models.FloatField(null=True)
+    systolic_max = models.FloatField(null=True)
+    systolic_sum = models.FloatField(default=0.0)
+    systolic_sum_sq = models.FloatField(default=0.0)
+
+    diastolic_min = models.FloatField(null=True)
+    diastolic_max = models.FloatField(null=True)
+    diastolic_sum = models.FloatField(default=0.0)
+    diastolic_sum_sq = models.FloatField(default=0.0)
+
+    # Glucose is aggregated in mg/dL regardless of the unit it was recorded in.
+    glucose_min = models.FloatField(null=True)
+    glucose_max = models.FloatField(null=True)
+    glucose_sum = models.FloatField(default=0.0)
+    glucose_sum_sq = models.FloatField(default=0.0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def mean(self, metric: str) -> Optional[float]:
+        if not self.count:
+            return None
+        return round(getattr(self, f"{metric}_sum") / self.count, 2)
+
+    def std_dev(self, metric: str) -> Optional[float]:
+        if not self.count:
+            return None
+        mean = getattr(self, f"{metric}_sum") / self.count
+        variance = max(getattr(self, f"{metric}_sum_sq") / self.count - mean ** 2, 0.0)
+        return round(variance ** 0.5, 2)
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.bucket} {self.period_start} ({self.count} readings)"
+
+    class Meta:
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'bucket', 'period_start'], name='rollup_user_bucket_period_uniq'),
+        ]
+
+
+# -----------------------------
+# Reading Tombstones
+# -----------------------------
+class ReadingTombstone(models.Model):
+    """
+    Marker left behind when a reading is deleted so delta sync clients can drop it.
+    Pruned after SYNC_TOMBSTONE_RETENTION_DAYS by the prune_tombstones command.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reading_tombstones',
+        db_constraint=False,
+    )
+    reading_id = models.BigIntegerField(help_text="Primary key of the deleted reading")
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    shard = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text="Database the reading was deleted from, when not this one (set by move_user)"
+    )
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: reading {self.reading_id} deleted at {self.deleted_at}"
+
+    class Meta:
+        ordering = ['deleted_at', 'reading_id']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+
+# -----------------------------
+# Reading Baselines
+# -----------------------------
+class ReadingBaseline(models.Model):
+    """
+    Running per-user mean and variance of each reading metric, the reference
+    for personalized anomaly scores. Updated in O(1) per reading write by
+    tracker.baselines; `weight` is the (decayed) number of readings folded in.
+    """
+    METRICS = ('systolic', 'diastolic', 'glucose')
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reading_baseline',
+        db_constraint=False,
+    )
+    count = models.PositiveIntegerField(default=0)
+    weight = models.FloatField(default=0.0)
+    reference_at = models.DateTimeField(null=True, help_text="Time the weights were last decayed to")
+
+    systolic_mean = models.FloatField(default=0.0)
+    systolic_m2 = models.FloatField(default=0.0)
+    diastolic_mean = models.FloatField(default=0.0)
+    diastolic_m2 = models.FloatField(default=0.0)
+    # Glucose in mg/dL regardless of the unit it was recorded in.
+    glucose_mean = models.FloatField(default=0.0)
+    glucose_m2 = models.FloatField(default=0.0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def std_dev(self, metric: str) -> Optional[float]:
+        if self.weight <= 0:
+            return None
+        return (max(getattr(self, f"{metric}_m2"), 0.0) / self.weight) ** 0.5
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: baseline over {self.count} readings"
+
+
+# -----------------------------
+# Alert Rules
+# -----------------------------
+class AlertRule(models.Model):
+    """
+    One alert condition evaluated by tracker.rules: a reading's `metric` at or
+    above (or at or below) `threshold`. With `window` > 1 the rule is sustained:
+    it fires on a matching reading when at least `min_count` of the user's last
+    `window` readings, that one included, match.
+
+    A rule applies to every user, to users with a condition, or to one user.
+    For each metric, the most specific level that has active rules for the user
+    replaces the broader ones.
+    """
+    METRICS = (
+        ('systolic', 'Systolic'),
+        ('diastolic', 'Diastolic'),
+        ('glucose', 'Glucose (mg/dL)'),
+    )
+    OPERATOR_GTE = 'gte'
+    OPERATOR_LTE = 'lte'
+    OPERATORS = (
+        (OPERATOR_GTE, 'At or above'),
+        (OPERATOR_LTE, 'At or below'),
+    )
+    CONDITIONS = (
+        ('', 'Everyone'),
+        ('has_diabetes', 'Users with diabetes'),
+        ('has_hypertension', 'Users with hypertension'),
+    )
+
+    name = models.CharField(max_length=100)
+    metric = models.CharField(max_length=10, choices=METRICS)
+    operator = models.CharField(max_length=3, choices=OPERATORS, default=OPERATOR_GTE)
+    threshold = models.FloatField(help_text="Glucose thresholds are in mg/dL")
+    condition = models.CharField(max_length=20, choices=CONDITIONS, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='alert_rules',
+        null=True,
+        blank=True,
+        help_text="Per-user override; leave empty for a general rule"
+    )
+    window = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(50)],
+        help_text="Number of most recent readings considered"
+    )
+    min_count = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(50)],
+        help_text="Matching readings needed within the window"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def clean(self):
+        if self.min_count and self.window and self.min_count > self.window:
+            raise ValidationError("min_count cannot exceed window.")
+        if self.user_id and self.condition:
+            raise ValidationError("A rule applies to a user or to a condition, not both.")
+        super().clean()
+
+    def __str__(self) -> str:
+        return self.name
+
+    class Meta:
+        ordering = ['metric', 'threshold']
+        constraints = [
+            models.CheckConstraint(condition=Q(min_count__lte=models.F('window')), name='alertrule_min_count_lte_window'),
+        ]
+
+
+# -----------------------------
+# Alert Outbox
+# -----------------------------
+class Alert(models.Model):
+    """
+    Transactional outbox row for an abnormal-reading notification.
+    Inserted in the same transaction as the reading(s); delivered by process_alerts.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUSES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='alerts',
+        db_constraint=False,
+    )
+    readings = models.ManyToManyField(Reading, related_name='alerts', blank=True)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Alert {self.pk} to {self.recipient} ({self.status})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='alert_status_due_idx'),
+            models.Index(fields=['claim_token'], name='alert_claim_idx'),
+        ]
+
+
+# -----------------------------
+# Shard Directory
+# -----------------------------
+class UserShard(models.Model):
+    """
+    Database alias holding a user's readings, rollups, tombstones and alerts
+    when READING_SHARDS is set. Lives on the primary; see tracker.sharding.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard'
+    )
+    alias = models.CharField(max_length=64)
+    moving = models.BooleanField(default=False, help_text="Set while move_user copies the rows; writes are refused")
+    assigned_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.user_id} -> {self.alias}"
+
+
+# -----------------------------
+# Feature Store
+# -----------------------------
+class UserFeatures(models.Model):
+    """
+    A user's model-ready feature vector: FEATURE_NAMES in tracker.features,
+    packed as little-endian float64 (NaN where undefined). Lives on the primary
+    next to the profile and is kept current by tracker.features, so training
+    and inference never read raw readings. `revision` changes on every update.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='features'
+    )
+    version = models.PositiveSmallIntegerField(help_text="Feature schema version the vector was built with")
+    revision = models.BigIntegerField(default=0)
+    vector = models.BinaryField()
+    computed_on = models.DateField(help_text="Local day the rolling windows end on")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: features v{self.version} ({self.computed_on})"
+
+    class Meta:
+        verbose_name = "User features"
+        verbose_name_plural = "User features"
@@ -0,0 +1,156 @@
+import base64
+from collections import OrderedDict
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# -----------------------------
+# Keyset Pagination for Readings
+# -----------------------------
+class ReadingCursorPagination(BasePagination):
+    """
+    Keyset pagination over readings ordered by (-created_at, id).
+
+    Each cursor encodes the (created_at, id) of the row at the page boundary, so
+    every page is a range scan on the (user, -created_at, id) index instead of an
+    OFFSET that grows with the page number.
+    """
+    ordering = ('-created_at', 'id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'READING_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'READING_MAX_PAGE_SIZE', 500)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of paginate_queryset for the native async views."""
+        return self._finish_page([row async for row in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self._page_size = page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse, position = False, None
+        else:
+            reverse, position = cursor
+
+        if position is None:
+            queryset = queryset.order_by(*self.ordering)
+        elif reverse:
+            # Walk backwards from the first row of the current page.
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk)
+            ).order_by('created_at', '-id')
+        else:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by(*self.ordering)
+
+        self._reverse, self._position = reverse, position
+        return queryset[:page_size + 1]
+
+    def _finish_page(self, results):
+        page_size, reverse, position = self._page_size, self._reverse, self._position
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = tokens['r'][0] == '1'
+            created_at = parse_datetime(tokens['t'][0])
+            pk = int(tokens['i'][0])
+            if created_at is None:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, (created_at, pk)
+
+    def encode_cursor(self, reverse, reading):
+        # Pages may hold model instances or .values() dicts (fast read path).
+        if isinstance(reading, dict):
+            created_at, pk = reading['created_at'], reading['id']
+        else:
+            created_at, pk = reading.created_at, reading.pk
+        tokens = OrderedDict([
+            ('r', '1' if reverse else '0'),
+            ('t', created_at.isoformat()),
+            ('i', str(pk)),
+        ])
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = base64.urlsafe_b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
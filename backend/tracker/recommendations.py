@@ -0,0 +1,349 @@
+"""
+Personalized recommendations served from the feature store.
+
+The model is a set of independent logistic scorers, one per recommendation,
+over the standardized UserFeatures vector. Scoring a batch is one matrix
+product on the CPU. The artifact is an .npz file (see LinearModel.save) named
+by RECOMMENDATION_MODEL_PATH; without one, a small hand-weighted stand-in model
+is used. wsgi.py and asgi.py call `preload()`, so each worker loads the model
+once at startup rather than on a request.
+
+A request never scans readings and rarely waits on the model:
+1. `get_features` gives the user's feature row, usually one primary-key read.
+2. A process-local LRU cache holds one payload per user, valid for that row's
+   revision and the loaded model for RECOMMENDATION_CACHE_TTL seconds. Any
+   reading or profile change gives the row a new revision, so a changed
+   history is never answered from the cache.
+3. On a miss the vector is handed to the MicroBatcher. Its thread gathers the
+   vectors submitted within RECOMMENDATION_BATCH_WAIT_MS (up to
+   RECOMMENDATION_BATCH_SIZE) and scores them in one predict call. A request
+   waits at most RECOMMENDATION_TIMEOUT_SECONDS, then answers 503.
+NumPy is required; without it the endpoint answers 503.
+"""
+import asyncio
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import features
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; recommendations are unavailable without it.
+    np = None
+
+# Stand-in model: (code, title, {feature: weight on its z-score}, bias)
+STAND_IN_RECOMMENDATIONS = (
+    ('review_blood_pressure', "Talk to your doctor about your blood pressure",
+     {'systolic_mean_30d': 2.0, 'diastolic_mean_30d': 1.0, 'has_hypertension': 0.5}, -1.5),
+    ('review_glucose', "Review your glucose management plan",
+     {'glucose_mean_30d': 2.0, 'glucose_sd_30d': 0.5, 'has_diabetes': 0.5}, -1.5),
+    ('measure_regularly', "Take your readings more regularly",
+     {'readings_per_day_30d': -1.5, 'active_days_30d': -1.0}, -0.5),
+    ('healthy_weight', "Work towards a healthy weight", {'bmi': 2.0}, -1.5),
+    ('steady_readings', "Keep your measurement routine consistent",
+     {'systolic_sd_30d': 1.5, 'diastolic_sd_30d': 1.0}, -2.0),
+)
+# Stand-in model: (center, spread) each feature is standardized with
+STAND_IN_SCALING = {
+    'systolic_mean_7d': (125.0, 15.0), 'diastolic_mean_7d': (80.0, 10.0), 'glucose_mean_7d': (110.0, 30.0),
+    'systolic_mean_30d': (125.0, 15.0), 'diastolic_mean_30d': (80.0, 10.0), 'glucose_mean_30d': (110.0, 30.0),
+    'systolic_sd_30d': (8.0, 4.0), 'diastolic_sd_30d': (6.0, 3.0), 'glucose_sd_30d': (20.0, 10.0),
+    'readings_per_day_30d': (1.0, 0.75), 'active_days_30d': (15.0, 8.0),
+    'bmi': (26.0, 4.0), 'age': (50.0, 15.0), 'has_diabetes': (0.5, 0.5), 'has_hypertension': (0.5, 0.5),
+}
+
+
+class RecommendationsUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Recommendations are temporarily unavailable."
+    default_code = 'recommendations_unavailable'
+
+
+def available():
+    return np is not None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# -----------------------------
+# Model
+# -----------------------------
+class LinearModel:
+    """Independent logistic scores per recommendation over standardized feature vectors."""
+
+    def __init__(self, name, codes, titles, weights, bias, center, spread):
+        self.name = name
+        self.codes = list(codes)
+        self.titles = list(titles)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.spread = np.asarray(spread, dtype=np.float64)
+        if self.weights.shape != (len(self.codes), features.WIDTH):
+            raise ImproperlyConfigured(
+                f"Recommendation model {name} expects {self.weights.shape[1]} features, not {features.WIDTH}."
+            )
+
+    def predict(self, matrix):
+        """Scores in [0, 1], shape (rows, recommendations), for an (rows, WIDTH) matrix."""
+        # Undefined features (NaN) sit at the center, i.e. contribute nothing.
+        standardized = np.nan_to_num((matrix - self.center) / self.spread, nan=0.0)
+        return 1.0 / (1.0 + np.exp(-(standardized @ self.weights.T + self.bias)))
+
+    def save(self, path):
+        np.savez(
+            path, name=self.name, feature_names=np.array(features.FEATURE_NAMES),
+            codes=np.array(self.codes), titles=np.array(self.titles),
+            weights=self.weights, bias=self.bias, center=self.center, spread=self.spread,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as artifact:
+            if tuple(artifact['feature_names'].tolist()) != features.FEATURE_NAMES:
+                raise ImproperlyConfigured(
+                    f"Recommendation model {path} was trained on other features than version "
+                    f"{features.FEATURE_VERSION} of the feature store."
+                )
+            return cls(
+                str(artifact['name']), artifact['codes'].tolist(), artifact['titles'].tolist(),
+                artifact['weights'], artifact['bias'], artifact['center'], artifact['spread'],
+            )
+
+
+def stand_in_model():
+    """The built-in model used when RECOMMENDATION_MODEL_PATH is not set."""
+    index = {name: position for position, name in enumerate(features.FEATURE_NAMES)}
+    weights = np.zeros((len(STAND_IN_RECOMMENDATIONS), features.WIDTH))
+    for row, (_, _, coefficients, _) in enumerate(STAND_IN_RECOMMENDATIONS):
+        for name, weight in coefficients.items():
+            weights[row, index[name]] = weight
+    return LinearModel(
+        f"stand-in-v{features.FEATURE_VERSION}",
+        [code for code, *_ in STAND_IN_RECOMMENDATIONS],
+        [title for _, title, *_ in STAND_IN_RECOMMENDATIONS],
+        weights,
+        [bias for *_, bias in STAND_IN_RECOMMENDATIONS],
+        [STAND_IN_SCALING[name][0] for name in features.FEATURE_NAMES],
+        [STAND_IN_SCALING[name][1] for name in features.FEATURE_NAMES],
+    )
+
+
+_model_lock = threading.Lock()
+_loaded = {'model': None}
+
+
+def get_model():
+    """The worker's model, loaded on first use (normally by preload at startup)."""
+    if not available():
+        raise RecommendationsUnavailable("Recommendations require numpy, which is not installed.")
+    with _model_lock:
+        if _loaded['model'] is None:
+            path = _setting('RECOMMENDATION_MODEL_PATH', None)
+            _loaded['model'] = LinearModel.load(path) if path else stand_in_model()
+        return _loaded['model']
+
+
+def preload():
+    """Load the model at worker startup when NumPy is installed."""
+    if available():
+        get_model()
+
+
+# -----------------------------
+# Micro-batching
+# -----------------------------
+class MicroBatcher:
+    """
+    Collect rows submitted from concurrent requests and score them with one
+    vectorized `predict` call on a background thread. The thread is started on
+    first use, so each forked worker runs its own.
+    """
+
+    def __init__(self, predict, max_batch=64, max_wait=0.002):
+        self._predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, row) -> Future:
+        """Queue one feature row; the future resolves to its row of scores."""
+        future = Future()
+        self._queue.put((row, future))
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='recommendation-batcher', daemon=True)
+                    self._thread.start()
+        return future
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [(row, future) for row, future in items if future.set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            if not items:
+                continue
+            try:
+                scores = self._predict(np.vstack([row for row, _ in items]))
+            except Exception as exc:
+                for _, future in items:
+                    future.set_exception(exc)
+            else:
+                for (_, future), row in zip(items, scores):
+                    future.set_result(row)
+
+
+def _predict(matrix):
+    return get_model().predict(matrix)
+
+
+_batcher_lock = threading.Lock()
+_batcher = {'instance': None}
+
+
+def get_batcher():
+    with _batcher_lock:
+        if _batcher['instance'] is None:
+            _batcher['instance'] = MicroBatcher(
+                _predict,
+                max_batch=_setting('RECOMMENDATION_BATCH_SIZE', 64),
+                max_wait=_setting('RECOMMENDATION_BATCH_WAIT_MS', 2) / 1000,
+            )
+        return _batcher['instance']
+
+
+# -----------------------------
+# Result cache
+# -----------------------------
+class ResultCache:
+    """Thread-safe LRU of one (revision, model, expiry, payload) entry per user."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, revision, model_name):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[:2] != (revision, model_name) or entry[2] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[3]
+
+    def set(self, user_id, revision, model_name, payload):
+        with self._lock:
+            self._entries[user_id] = (revision, model_name, time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+results = ResultCache(
+    maxsize=_setting('RECOMMENDATION_CACHE_SIZE', 10000),
+    ttl=_setting('RECOMMENDATION_CACHE_TTL', 3600),
+)
+
+
+def forget(user_id):
+    """Drop this worker's cached recommendations for `user_id` (other workers miss on the revision)."""
+    results.discard(user_id)
+
+
+# -----------------------------
+# Entry Points
+# -----------------------------
+def _prepare(user):
+    """(user's UserFeatures, model, cached payload or None)."""
+    model = get_model()
+    row = features.get_features(user)
+    return row, model, results.get(user.pk, row.revision, model.name)
+
+
+def _payload(model, row, scores):
+    minimum = _setting('RECOMMENDATION_MIN_SCORE', 0.5)
+    ranked = sorted(
+        (
+            {'code': code, 'title': title, 'score': round(float(score), 3)}
+            for code, title, score in zip(model.codes, model.titles, scores)
+            if not math.isnan(score) and score >= minimum
+        ),
+        key=lambda item: item['score'], reverse=True,
+    )
+    return {
+        'model': model.name,
+        'feature_version': row.version,
+        'features_computed_on': row.computed_on.isoformat(),
+        'recommendations': ranked[:_setting('RECOMMENDATION_LIMIT', 5)],
+    }
+
+
+def _submit(row):
+    return get_batcher().submit(np.frombuffer(bytes(row.vector), dtype='<f8'))
+
+
+def get_recommendations(user) -> dict:
+    row, model, payload = _prepare(user)
+    if payload is None:
+        future = _submit(row)
+        try:
+            scores = future.result(timeout=_setting('RECOMMENDATION_TIMEOUT_SECONDS', 1.0))
+        except TimeoutError:
+            future.cancel()
+            raise RecommendationsUnavailable()
+        payload = _payload(model, row, scores)
+        results.set(user.pk, row.revision, model.name, payload)
+    return payload
+
+
+async def aget_recommendations(user) -> dict:
+    """Async counterpart of get_recommendations; awaits the batch without holding a thread."""
+    row, model, payload = await sync_to_async(_prepare)(user)
+    if payload is None:
+        try:
+            scores = await asyncio.wait_for(
+                asyncio.wrap_future(_submit(row)), _setting('RECOMMENDATION_TIMEOUT_SECONDS', 1.0)
+            )
+        except asyncio.TimeoutError:
+            raise RecommendationsUnavailable()
+        payload = _payload(model, row, scores)
+        results.set(user.pk, row.revision, model.name, payload)
+    return payload
@@ -0,0 +1,113 @@
+import json
+import math
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stock JSON renderer.
+    orjson = None
+
+
+# -----------------------------
+# Export Renderers
+# -----------------------------
+class ExportRenderer(BaseRenderer):
+    """
+    The export action streams its own body, so these renderers only let DRF's
+    content negotiation accept ?format=csv / ?format=ndjson. They render error
+    payloads (401, 403, ...) as plain JSON text.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data).encode(self.charset)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+# -----------------------------
+# Fast JSON Renderers
+# -----------------------------
+# Floats orjson writes differently from repr(): exponents ("1e16" for "1e+16",
+# "1.5e-7" for "1.5e-07") and small values without one ("0.00001" for "1e-05").
+# Collapsing digits 1-9 to "1" lets plain substring searches find both; strings
+# can match too, and those payloads just take the stock path.
+_DIGITS = bytes.maketrans(b'23456789E', b'11111111e')
+
+
+def _floats_differ(ret):
+    if b'0.0000' in ret:
+        return True
+    collapsed = ret.translate(_DIGITS)
+    return b'0e' in collapsed or b'1e' in collapsed
+
+
+def _has_non_finite(data):
+    """Whether `data` holds a NaN or infinite float; scalars are checked without a push."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, (list, tuple)):
+            if type(value) is float and not math.isfinite(value):
+                return True
+            continue
+        for item in value:
+            kind = type(item)
+            if kind is float:
+                if not math.isfinite(item):
+                    return True
+            elif item is not None and kind is not str and kind is not int and kind is not bool:
+                stack.append(item)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for JSONRenderer that encodes with orjson when installed.
+    Produces the same bytes: payloads orjson would encode differently (big ints,
+    NaN or Infinity, some floats) are rendered by JSONRenderer instead. Those
+    checks cost part of the gain, so it is opt-in: clients ask for it with
+    FastJSONVendorRenderer's media type, or list it first in
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Indented output is only requested by API browsers; keep the stock path there.
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Dates and times go through DRF's encoder ("Z", millisecond precision),
+        # and non-str keys are stringified as json.dumps does.
+        try:
+            ret = orjson.dumps(
+                data, default=JSONEncoder().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            # Ints beyond 64 bits, lone surrogates or unknown types: let the stock encoder decide.
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson writes NaN and Infinity as null where JSONRenderer refuses them.
+        if _floats_differ(ret) or (b'null' in ret and _has_non_finite(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer for JavaScript (see its render()).
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONVendorRenderer(FastJSONRenderer):
+    """Lets a client opt into the fast renderer with Accept: application/vnd.tracker.fast+json."""
+    media_type = 'application/vnd.tracker.fast+json'
+    format = 'fastjson'
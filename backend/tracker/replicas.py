@@ -0,0 +1,123 @@
+"""
+Primary/replica database routing with read-your-writes stickiness.
+
+Writes always go to the primary (`default`). Reads go to the primary unless the
+current context has picked a replica. ReplicaReadMixin does that for
+safe-method API requests, and the async read views do the same. Within that
+context every ORM read, ReadingManager queries included, is served by one
+replica from settings.DATABASE_REPLICAS, chosen at random per request. Adding
+replica aliases scales read throughput horizontally.
+
+After a user's successful write, their reads stay on the primary for
+REPLICA_STICKY_SECONDS. This keeps replica lag from hiding a reading they have
+just saved. The pin lives in the cache, so it only holds across workers when
+the cache is shared; with a per-process cache (LocMemCache) every read stays
+on the primary instead (see tokens.cache_is_shared).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+_read_alias = ContextVar('tracker_read_alias', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def _read_replicas():
+    """Replicas reads may use: none unless other workers can see the pin."""
+    from .tokens import cache_is_shared
+    return replica_aliases() if cache_is_shared() else []
+
+
+def _pin_key(user_id):
+    return f"tracker:primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Keep `user_id`'s reads on the primary for REPLICA_STICKY_SECONDS."""
+    if _read_replicas():
+        cache.set(_pin_key(user_id), True, timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+
+
+def choose_read_alias(user_id):
+    """Return a replica alias for this user's reads, or None to stay on the primary."""
+    replicas = _read_replicas()
+    if not replicas or cache.get(_pin_key(user_id)):
+        return None
+    return random.choice(replicas)
+
+
+async def achoose_read_alias(user_id):
+    replicas = _read_replicas()
+    if not replicas or await cache.aget(_pin_key(user_id)):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def read_from(alias):
+    """Route ORM reads in this block to `alias` (None keeps them on the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        if db in replica_aliases():
+            return False
+        return None
+
+
+# -----------------------------
+# Viewset Mixin
+# -----------------------------
+class ReplicaReadMixin:
+    """
+    Serve safe-method requests from a replica unless the user is pinned to the
+    primary, and pin the user after a successful write.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Also reached when the view raises past DRF's exception handling.
+            if self._replica_token is not None:
+                _read_alias.reset(self._replica_token)
+                self._replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and request.user.is_authenticated:
+            alias = choose_read_alias(request.user.pk)
+            if alias is not None:
+                self._replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
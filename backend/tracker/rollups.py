@@ -0,0 +1,196 @@
+"""
+Incremental maintenance of the per-user day / ISO-week ReadingRollup tables.
+
+Creating readings folds them into their buckets with a single UPDATE per bucket.
+Updates and deletes can't reverse a min/max, so they re-aggregate the affected day
+from raw readings (one indexed range scan) and the week from its day rollups.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError
+from django.db.models import Count, F, FloatField, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+
+from .models import Reading, ReadingRollup
+from . import sharding
+
+STAT_FIELDS = ['count'] + [
+    f"{metric}_{stat}"
+    for metric in ReadingRollup.METRICS
+    for stat in ('min', 'max', 'sum', 'sum_sq')
+]
+
+
+def _metric_values(reading):
+    return {
+        'systolic': float(reading.systolic),
+        'diastolic': float(reading.diastolic),
+        'glucose': float(reading.glucose_mg_dl),
+    }
+
+
+def reading_day(reading) -> datetime.date:
+    return timezone.localtime(reading.created_at).date()
+
+
+def period_start(bucket: str, day: datetime.date) -> datetime.date:
+    if bucket == ReadingRollup.BUCKET_WEEK:
+        return day - datetime.timedelta(days=day.weekday())
+    return day
+
+
+def _raw_aggregates():
+    aggregates = {'count': Count('id')}
+    columns = {'systolic': F('systolic'), 'diastolic': F('diastolic'), 'glucose': F('glucose_mg_dl')}
+    for metric, column in columns.items():
+        aggregates[f"{metric}_min"] = Min(column, output_field=FloatField())
+        aggregates[f"{metric}_max"] = Max(column, output_field=FloatField())
+        aggregates[f"{metric}_sum"] = Sum(column, output_field=FloatField())
+        aggregates[f"{metric}_sum_sq"] = Sum(column * column, output_field=FloatField())
+    return aggregates
+
+
+def _rollup_aggregates():
+    aggregates = {'count': Sum('count')}
+    for metric in ReadingRollup.METRICS:
+        aggregates[f"{metric}_min"] = Min(f"{metric}_min")
+        aggregates[f"{metric}_max"] = Max(f"{metric}_max")
+        aggregates[f"{metric}_sum"] = Sum(f"{metric}_sum")
+        aggregates[f"{metric}_sum_sq"] = Sum(f"{metric}_sum_sq")
+    return aggregates
+
+
+def _day_bounds(start: datetime.date, days: int):
+    tz = timezone.get_current_timezone()
+    lower = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min), tz)
+    upper = timezone.make_aware(datetime.datetime.combine(start + datetime.timedelta(days=days), datetime.time.min), tz)
+    return lower, upper
+
+
+# -----------------------------
+# Incremental updates
+# -----------------------------
+def apply_readings(readings):
+    """Fold newly created readings into their day and week rollups."""
+    deltas = defaultdict(lambda: {'count': 0})
+    for reading in readings:
+        day = reading_day(reading)
+        values = _metric_values(reading)
+        for bucket in (ReadingRollup.BUCKET_DAY, ReadingRollup.BUCKET_WEEK):
+            delta = deltas[(reading.user_id, bucket, period_start(bucket, day))]
+            delta['count'] += 1
+            for metric, value in values.items():
+                delta[f"{metric}_min"] = min(delta.get(f"{metric}_min", value), value)
+                delta[f"{metric}_max"] = max(delta.get(f"{metric}_max", value), value)
+                delta[f"{metric}_sum"] = delta.get(f"{metric}_sum", 0.0) + value
+                delta[f"{metric}_sum_sq"] = delta.get(f"{metric}_sum_sq", 0.0) + value * value
+
+    for (user_id, bucket, start), delta in deltas.items():
+        _merge(user_id, bucket, start, delta)
+
+
+def _merge(user_id, bucket, start, delta):
+    updates = {'count': F('count') + delta['count']}
+    for metric in ReadingRollup.METRICS:
+        low, high = delta[f"{metric}_min"], delta[f"{metric}_max"]
+        updates[f"{metric}_min"] = Least(Coalesce(F(f"{metric}_min"), Value(low)), Value(low))
+        updates[f"{metric}_max"] = Greatest(Coalesce(F(f"{metric}_max"), Value(high)), Value(high))
+        updates[f"{metric}_sum"] = F(f"{metric}_sum") + delta[f"{metric}_sum"]
+        updates[f"{metric}_sum_sq"] = F(f"{metric}_sum_sq") + delta[f"{metric}_sum_sq"]
+    updates['updated_at'] = timezone.now()
+
+    rows = ReadingRollup.objects.filter(user_id=user_id, bucket=bucket, period_start=start)
+    if rows.update(**updates):
+        return
+    try:
+        with sharding.atomic():
+            ReadingRollup.objects.create(user_id=user_id, bucket=bucket, period_start=start, **delta)
+    except IntegrityError:
+        # Another writer created the bucket first; fold into it instead.
+        rows.update(**updates)
+
+
+def _store(user_id, bucket, start, stats):
+    if not stats.get('count'):
+        ReadingRollup.objects.filter(user_id=user_id, bucket=bucket, period_start=start).delete()
+        return
+    ReadingRollup.objects.update_or_create(
+        user_id=user_id, bucket=bucket, period_start=start,
+        defaults={field: stats[field] for field in STAT_FIELDS},
+    )
+
+
+def refresh_days(user_id, days):
+    """Re-aggregate the given days (and their weeks) for one user from raw readings."""
+    days = set(days)
+    for day in days:
+        lower, upper = _day_bounds(day, 1)
+        stats = Reading.objects.filter(
+            user_id=user_id, created_at__gte=lower, created_at__lt=upper
+        ).aggregate(**_raw_aggregates())
+        _store(user_id, ReadingRollup.BUCKET_DAY, day, stats)
+
+    for week in {period_start(ReadingRollup.BUCKET_WEEK, day) for day in days}:
+        stats = ReadingRollup.objects.filter(
+            user_id=user_id,
+            bucket=ReadingRollup.BUCKET_DAY,
+            period_start__gte=week,
+            period_start__lt=week + datetime.timedelta(days=7),
+        ).aggregate(**_rollup_aggregates())
+        _store(user_id, ReadingRollup.BUCKET_WEEK, week, stats)
+
+
+# -----------------------------
+# Full rebuild
+# -----------------------------
+def rebuild(user_ids=None, batch_size=1000):
+    """Discard and recompute rollups for `user_ids` (or every user) from raw readings."""
+    for alias in sharding.all_shards():
+        with sharding.on_shard(alias):
+            _rebuild_shard(user_ids, batch_size)
+
+
+def _rebuild_shard(user_ids, batch_size):
+    readings = Reading.objects.all()
+    rollups = ReadingRollup.objects.all()
+    if user_ids is not None:
+        readings = readings.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    day_rows = (
+        readings.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(**_raw_aggregates())
+    )
+
+    with sharding.atomic():
+        rollups.delete()
+        days, weeks = [], defaultdict(lambda: {'count': 0})
+        for row in day_rows.iterator(chunk_size=batch_size):
+            stats = {field: row[field] for field in STAT_FIELDS}
+            days.append(ReadingRollup(
+                user_id=row['user_id'], bucket=ReadingRollup.BUCKET_DAY, period_start=row['day'], **stats
+            ))
+            week = weeks[(row['user_id'], period_start(ReadingRollup.BUCKET_WEEK, row['day']))]
+            week['count'] += stats['count']
+            for metric in ReadingRollup.METRICS:
+                for stat, combine in (('min', min), ('max', max)):
+                    key = f"{metric}_{stat}"
+                    week[key] = stats[key] if key not in week else combine(week[key], stats[key])
+                for stat in ('sum', 'sum_sq'):
+                    key = f"{metric}_{stat}"
+                    week[key] = week.get(key, 0.0) + stats[key]
+            if len(days) >= batch_size:
+                ReadingRollup.objects.bulk_create(days)
+                days = []
+        ReadingRollup.objects.bulk_create(days, batch_size=batch_size)
+        ReadingRollup.objects.bulk_create(
+            [
+                ReadingRollup(user_id=user_id, bucket=ReadingRollup.BUCKET_WEEK, period_start=start, **stats)
+                for (user_id, start), stats in weeks.items()
+            ],
+            batch_size=batch_size,
+        )
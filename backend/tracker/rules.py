@@ -0,0 +1,231 @@
+"""
+Alert rule engine.
+
+AlertRule rows are compiled once into a RuleSet. The RuleSet stays in process
+memory and is reloaded when the version key in the shared cache changes.
+Saving or deleting a rule bumps that key. For each user the RuleSet resolves
+which rules apply, per metric: user override, then condition, then everyone.
+It memoizes the result per user profile.
+
+The same compiled rules drive both sides of alerting:
+- `evaluate(readings)` runs them as Python predicates over new readings. It
+  handles one reading on write, or a whole bulk or backfill batch in a single
+  pass per user. Sustained rules read the few readings before the batch with
+  one query; instant-only rule sets need no query at all.
+- `RuleSet.filter_flagged` turns them into ORM conditions, using window
+  functions for sustained rules. ReadingManager.abnormal_readings uses it, so
+  the abnormal query and the alerts always agree.
+"""
+import operator
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, IntegerField, Q, Sum, Value, When, Window
+from django.db.models.expressions import RowRange
+
+from .models import AlertRule, Reading
+
+VERSION_KEY = 'tracker:alert-rules:version'
+
+# Reading column each rule metric is evaluated against
+FIELDS = {'systolic': 'systolic', 'diastolic': 'diastolic', 'glucose': 'glucose_mg_dl'}
+_COMPARE = {AlertRule.OPERATOR_GTE: operator.ge, AlertRule.OPERATOR_LTE: operator.le}
+
+
+class CompiledRule:
+    """An AlertRule reduced to what evaluation needs."""
+    __slots__ = ('pk', 'name', 'field', 'lookup', 'threshold', 'window', 'min_count', '_compare')
+
+    def __init__(self, rule):
+        self.pk = rule.pk
+        self.name = rule.name
+        self.field = FIELDS[rule.metric]
+        self.lookup = rule.operator
+        self.threshold = rule.threshold
+        self.window = rule.window
+        self.min_count = rule.min_count
+        self._compare = _COMPARE[rule.operator]
+
+    @property
+    def sustained(self):
+        return self.window > 1
+
+    def matches(self, value):
+        return value is not None and self._compare(value, self.threshold)
+
+    def q(self):
+        return Q(**{f"{self.field}__{self.lookup}": self.threshold})
+
+
+class RuleSet:
+    """Active rules indexed by scope, with per-profile resolution memoized."""
+
+    def __init__(self, rules):
+        self._general, self._conditions, self._users = {}, {}, {}
+        for rule in rules:
+            if rule.user_id:
+                scope = self._users.setdefault(rule.user_id, {})
+            elif rule.condition:
+                scope = self._conditions.setdefault(rule.condition, {})
+            else:
+                scope = self._general
+            scope.setdefault(rule.metric, []).append(CompiledRule(rule))
+        self._resolved = {}
+
+    def for_user(self, user):
+        """The rules that apply to `user`, most specific scope per metric."""
+        conditions = tuple(condition for condition in self._conditions if getattr(user, condition, False))
+        overrides = self._users.get(user.pk)
+        key = (user.pk if overrides else None, conditions)
+        rules = self._resolved.get(key)
+        if rules is None:
+            rules = []
+            for metric, _ in AlertRule.METRICS:
+                if overrides and metric in overrides:
+                    rules.extend(overrides[metric])
+                elif any(metric in self._conditions[condition] for condition in conditions):
+                    for condition in conditions:
+                        rules.extend(self._conditions[condition].get(metric, ()))
+                else:
+                    rules.extend(self._general.get(metric, ()))
+            self._resolved[key] = rules = tuple(rules)
+        return rules
+
+    def filter_flagged(self, queryset, user):
+        """
+        Restrict a queryset of `user`'s readings to those their rules flag.
+        Sustained rules count over `queryset` as given; filters added to the
+        result later (pagination cursors) do not shrink their windows.
+        """
+        rules = self.for_user(user)
+        if not rules:
+            return queryset.none()
+
+        condition, windows = Q(), {}
+        for rule in rules:
+            if not rule.sustained:
+                condition |= rule.q()
+                continue
+            # Matching readings among this one and the window - 1 before it.
+            name = f"rule_hits_{len(windows)}"
+            windows[name] = Window(
+                Sum(Case(When(rule.q(), then=Value(1)), default=Value(0), output_field=IntegerField())),
+                partition_by=[F('user_id')],
+                order_by=[F('created_at').asc(), F('id').asc()],
+                frame=RowRange(start=-(rule.window - 1), end=0),
+            )
+            condition |= rule.q() & Q(**{f"{name}__gte": rule.min_count})
+        if not windows:
+            return queryset.filter(condition)
+        flagged = queryset.annotate(**windows).annotate(
+            rule_flagged=Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+        ).filter(rule_flagged=True)
+        # Select ids in a subquery, so later filters apply outside the window frames.
+        return queryset.filter(pk__in=flagged.order_by().values('pk'))
+
+
+# -----------------------------
+# Loading and invalidation
+# -----------------------------
+_lock = threading.Lock()
+_loaded = {'version': None, 'rule_set': None}
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted key never reuses an old version.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_rule_set():
+    """The compiled active rules, reloaded only after a rule changes."""
+    version = _current_version()
+    with _lock:
+        if _loaded['rule_set'] is None or _loaded['version'] != version:
+            _loaded['rule_set'] = RuleSet(AlertRule.objects.filter(is_active=True).order_by('id'))
+            _loaded['version'] = version
+        return _loaded['rule_set']
+
+
+async def aget_rule_set():
+    """Async counterpart of get_rule_set; a reload queries the database."""
+    return await sync_to_async(get_rule_set)()
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate():
+    """Make every process recompile its rule set."""
+    _bump_version()
+    # Again after commit, so a process that reloaded the old rules in between recompiles.
+    transaction.on_commit(_bump_version)
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+def _timeline(user, batch, rules):
+    """(id, created_at, *metric values) rows to scan for `batch`, oldest first."""
+    fields = tuple(FIELDS.values())
+    rows = {
+        reading.pk: (reading.pk, reading.created_at, *(getattr(reading, field) for field in fields))
+        for reading in batch
+    }
+    history = max(rule.window for rule in rules) - 1
+    if history:
+        first, last = batch[0], batch[-1]
+        readings = Reading.objects.for_user(user)
+        earlier = (
+            readings.filter(Q(created_at__lt=first.created_at) | Q(created_at=first.created_at, id__lt=first.pk))
+            .order_by('-created_at', '-id').values_list('id', 'created_at', *fields)[:history]
+        )
+        rows.update((row[0], row) for row in earlier)
+        if len(batch) > 1:
+            # Stored readings interleaved with a backfilled batch count too.
+            between = readings.filter(created_at__range=(first.created_at, last.created_at))
+            rows.update((row[0], row) for row in between.values_list('id', 'created_at', *fields))
+    return sorted(rows.values(), key=lambda row: (row[1], row[0]))
+
+
+def evaluate(readings):
+    """
+    Run the rules over saved readings of any users; return {reading id: [rule names]}
+    for the readings that at least one rule flags.
+    """
+    by_user = {}
+    for reading in readings:
+        by_user.setdefault(reading.user_id, []).append(reading)
+
+    rule_set = get_rule_set()
+    positions = {field: index for index, field in enumerate(FIELDS.values(), start=2)}
+    flagged = {}
+    for batch in by_user.values():
+        user = batch[0].user
+        rules = rule_set.for_user(user)
+        if not rules:
+            continue
+        batch.sort(key=lambda reading: (reading.created_at, reading.pk))
+        wanted = {reading.pk for reading in batch}
+        recent = [deque(maxlen=rule.window) for rule in rules]
+        for row in _timeline(user, batch, rules):
+            matched = []
+            for rule, hits in zip(rules, recent):
+                hit = rule.matches(row[positions[rule.field]])
+                hits.append(hit)
+                if hit and sum(hits) >= rule.min_count:
+                    matched.append(rule.name)
+            if matched and row[0] in wanted:
+                flagged[row[0]] = matched
+    return flagged
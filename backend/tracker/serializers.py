@@ -1,11 +1,30 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from .models import User, Reading
+from .models import User, Reading, ReadingRollup
+from .instrumentation import timer
+from . import tokens
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import UntypedToken
 import re
 
 
-class UserSerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """Count time spent producing `.data` toward the request's serializer timing."""
+    @property
+    def data(self):
+        with timer('serializer'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for User model with validation for personal information.
     """
@@ -19,8 +38,10 @@ class UserSerializer(serializers.ModelSerializer):
             'date_joined'
         ]
         read_only_fields = ['id', 'date_joined', 'full_name']
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {
-            'email': {'required': True},
+            # validate_email checks uniqueness (case-insensitively); drop the model's UniqueValidator.
+            'email': {'required': True, 'validators': []},
             'first_name': {'required': True},
             'last_name': {'required': True},
         }
@@ -29,9 +50,9 @@ class UserSerializer(serializers.ModelSerializer):
         """Validate email format and uniqueness."""
         if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', value):
             raise serializers.ValidationError("Invalid email format")
-        if User.objects.filter(email=value).exclude(id=self.instance.id if self.instance else None).exists():
+        if User.objects.email_exists(value, exclude_pk=self.instance.pk if self.instance else None):
             raise serializers.ValidationError("Email already exists")
-        return value
+        return User.objects.normalize_email(value)
 
     def validate_age(self, value):
         """Validate age is within realistic range."""
@@ -60,25 +81,26 @@ class UserSerializer(serializers.ModelSerializer):
         return data
 
 
-class ReadingSerializer(serializers.ModelSerializer):
+class ReadingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Reading model with calculated fields and validation.
     """
-    blood_pressure_category = serializers.SerializerMethodField()
+    blood_pressure_category = serializers.CharField(source='bp_category', read_only=True)
     glucose_mmol = serializers.SerializerMethodField()
-    glucose_mg = serializers.SerializerMethodField()
+    glucose_mg = serializers.FloatField(source='glucose_mg_dl', read_only=True)
 
     class Meta:
         model = Reading
         fields = [
             'id', 'user', 'systolic', 'diastolic', 'glucose_level',
             'glucose_unit', 'notes', 'created_at', 'updated_at',
-            'blood_pressure_category', 'glucose_mmol', 'glucose_mg'
+            'blood_pressure_category', 'glucose_mmol', 'glucose_mg', 'anomaly_score'
         ]
         read_only_fields = [
             'id', 'created_at', 'updated_at',
-            'blood_pressure_category', 'glucose_mmol', 'glucose_mg'
+            'blood_pressure_category', 'glucose_mmol', 'glucose_mg', 'anomaly_score'
         ]
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {
             'user': {'required': True},
             'systolic': {'required': True},
@@ -115,28 +137,105 @@ class ReadingSerializer(serializers.ModelSerializer):
                 })
         return data
 
-    def get_blood_pressure_category(self, obj):
-        if obj.systolic is None or obj.diastolic is None:
-            return None
-        return obj.get_blood_pressure_category()
-
     def get_glucose_mmol(self, obj):
         if obj.glucose_level is None:
             return None
         return obj.get_glucose_in_mmol_l()
 
-    def get_glucose_mg(self, obj):
-        if obj.glucose_level is None:
-            return None
-        return obj.get_glucose_in_mg_dl()
-
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
         return instance
 
-class RegisterSerializer(serializers.ModelSerializer):
+class FastReadingSerializer:
+    """
+    Read-only fast path producing the same output as ReadingSerializer straight from
+    `.values(*FastReadingSerializer.values_fields)` rows, skipping DRF's per-field
+    to_representation dispatch. Used by the reading list endpoints.
+    """
+    values_fields = (
+        'id', 'user_id', 'systolic', 'diastolic', 'glucose_level', 'glucose_unit', 'notes',
+        'created_at', 'updated_at', 'bp_category', 'glucose_mg_dl', 'anomaly_score',
+    )
+
+    @staticmethod
+    def _format_datetime(value, tz):
+        # Mirrors rest_framework.fields.DateTimeField with the default ISO 8601 format.
+        if not value:
+            return None
+        if tz is not None:
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    @classmethod
+    def serialize(cls, rows):
+        with timer('serializer'):
+            return cls._serialize(rows)
+
+    @classmethod
+    def _serialize(cls, rows):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        format_datetime = cls._format_datetime
+        output = []
+        for row in rows:
+            glucose = row['glucose_level']
+            if glucose is not None and row['glucose_unit'] == 'mg/dL':
+                glucose_mmol = round(glucose / 18.0, 2)
+            else:
+                glucose_mmol = glucose
+            output.append({
+                'id': row['id'],
+                'user': row['user_id'],
+                'systolic': row['systolic'],
+                'diastolic': row['diastolic'],
+                'glucose_level': float(glucose) if glucose is not None else None,
+                'glucose_unit': row['glucose_unit'],
+                'notes': row['notes'],
+                'created_at': format_datetime(row['created_at'], tz),
+                'updated_at': format_datetime(row['updated_at'], tz),
+                'blood_pressure_category': row['bp_category'],
+                'glucose_mmol': glucose_mmol,
+                'glucose_mg': float(row['glucose_mg_dl']) if row['glucose_mg_dl'] is not None else None,
+                'anomaly_score': row['anomaly_score'],
+            })
+        return output
+
+class ReadingRollupSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Read-only serializer for day/week trend buckets with per-metric summary statistics.
+    """
+    systolic = serializers.SerializerMethodField()
+    diastolic = serializers.SerializerMethodField()
+    glucose_mg = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReadingRollup
+        fields = ['bucket', 'period_start', 'count', 'systolic', 'diastolic', 'glucose_mg']
+        read_only_fields = fields
+        list_serializer_class = TimedListSerializer
+
+    def _summary(self, obj, metric):
+        return {
+            'min': getattr(obj, f"{metric}_min"),
+            'max': getattr(obj, f"{metric}_max"),
+            'mean': obj.mean(metric),
+            'std_dev': obj.std_dev(metric),
+        }
+
+    def get_systolic(self, obj):
+        return self._summary(obj, 'systolic')
+
+    def get_diastolic(self, obj):
+        return self._summary(obj, 'diastolic')
+
+    def get_glucose_mg(self, obj):
+        return self._summary(obj, 'glucose')
+
+class RegisterSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for registering a new user.
     Validates user input, ensures password confirmation, and creates a user with hashed password.
@@ -160,7 +259,8 @@ class RegisterSerializer(serializers.ModelSerializer):
             'age', 'weight', 'height', 'has_diabetes', 'has_hypertension'
         )
         extra_kwargs = {
-            'email': {'required': True},
+            # validate_email checks uniqueness (case-insensitively); drop the model's UniqueValidator.
+            'email': {'required': True, 'validators': []},
             'first_name': {'required': True},
             'last_name': {'required': True},
             'age': {'required': False},
@@ -174,9 +274,9 @@ class RegisterSerializer(serializers.ModelSerializer):
         """Validate email format and uniqueness."""
         if not re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', value):
             raise serializers.ValidationError("Please enter a valid email address.")
-        if User.objects.filter(email__iexact=value).exists():
+        if User.objects.email_exists(value):
             raise serializers.ValidationError("This email is already registered.")
-        return value.lower()
+        return User.objects.normalize_email(value)
 
     def validate_age(self, value):
         """Validate age is within a realistic range."""
@@ -249,4 +349,21 @@ class RegisterSerializer(serializers.ModelSerializer):
         """Customize the response to exclude sensitive fields."""
         from .serializers import UserSerializer  # Avoid circular import
         serializer = UserSerializer(instance)
-        return serializer.data
\ No newline at end of file
+        return serializer.data
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refresh serializer whose blacklist check skips the database for tokens the
+    blacklist Bloom filter has never seen.
+    """
+    token_class = tokens.TrackerRefreshToken
+
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        if jwt_settings.BLACKLIST_AFTER_ROTATION and tokens.membership.is_blacklisted(
+            token.get(jwt_settings.JTI_CLAIM)
+        ):
+            raise serializers.ValidationError("Token is blacklisted")
+        return {}
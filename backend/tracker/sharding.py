@@ -0,0 +1,385 @@
+"""
+Optional horizontal sharding of per-user tables by user id.
+
+When settings.READING_SHARDS lists database aliases, a user's readings,
+rollups, baselines, tombstones and alerts live on one shard. Users, auth and
+everything else stay on the primary. The placement is recorded in the UserShard directory
+on the primary. New users are placed by a stable hash of their id. Users
+without an entry (created before sharding was enabled) still have their data
+on `default`, and rebalance_shards moves them.
+
+ShardRouter routes queries on the sharded models:
+1. By the user of the instance involved, for saves, deletes and related lookups.
+2. Otherwise by the current shard context. The viewsets, async views, signal
+   handlers and per-user helpers open that context with `for_user`, and
+   management commands open it with `on_shard`.
+3. Otherwise to `default`.
+
+ReadingManager.for_user pins its queryset to the user's shard explicitly.
+Staff queries that span users use `scatter_gather`. Writes through
+`sharding.atomic()` use a transaction on the current shard.
+
+Directory entries are cached forever in a shared cache, where `assign`
+updates them for every process. With a process-local cache other workers
+would keep routing a moved user to the old shard, so every lookup reads the
+directory instead. While `move_user` runs the entry is marked moving, and
+writes for that user fail with ShardMoveInProgress (503).
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+SHARDED_MODELS = frozenset({
+    'reading', 'readingrollup', 'readingbaseline', 'readingtombstone', 'alert', 'alert_readings'
+})
+
+_current = ContextVar('tracker_shard', default=None)
+
+
+class ShardMoveInProgress(APIException):
+    status_code = 503
+    default_detail = _("Your readings are being moved to another database; try again shortly.")
+    default_code = 'shard_move_in_progress'
+
+
+def shard_aliases():
+    return list(getattr(settings, 'READING_SHARDS', ()))
+
+
+def enabled():
+    return bool(getattr(settings, 'READING_SHARDS', ()))
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'tracker' and model._meta.model_name in SHARDED_MODELS
+
+
+def home_shard(user_id):
+    """Shard a user hashes to under the current READING_SHARDS."""
+    aliases = shard_aliases()
+    digest = hashlib.blake2b(str(user_id).encode(), digest_size=8).digest()
+    return aliases[int.from_bytes(digest, 'big') % len(aliases)]
+
+
+def _directory_key(user_id):
+    return f"tracker:user-shard-entry:{user_id}"
+
+
+def _cache_directory():
+    from .tokens import cache_is_shared
+    return cache_is_shared()
+
+
+def _directory_rows(user_id):
+    UserShard = apps.get_model('tracker', 'UserShard')
+    return UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).values_list('alias', 'moving')
+
+
+def _entry(user_id):
+    """(alias, moving) of `user_id` in the directory."""
+    shared = _cache_directory()
+    entry = cache.get(_directory_key(user_id)) if shared else None
+    if entry is None:
+        entry = tuple(_directory_rows(user_id).first() or (DEFAULT_DB_ALIAS, False))
+        if shared:
+            cache.set(_directory_key(user_id), entry, timeout=None)
+    return entry
+
+
+async def _aentry(user_id):
+    shared = _cache_directory()
+    entry = await cache.aget(_directory_key(user_id)) if shared else None
+    if entry is None:
+        entry = tuple(await _directory_rows(user_id).afirst() or (DEFAULT_DB_ALIAS, False))
+        if shared:
+            await cache.aset(_directory_key(user_id), entry, timeout=None)
+    return entry
+
+
+def shard_for_user(user_id):
+    """Alias holding `user_id`'s sharded rows, or None when sharding is off."""
+    if not enabled():
+        return None
+    return _entry(user_id)[0]
+
+
+async def ashard_for_user(user_id):
+    """Async counterpart of shard_for_user for the native async views."""
+    if not enabled():
+        return None
+    return (await _aentry(user_id))[0]
+
+
+def shard_for_write(user_id):
+    """shard_for_user for writes; raises ShardMoveInProgress while the user is being moved."""
+    if not enabled():
+        return None
+    alias, moving = _entry(user_id)
+    if moving:
+        raise ShardMoveInProgress()
+    return alias
+
+
+def _record(user_id, alias, moving=False):
+    UserShard = apps.get_model('tracker', 'UserShard')
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user_id, defaults={'alias': alias, 'moving': moving}
+    )
+    if _cache_directory():
+        cache.set(_directory_key(user_id), (alias, moving), timeout=None)
+
+
+def assign(user_ids, alias=None):
+    """Record the placement of `user_ids` (their home shard unless `alias` is given)."""
+    if not enabled():
+        return
+    for user_id in user_ids:
+        _record(user_id, alias or home_shard(user_id))
+
+
+def current_alias():
+    return _current.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def on_shard(alias):
+    """Route sharded-model queries without an instance to `alias` in this block."""
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def for_user(user_id):
+    """Route sharded-model queries in this block to `user_id`'s shard."""
+    with on_shard(shard_for_user(user_id)) as alias:
+        yield alias
+
+
+def atomic():
+    """transaction.atomic() on the current shard (the primary when none is set)."""
+    return transaction.atomic(using=current_alias())
+
+
+def all_shards():
+    """Every alias that may hold sharded rows, `default` first (just `default` when off)."""
+    return list(dict.fromkeys([DEFAULT_DB_ALIAS, *shard_aliases()]))
+
+
+def scatter_gather(queryset, limit=None):
+    """
+    Evaluate `queryset` on every shard and merge the rows in its ordering.
+    For staff-only queries that span users; pass `limit` to cap each shard's share.
+    """
+    if not enabled():
+        return list(queryset[:limit] if limit else queryset)
+
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    rows = []
+    for alias in all_shards():
+        part = queryset.using(alias)
+        rows.extend(part[:limit] if limit else part)
+
+    # Stable multi-key sort, least significant key first; handles mixed directions.
+    for field in reversed(ordering):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        if name == 'pk':
+            name = queryset.model._meta.pk.attname
+        rows.sort(
+            key=lambda row: row[name] if isinstance(row, dict) else getattr(row, name),
+            reverse=descending
+        )
+    return rows[:limit] if limit else rows
+
+
+# -----------------------------
+# Router
+# -----------------------------
+class ShardRouter:
+    def _route(self, model, hints, write=False):
+        if not enabled():
+            return None
+        instance = hints.get('instance')
+        if is_sharded(model):
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                return shard_for_write(user_id) if write else shard_for_user(user_id)
+            if instance is not None and instance._state.db:
+                return instance._state.db
+            return _current.get()
+        if instance is not None and is_sharded(type(instance)):
+            # e.g. reading.user: everything unsharded lives on the primary.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows reference users on the primary by id.
+        if enabled() and (is_sharded(type(obj1)) or is_sharded(type(obj2))):
+            return True
+        return None
+
+
+# -----------------------------
+# Viewset Mixin
+# -----------------------------
+class UserShardMixin:
+    """Route the request's sharded-model queries to the authenticated user's shard."""
+    def dispatch(self, request, *args, **kwargs):
+        self._shard_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._shard_token is not None:
+                _current.reset(self._shard_token)
+                self._shard_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if enabled() and request.user.is_authenticated:
+            lookup = shard_for_user if request.method in SAFE_METHODS else shard_for_write
+            self._shard_token = _current.set(lookup(request.user.pk))
+
+
+# -----------------------------
+# Rebalancing
+# -----------------------------
+def _copy_rows(model, rows, target, batch_size, **overrides):
+    """Bulk-insert `rows` (.values() dicts) on `target` in batches; return the new instances."""
+    created, batch = [], []
+    for row in rows:
+        batch.append(model(**{**row, **overrides}))
+        if len(batch) >= batch_size:
+            created.extend(model.objects.using(target).bulk_create(batch))
+            batch = []
+    if batch:
+        created.extend(model.objects.using(target).bulk_create(batch))
+    return created
+
+
+def _copy_with_new_ids(model, rows, target, batch_size, **overrides):
+    """Copy `rows` to `target` under fresh primary keys; return {old_id: new_id}."""
+    mapping, old_ids, batch = {}, [], []
+
+    def flush():
+        copies = model.objects.using(target).bulk_create(batch)
+        mapping.update(zip(old_ids, (copy.pk for copy in copies)))
+
+    for row in rows:
+        old_ids.append(row.pop('id'))
+        batch.append(model(**{**row, **overrides}))
+        if len(batch) >= batch_size:
+            flush()
+            old_ids, batch = [], []
+    if batch:
+        flush()
+    return mapping
+
+
+def _strip_ids(rows):
+    for row in rows:
+        del row['id']
+        yield row
+
+
+def move_user(user_id, target, batch_size=500):
+    """
+    Move one user's sharded rows to `target`: mark the user as moving, copy
+    their rows in batches inside one transaction on the target, repoint the
+    directory, then delete them from the source. Readings get new ids on the
+    target. Each old id is left behind as a tombstone recording the source
+    shard, so delta-sync clients refetch them and dataset exports drop
+    (source, old id). Returns the readings moved.
+    """
+    from . import caching
+    from .models import Alert, Reading, ReadingBaseline, ReadingRollup, ReadingTombstone
+    from .synthetic import explicit_reading_timestamps
+
+    source = shard_for_user(user_id) or DEFAULT_DB_ALIAS
+    if source == target:
+        return 0
+    Through = Alert.readings.through
+    now = timezone.now()
+    _record(user_id, source, moving=True)
+
+    def source_rows(model):
+        return model.objects.using(source).filter(user_id=user_id).order_by('id')
+
+    def values(model):
+        return source_rows(model).values().iterator(chunk_size=batch_size)
+
+    try:
+        with transaction.atomic(using=target), explicit_reading_timestamps():
+            # Old id -> new id, needed to re-link alerts and to tombstone the old ids.
+            reading_ids = _copy_with_new_ids(Reading, values(Reading), target, batch_size, updated_at=now)
+            # Writes that passed the fence just before it went up: copy readings
+            # added or changed since the snapshot, drop copies of deleted ones.
+            changed = list(
+                source_rows(Reading)
+                .filter(Q(id__gt=max(reading_ids, default=0)) | Q(updated_at__gte=now)).values()
+            )
+            deleted = source_rows(ReadingTombstone).filter(deleted_at__gte=now).values_list('reading_id', flat=True)
+            stale = [reading_ids.pop(pk) for pk in {*(row['id'] for row in changed), *deleted} if pk in reading_ids]
+            Reading.objects.using(target).filter(id__in=stale)._raw_delete(target)
+            reading_ids.update(_copy_with_new_ids(Reading, changed, target, batch_size, updated_at=now))
+
+            _copy_rows(ReadingRollup, _strip_ids(values(ReadingRollup)), target, batch_size)
+            _copy_rows(ReadingBaseline, _strip_ids(values(ReadingBaseline)), target, batch_size)
+            # Tombstones keep the shard their reading was deleted from, since its id only means something there.
+            _copy_rows(ReadingTombstone, (
+                {**row, 'shard': row['shard'] or source} for row in _strip_ids(values(ReadingTombstone))
+            ), target, batch_size)
+            _copy_rows(ReadingTombstone, (
+                {'user_id': user_id, 'reading_id': old, 'deleted_at': now, 'shard': source} for old in reading_ids
+            ), target, batch_size)
+
+            alert_ids = _copy_with_new_ids(Alert, values(Alert), target, batch_size)
+            links = (
+                Through.objects.using(source).filter(alert__user_id=user_id)
+                .values('alert_id', 'reading_id').iterator(chunk_size=batch_size)
+            )
+            _copy_rows(Through, (
+                {'alert_id': alert_ids[link['alert_id']], 'reading_id': reading_ids[link['reading_id']]}
+                for link in links if link['reading_id'] in reading_ids
+            ), target, batch_size)
+    except BaseException:
+        _record(user_id, source)
+        raise
+
+    assign([user_id], alias=target)
+
+    # The rows now live on the target; remove the source copies.
+    purge_user(user_id, source)
+    # Cached pages, ETags and summaries still hold the old reading ids.
+    caching.invalidate_user(user_id)
+    return len(reading_ids)
+
+
+def purge_user(user_id, alias):
+    """Delete every sharded row of `user_id` on `alias` without signals or tombstones."""
+    from .models import Alert, Reading, ReadingBaseline, ReadingRollup, ReadingTombstone
+
+    Through = Alert.readings.through
+    with transaction.atomic(using=alias):
+        for model in (Through, Alert, Reading, ReadingRollup, ReadingBaseline, ReadingTombstone):
+            rows = model.objects.using(alias)
+            rows = rows.filter(alert__user_id=user_id) if model is Through else rows.filter(user_id=user_id)
+            rows._raw_delete(alias)
@@ -1,45 +1,150 @@
-from django.db.models.signals import post_save
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from .models import Reading, User
+from .models import AlertRule, Reading, ReadingTombstone, User
+from . import alerts, baselines, caching, features, recommendations, rollups, rules, sharding
+from .instrumentation import timed
+
+# 📈 Score readings against the user's own baseline and keep it current.
+# Registered before the alert handler, which reads the score.
+@receiver(pre_save, sender=Reading)
+@timed('signal')
+def remember_baseline_values(sender, instance, raw=False, **kwargs):
+    # Instances loaded from the database already carry their stored values.
+    if raw or instance._state.adding or hasattr(instance, '_baseline_values'):
+        return
+    stored = Reading.objects.filter(pk=instance.pk).values(*Reading.BASELINE_FIELDS).first()
+    if stored is not None:
+        instance._baseline_values = stored
+
 
-# 🔔 Triggered when a new Reading is created
 @receiver(post_save, sender=Reading)
-def notify_if_abnormal(sender, instance, created, **kwargs):
-    if created:
-        systolic = instance.systolic
-        diastolic = instance.diastolic
-        glucose = instance.glucose_level
-
-        is_abnormal_bp = systolic >= 140 or diastolic >= 90
-        is_abnormal_glucose = glucose >= 200
-
-        if is_abnormal_bp or is_abnormal_glucose:
-            # You can change this to send an email or push notification
-            print(f"[Warning] Abnormal reading for {instance.user.email}")
-
-            # Example: Send email notification (requires email backend configured)
-            try:
-                send_mail(
-                    subject='Abnormal Health Reading Alert',
-                    message=(
-                        f"Hi {instance.user.get_full_name() or 'User'},\n\n"
-                        f"An abnormal health reading was recorded:\n"
-                        f"- Blood Pressure: {systolic}/{diastolic}\n"
-                        f"- Glucose: {glucose} {instance.glucose_unit}\n\n"
-                        "Please consult your doctor if necessary."
-                    ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[instance.user.email],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"[Error] Failed to send alert email: {e}")
+@timed('signal')
+def update_reading_baseline(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    with sharding.for_user(instance.user_id):
+        if created:
+            baselines.apply_readings([instance])
+        else:
+            baselines.replace(instance)
+
+
+@receiver(post_delete, sender=Reading)
+@timed('signal')
+def remove_from_reading_baseline(sender, instance, origin=None, **kwargs):
+    # The baseline is deleted along with the user.
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    with sharding.for_user(instance.user_id):
+        baselines.discard(instance)
+
+
+# 🔔 Triggered when a new Reading is created: queue an alert in the same transaction
+@receiver(post_save, sender=Reading)
+@timed('signal')
+def notify_if_abnormal(sender, instance, created, raw=False, **kwargs):
+    # alerts.enqueue evaluates the alert rules and the anomaly score.
+    if created and not raw:
+        with sharding.for_user(instance.user_id):
+            alerts.enqueue(instance.user, [instance])
+
+
+# 📊 Keep day/week rollups in step with readings
+@receiver(post_save, sender=Reading)
+@timed('signal')
+def update_reading_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    with sharding.for_user(instance.user_id):
+        if created:
+            rollups.apply_readings([instance])
+        else:
+            rollups.refresh_days(instance.user_id, [rollups.reading_day(instance)])
+
+
+@receiver(post_delete, sender=Reading)
+@timed('signal')
+def remove_from_reading_rollups(sender, instance, **kwargs):
+    with sharding.for_user(instance.user_id):
+        rollups.refresh_days(instance.user_id, [rollups.reading_day(instance)])
+
+
+# 🧮 Refresh the user's feature vector from the updated rollups (registered after them)
+@receiver(post_save, sender=Reading)
+@receiver(post_delete, sender=Reading)
+@timed('signal')
+def refresh_reading_owner_features(sender, instance, raw=False, origin=None, **kwargs):
+    # The feature row is deleted along with the user.
+    if raw or isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    features.refresh_users([instance.user])
+
+
+# 🪦 Leave a tombstone so delta sync clients see the deletion
+@receiver(post_delete, sender=Reading)
+@timed('signal')
+def record_reading_tombstone(sender, instance, origin=None, **kwargs):
+    # Readings removed along with their user need no tombstone (it would cascade away too).
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    ReadingTombstone.objects.using(instance._state.db).create(user_id=instance.user_id, reading_id=instance.pk)
+
+
+# 🧹 Invalidate cached per-user data on any change
+@receiver(post_save, sender=Reading)
+@receiver(post_delete, sender=Reading)
+@timed('signal')
+def invalidate_reading_owner_cache(sender, instance, **kwargs):
+    caching.invalidate_user(instance.user_id)
+    recommendations.forget(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@timed('signal')
+def invalidate_user_cache(sender, instance, **kwargs):
+    caching.invalidate_user(instance.pk)
+    caching.invalidate_user(instance.pk, scope='auth')
+    recommendations.forget(instance.pk)
+
+
+# 🗂️ Place new users on a shard; clear a deleted user's rows from theirs
+@receiver(post_save, sender=User)
+@timed('signal')
+def assign_user_shard(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        sharding.assign([instance.pk])
+
+
+@receiver(pre_delete, sender=User)
+@timed('signal')
+def purge_user_shard(sender, instance, **kwargs):
+    # The ORM cascade only reaches rows on the primary.
+    alias = sharding.shard_for_user(instance.pk)
+    if alias not in (None, DEFAULT_DB_ALIAS):
+        sharding.purge_user(instance.pk, alias)
+
+
+# 🧮 Keep the feature vector in step with the profile (after the user is placed on a shard)
+@receiver(post_save, sender=User)
+@timed('signal')
+def refresh_user_features(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not features.PROFILE_FIELDS & set(update_fields)):
+        return
+    features.refresh_users([instance])
+
+
+# ⚙️ Recompile alert rules everywhere when one changes
+@receiver(post_save, sender=AlertRule)
+@receiver(post_delete, sender=AlertRule)
+def invalidate_alert_rules(sender, **kwargs):
+    rules.invalidate()
 
 
 # 🆕 Log new user creation
 @receiver(post_save, sender=User)
+@timed('signal')
 def log_user_creation(sender, instance, created, **kwargs):
     if created:
         print(f"[User Created] New user registered: {instance.email}")
@@ -0,0 +1,133 @@
+"""
+Delta sync for offline-first clients.
+
+A sync token is a (timestamp, reading id) position in the change stream.
+Changed readings (by updated_at) and tombstones (by deleted_at) after the
+token are merged into a single (timestamp, id) ordered stream, so each call
+costs a range scan proportional to the number of changes, not the history.
+A page that leaves more changes ends at its last change. Once the client is
+caught up, the token moves on to the server's as-of time (less AS_OF_LAG), so
+a quiet user's token stays recent.
+
+A token only expires when tombstones after it may have been pruned: it is
+older than the retention window and older than the oldest tombstone kept on
+the user's shard.
+"""
+import base64
+import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Reading, ReadingTombstone
+from . import sharding
+
+
+# Writes stamped this long before a sync but committed after it are still picked up.
+AS_OF_LAG = datetime.timedelta(seconds=60)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class ExpiredSyncToken(ValueError):
+    pass
+
+
+def encode_token(timestamp, pk) -> str:
+    raw = f"{timestamp.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii')
+        timestamp, pk = raw.rsplit('|', 1)
+        timestamp = parse_datetime(timestamp)
+        if timestamp is None:
+            raise ValueError
+        return timestamp, int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise InvalidSyncToken("Invalid sync token")
+
+
+def retention_cutoff():
+    days = getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def is_expired(timestamp, alias):
+    """Whether tombstones after `timestamp` on shard `alias` may have been pruned."""
+    if timestamp >= retention_cutoff():
+        return False
+    # Pruning removes tombstones from the oldest; a token at or after the oldest
+    # kept one has lost none. Without any tombstone the history is unknown.
+    oldest = (
+        ReadingTombstone.objects.using(alias)
+        .order_by('deleted_at').values_list('deleted_at', flat=True).first()
+    )
+    return oldest is None or timestamp < oldest
+
+
+def get_changes(user, since=None, limit=200):
+    """
+    Return (changed_readings, deleted_reading_ids, next_token, has_more) for `user`
+    after the position encoded in `since` (None means from the beginning).
+    """
+    as_of = timezone.now() - AS_OF_LAG
+    readings = Reading.objects.for_user(user)
+    tombstones = ReadingTombstone.objects.using(readings.db).filter(user=user)
+
+    if since is not None:
+        timestamp, pk = decode_token(since)
+        if is_expired(timestamp, readings.db):
+            raise ExpiredSyncToken("Sync token has expired; a full resync is required")
+        readings = readings.filter(Q(updated_at__gt=timestamp) | Q(updated_at=timestamp, id__gt=pk))
+        tombstones = tombstones.filter(
+            Q(deleted_at__gt=timestamp) | Q(deleted_at=timestamp, reading_id__gt=pk)
+        )
+    else:
+        # A first sync has nothing local to delete.
+        tombstones = tombstones.none()
+
+    candidates = [
+        (reading.updated_at, reading.pk, reading)
+        for reading in readings.order_by('updated_at', 'id')[:limit + 1]
+    ]
+    candidates += [
+        (tombstone.deleted_at, tombstone.reading_id, None)
+        for tombstone in tombstones.order_by('deleted_at', 'reading_id')[:limit + 1]
+    ]
+    candidates.sort(key=lambda change: (change[0], change[1]))
+
+    has_more = len(candidates) > limit
+    page = candidates[:limit]
+
+    changed = [reading for _, _, reading in page if reading is not None]
+    deleted = [pk for _, pk, reading in page if reading is None]
+    position = page[-1][:2] if page else (decode_token(since) if since is not None else None)
+    if not has_more and (position is None or position < (as_of, 0)):
+        # Caught up: nothing (committed) remains before the as-of time.
+        position = (as_of, 0)
+    next_token = encode_token(*position)
+    return changed, deleted, next_token, has_more
+
+
+def prune_tombstones(batch_size=1000, cutoff=None):
+    """Delete tombstones older than the retention window in small batches; return the count."""
+    cutoff = cutoff or retention_cutoff()
+    total = 0
+    for alias in sharding.all_shards():
+        tombstones = ReadingTombstone.objects.using(alias)
+        while True:
+            ids = list(
+                tombstones.filter(deleted_at__lt=cutoff)
+                .order_by('deleted_at').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            total += tombstones.filter(id__in=ids).delete()[0]
+    return total
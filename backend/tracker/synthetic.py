@@ -0,0 +1,119 @@
+"""
+Deterministic synthetic population generator for benchmarks and local testing.
+
+The same seed and parameters always produce the same users and readings, so
+benchmark runs on different branches measure the same data.
+"""
+import datetime
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reading, User
+from . import baselines, features, rollups, sharding
+
+DEFAULT_PASSWORD = 'synthetic-pass-123'
+
+
+@contextmanager
+def explicit_reading_timestamps():
+    """Temporarily let bulk inserts keep the created_at/updated_at we assign."""
+    created = Reading._meta.get_field('created_at')
+    updated = Reading._meta.get_field('updated_at')
+    saved = (created.auto_now_add, updated.auto_now)
+    created.auto_now_add = updated.auto_now = False
+    try:
+        yield
+    finally:
+        created.auto_now_add, updated.auto_now = saved
+
+
+def _synthetic_reading(rng, user, created_at, abnormal_ratio, mmol_ratio):
+    abnormal = rng.random() < abnormal_ratio
+    if abnormal:
+        systolic = rng.randint(140, 190)
+        diastolic = rng.randint(90, min(systolic - 20, 120))
+        glucose_mg = rng.uniform(200.0, 360.0) if rng.random() < 0.5 else rng.uniform(80.0, 180.0)
+    else:
+        systolic = rng.randint(100, 138)
+        diastolic = rng.randint(60, min(systolic - 20, 88))
+        glucose_mg = rng.uniform(70.0, 180.0)
+
+    if rng.random() < mmol_ratio:
+        glucose_level, unit = round(glucose_mg / 18.0, 1), 'mmol/L'
+    else:
+        glucose_level, unit = round(glucose_mg, 1), 'mg/dL'
+
+    return Reading(
+        user=user,
+        systolic=systolic,
+        diastolic=diastolic,
+        glucose_level=glucose_level,
+        glucose_unit=unit,
+        notes='',
+        created_at=created_at,
+        updated_at=created_at,
+    )
+
+
+def _insert_readings(batch, shard):
+    with sharding.on_shard(shard), sharding.atomic():
+        created = Reading.objects.bulk_create(batch)
+        rollups.apply_readings(created)
+        baselines.apply_readings(created)
+
+
+def generate(users=10, readings_per_user=100, days=365, seed=0, diabetes_ratio=0.3,
+             hypertension_ratio=0.4, abnormal_ratio=0.1, mmol_ratio=0.2,
+             email_prefix='synthetic', batch_size=1000):
+    """Create `users` users with `readings_per_user` readings each; return the users."""
+    rng = random.Random(seed)
+    password = make_password(DEFAULT_PASSWORD)
+    now = timezone.now()
+
+    with transaction.atomic():
+        people = User.objects.bulk_create([
+            User(
+                email=f"{email_prefix}-{seed}-{index}@example.com",
+                password=password,
+                first_name='Synthetic',
+                last_name=f"User {index}",
+                age=rng.randint(18, 90),
+                weight=round(rng.uniform(50.0, 120.0), 1),
+                height=round(rng.uniform(150.0, 195.0), 1),
+                has_diabetes=rng.random() < diabetes_ratio,
+                has_hypertension=rng.random() < hypertension_ratio,
+            )
+            for index in range(users)
+        ], batch_size=batch_size)
+
+        # bulk_create sends no post_save, so place the users here.
+        sharding.assign([person.pk for person in people])
+
+        span = datetime.timedelta(days=days).total_seconds()
+        batch, batch_shard = [], None
+        with explicit_reading_timestamps():
+            for person in people:
+                shard = sharding.shard_for_user(person.pk)
+                if batch and shard != batch_shard:
+                    _insert_readings(batch, batch_shard)
+                    batch = []
+                batch_shard = shard
+                # Conditions raise the share of abnormal readings.
+                ratio = abnormal_ratio * (1 + person.has_diabetes + person.has_hypertension)
+                for _ in range(readings_per_user):
+                    created_at = now - datetime.timedelta(seconds=rng.uniform(0, span))
+                    batch.append(_synthetic_reading(rng, person, created_at, ratio, mmol_ratio))
+                    if len(batch) >= batch_size:
+                        _insert_readings(batch, shard)
+                        batch = []
+            if batch:
+                _insert_readings(batch, batch_shard)
+
+        for start in range(0, len(people), batch_size):
+            features.refresh_users(people[start:start + batch_size])
+
+    return people
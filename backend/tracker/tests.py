@@ -1,6 +1,40 @@
-from django.test import TestCase, Client
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.core.mail.backends.base import BaseEmailBackend
 from django.contrib.auth import get_user_model
-from .models import Reading
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+import csv
+import gzip
+import json
+import os
+import pickle
+import shutil
+import statistics
+import tempfile
+import time
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from .models import Alert, AlertRule, Reading, ReadingBaseline, ReadingRollup, ReadingTombstone, UserFeatures, UserShard
+from . import (
+    alerts, analytics, baselines, benchmarks, caching, dataset, features, instrumentation, recommendations, replicas,
+    rollups, rules, sharding, sync, synthetic, tokens
+)
+from .authentication import CachedJWTAuthentication
+from .renderers import FastJSONRenderer
+from .serializers import FastReadingSerializer, ReadingSerializer
 
 # Create your tests here.
 
@@ -32,4 +66,1489 @@ class AdminTests(TestCase):
     def test_reading_admin_list_display(self):
         response = self.client.get('/admin/myapp/reading/')
         self.assertContains(response, "120/80")
-        self.assertContains(response, "Normal")  # From get_blood_pressure_category
\ No newline at end of file
+        self.assertContains(response, "Normal")  # From get_blood_pressure_category
+
+class ReadingBulkCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="bulk@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('readings-bulk_create')
+
+    def test_bulk_create_inserts_valid_and_reports_invalid(self):
+        payload = [
+            {"systolic": 120, "diastolic": 80, "glucose_level": 100.0},
+            {"systolic": 70, "diastolic": 90, "glucose_level": 100.0},
+            {"systolic": 150, "diastolic": 95, "glucose_level": 250.0},
+        ]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1])
+        self.assertEqual(Reading.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_sends_one_alert_per_batch(self):
+        payload = {"readings": [
+            {"systolic": 150, "diastolic": 95, "glucose_level": 100.0},
+            {"systolic": 160, "diastolic": 100, "glucose_level": 250.0},
+        ]}
+        self.client.post(self.url, payload, format='json')
+        self.assertEqual(Alert.objects.count(), 1)
+        call_command('process_alerts', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_bulk_create_rejects_empty_payload(self):
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ReadingPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="pages@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+        for systolic in range(121, 126):
+            Reading.objects.create(user=self.user, systolic=systolic, diastolic=80, glucose_level=100.0)
+
+    def test_cursor_walks_every_reading_once(self):
+        url = reverse('readings-list') + '?page_size=2'
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item["id"] for item in response.data["results"])
+            url, pages = response.data["next"], pages + 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(Reading.objects.values_list('id', flat=True)))
+
+    def test_previous_cursor_returns_prior_page(self):
+        first = self.client.get(reverse('readings-list') + '?page_size=2').data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(
+            [item["id"] for item in back["results"]],
+            [item["id"] for item in first["results"]]
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('readings-recent_readings') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+
+class ReadingRollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="trends@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.readings = [
+            Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=90.0),
+            Reading.objects.create(user=self.user, systolic=140, diastolic=90, glucose_level=110.0),
+        ]
+
+    def day_rollup(self):
+        return ReadingRollup.objects.get(user=self.user, bucket=ReadingRollup.BUCKET_DAY)
+
+    def test_rollups_follow_creates_updates_and_deletes(self):
+        rollup = self.day_rollup()
+        self.assertEqual(rollup.count, 2)
+        self.assertEqual(rollup.mean('systolic'), 130.0)
+        self.assertEqual(rollup.std_dev('systolic'), 10.0)
+
+        self.readings[1].systolic = 160
+        self.readings[1].save()
+        self.assertEqual(self.day_rollup().systolic_max, 160.0)
+
+        self.readings[1].delete()
+        rollup = self.day_rollup()
+        self.assertEqual((rollup.count, rollup.systolic_max), (1, 120.0))
+        week = ReadingRollup.objects.get(user=self.user, bucket=ReadingRollup.BUCKET_WEEK)
+        self.assertEqual(week.count, 1)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.client.post(reverse('readings-bulk_create'), [
+            {"systolic": 130, "diastolic": 85, "glucose_level": 150.0},
+        ], format='json')
+        incremental = list(ReadingRollup.objects.order_by('bucket').values(*rollups.STAT_FIELDS))
+        call_command('rebuild_rollups', stdout=StringIO())
+        rebuilt = list(ReadingRollup.objects.order_by('bucket').values(*rollups.STAT_FIELDS))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_rebuild_changes_stats_etag(self):
+        url = reverse('readings-reading_stats')
+        etag = self.client.get(url, {'bucket': 'day'})['ETag']
+        call_command('rebuild_rollups', user_ids=[self.user.pk], stdout=StringIO())
+        response = self.client.get(url, {'bucket': 'day'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stats_endpoint(self):
+        response = self.client.get(reverse('readings-reading_stats'), {'bucket': 'week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["count"], 2)
+        self.assertEqual(response.data[0]["systolic"]["mean"], 130.0)
+        bad = self.client.get(reverse('readings-reading_stats'), {'bucket': 'month'})
+        self.assertEqual(bad.status_code, 400)
+
+
+class ReadingDerivedFieldTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="derived@example.com",
+            password="test123"
+        )
+
+    def test_derived_fields_are_stored_on_save(self):
+        reading = Reading.objects.create(
+            user=self.user, systolic=125, diastolic=75, glucose_level=12.0, glucose_unit="mmol/L"
+        )
+        reading.refresh_from_db()
+        self.assertEqual(reading.bp_category, "Elevated")
+        self.assertEqual(reading.glucose_mg_dl, 216.0)
+        self.assertTrue(reading.is_abnormal)
+
+        reading.glucose_level = 5.0
+        reading.save(update_fields=['glucose_level'])
+        reading.refresh_from_db()
+        self.assertFalse(reading.is_abnormal)
+
+    def test_bulk_create_fills_derived_fields(self):
+        Reading.objects.bulk_create([
+            Reading(user=self.user, systolic=150, diastolic=95, glucose_level=100.0),
+        ])
+        reading = Reading.objects.get(user=self.user)
+        self.assertEqual(reading.bp_category, "Hypertension Stage 2")
+        self.assertTrue(reading.is_abnormal)
+
+    def test_abnormal_readings_include_mmol_glucose(self):
+        Reading.objects.create(user=self.user, systolic=115, diastolic=75, glucose_level=12.0, glucose_unit="mmol/L")
+        Reading.objects.create(user=self.user, systolic=115, diastolic=75, glucose_level=100.0)
+        self.assertEqual(Reading.objects.abnormal_readings(self.user).count(), 1)
+
+    def test_list_filters_by_category(self):
+        Reading.objects.create(user=self.user, systolic=115, diastolic=75, glucose_level=100.0)
+        Reading.objects.create(user=self.user, systolic=135, diastolic=85, glucose_level=100.0)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('readings-list'), {'category': 'Normal'})
+        self.assertEqual([item["blood_pressure_category"] for item in response.data["results"]], ["Normal"])
+
+
+class ReadingExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="export@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+        Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0, notes="after, lunch")
+        Reading.objects.create(user=self.user, systolic=145, diastolic=92, glucose_level=8.0, glucose_unit="mmol/L")
+
+    def test_csv_export_streams_every_reading(self):
+        response = self.client.get(reverse('readings-export_readings'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'created_at', 'systolic'])
+        self.assertEqual(len(rows), 3)
+        self.assertIn("after, lunch", [row[-1] for row in rows])
+
+    def test_ndjson_export_is_gzipped_when_accepted(self):
+        response = self.client.get(
+            reverse('readings-export_readings'), {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(record["glucose_mg_dl"] for record in records), [100.0, 144.0])
+
+    def test_export_honours_gzip_quality_values(self):
+        url = reverse('readings-export_readings')
+        refused = self.client.get(url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        self.assertEqual(len(b''.join(refused.streaming_content).decode().splitlines()), 2)
+
+        for header in ('identity, gzip;q=0.5', '*', 'br, *;q=0.1'):
+            response = self.client.get(url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(response['Content-Encoding'], 'gzip', header)
+            gzip.decompress(b''.join(response.streaming_content))
+
+        wildcard_refused = self.client.get(url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='*;q=0')
+        self.assertFalse(wildcard_refused.has_header('Content-Encoding'))
+
+
+class UserSummaryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="summary@example.com",
+            password="test123",
+            weight=70.0,
+            height=175.0
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('users-summary')
+        Reading.objects.create(user=self.user, systolic=150, diastolic=95, glucose_level=100.0)
+
+    def test_summary_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data["abnormal_count"], 1)
+        self.assertEqual(first.data["bmi"], 22.86)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+
+    def test_summary_is_invalidated_by_writes(self):
+        self.client.get(self.url)
+        Reading.objects.create(user=self.user, systolic=160, diastolic=100, glucose_level=100.0)
+        self.assertEqual(self.client.get(self.url).data["abnormal_count"], 2)
+
+        self.user.weight = 80.0
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).data["bmi"], 26.12)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="etag@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+        Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0)
+
+    def test_matching_etag_returns_304_without_queries(self):
+        url = reverse('readings-list')
+        first = self.client.get(url)
+        self.assertIn('ETag', first)
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+
+    def test_write_changes_etag(self):
+        url = reverse('readings-recent_readings')
+        etag = self.client.get(url)['ETag']
+        Reading.objects.create(user=self.user, systolic=130, diastolic=85, glucose_level=100.0)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_on_user_endpoint(self):
+        cache.set(caching._modified_key(self.user.pk), time.time() - 10, timeout=None)
+        url = reverse('users-list')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="sync@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('readings-reading_changes')
+        self.first = Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0)
+        self.second = Reading.objects.create(user=self.user, systolic=125, diastolic=80, glucose_level=100.0)
+
+    def test_changes_since_token_include_updates_and_deletions(self):
+        initial = self.client.get(self.url).data
+        self.assertEqual(len(initial["changed"]), 2)
+        self.assertFalse(initial["has_more"])
+
+        self.first.notes = "edited"
+        self.first.save()
+        second_id = self.second.pk
+        self.second.delete()
+
+        delta = self.client.get(self.url, {'since': initial["next_token"]}).data
+        self.assertEqual([item["id"] for item in delta["changed"]], [self.first.pk])
+        self.assertEqual(delta["deleted"], [second_id])
+
+        empty = self.client.get(self.url, {'since': delta["next_token"]}).data
+        self.assertEqual((empty["changed"], empty["deleted"]), ([], []))
+
+    def test_changes_are_paged(self):
+        page = self.client.get(self.url, {'limit': 1}).data
+        self.assertTrue(page["has_more"])
+        rest = self.client.get(self.url, {'since': page["next_token"], 'limit': 1}).data
+        self.assertEqual(len(rest["changed"]), 1)
+        self.assertNotEqual(rest["changed"][0]["id"], page["changed"][0]["id"])
+
+    def test_expired_token_requires_full_resync(self):
+        token = sync.encode_token(timezone.now() - timedelta(days=365), 0)
+        self.assertEqual(self.client.get(self.url, {'since': token}).status_code, 410)
+
+    def test_quiet_user_token_does_not_expire(self):
+        # Both readings last changed long before the retention window.
+        Reading.objects.filter(user=self.user).update(updated_at=timezone.now() - timedelta(days=365))
+        full = self.client.get(self.url).data
+        self.assertEqual(len(full["changed"]), 2)
+        delta = self.client.get(self.url, {'since': full["next_token"]})
+        self.assertEqual(delta.status_code, 200)
+        self.assertEqual((delta.data["changed"], delta.data["deleted"]), ([], []))
+
+        # An old token is still good while no tombstone after it has been pruned.
+        old = sync.encode_token(timezone.now() - timedelta(days=200), 0)
+        self.second.delete()
+        ReadingTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=300))
+        self.assertEqual(self.client.get(self.url, {'since': old}).status_code, 200)
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(self.client.get(self.url, {'since': old}).status_code, 410)
+
+    def test_prune_and_user_delete(self):
+        self.second.delete()
+        ReadingTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertFalse(ReadingTombstone.objects.exists())
+        self.user.delete()
+        self.assertFalse(ReadingTombstone.objects.exists())
+
+
+class FastReadingSerializerTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="fast@example.com",
+            password="test123"
+        )
+        Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=99.5, notes="fasting ☕")
+        Reading.objects.create(user=self.user, systolic=150, diastolic=95, glucose_level=12.3, glucose_unit="mmol/L")
+        Reading.objects.create(user=self.user, systolic=131, diastolic=70, glucose_level=250)
+
+    def expected(self):
+        readings = Reading.objects.filter(user=self.user).order_by('-created_at', 'id')
+        return ReadingSerializer(readings, many=True).data
+
+    def test_fast_serializer_matches_reading_serializer(self):
+        rows = Reading.objects.filter(user=self.user).order_by('-created_at', 'id').values(
+            *FastReadingSerializer.values_fields
+        )
+        fast = FastReadingSerializer.serialize(rows)
+        self.assertEqual(fast, [dict(item) for item in self.expected()])
+        self.assertEqual(FastJSONRenderer().render(fast), JSONRenderer().render(self.expected()))
+
+    def test_list_endpoint_matches_reading_serializer(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('readings-list'), HTTP_ACCEPT='application/vnd.tracker.fast+json')
+        self.assertEqual(response['Content-Type'], 'application/vnd.tracker.fast+json')
+        self.assertEqual(json.loads(response.content)["results"], json.loads(JSONRenderer().render(self.expected())))
+
+    def test_renderer_output_is_byte_identical_for_raw_values(self):
+        payload = {
+            'generated_at': timezone.now().replace(microsecond=123456),
+            'day': timezone.localdate(),
+            'counts': {1: 'one', 2: 'two'},
+            'nested': [{'at': timezone.now()}],
+        }
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_renderer_matches_stock_edge_cases(self):
+        for payload in (
+            {'notes': "line\u2028break\u2029para"},
+            {'floats': [1e16, 1.5e-7, 1e-05, 0.0001, 123.25, -2.5e22]},
+            {'big': 2 ** 70, 'small': -(2 ** 64)},
+        ):
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload), payload)
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'next': None, 'score': value})
+
+
+class SyntheticDataTests(TestCase):
+    def test_generator_is_deterministic(self):
+        call_command('generate_synthetic_data', users=3, readings=20, seed=7, stdout=StringIO())
+        first = list(Reading.objects.order_by('id').values_list('systolic', 'glucose_level', 'glucose_unit'))
+        Reading.objects.all().delete()
+        get_user_model().objects.all().delete()
+        call_command('generate_synthetic_data', users=3, readings=20, seed=7, stdout=StringIO())
+        second = list(Reading.objects.order_by('id').values_list('systolic', 'glucose_level', 'glucose_unit'))
+        self.assertEqual(len(first), 60)
+        self.assertEqual(first, second)
+        self.assertEqual(ReadingRollup.objects.filter(bucket=ReadingRollup.BUCKET_DAY).aggregate(n=Sum('count'))['n'], 60)
+
+    def test_benchmarks_report_timings(self):
+        report = benchmarks.run(sizes=[5], users=1, repeat=1, only=['manager.', 'api.readings_list'])
+        self.assertEqual(
+            [result['name'] for result in report['results']],
+            ['manager.recent_readings', 'manager.abnormal_readings', 'api.readings_list']
+        )
+        self.assertTrue(all(result['median_ms'] >= 0 for result in report['results']))
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP unavailable")
+
+
+class AlertOutboxTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="alerts@example.com",
+            password="test123",
+            first_name="Ada"
+        )
+
+    def test_abnormal_reading_queues_alert_without_sending(self):
+        Reading.objects.create(user=self.user, systolic=150, diastolic=95, glucose_level=100.0)
+        Reading.objects.create(user=self.user, systolic=120, diastolic=75, glucose_level=100.0)
+        self.assertEqual(len(mail.outbox), 0)
+        alert = Alert.objects.get()
+        self.assertEqual((alert.status, alert.recipient), (Alert.STATUS_PENDING, "alerts@example.com"))
+
+        self.assertEqual(alerts.process_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("150/95", mail.outbox[0].body)
+        alert.refresh_from_db()
+        self.assertEqual(alert.status, Alert.STATUS_SENT)
+        self.assertEqual(alerts.process_batch(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='tracker.tests.FailingEmailBackend', ALERT_MAX_ATTEMPTS=2)
+    def test_failed_delivery_backs_off_then_fails(self):
+        Reading.objects.create(user=self.user, systolic=150, diastolic=95, glucose_level=100.0)
+        self.assertEqual(alerts.process_batch(), (0, 1))
+        alert = Alert.objects.get()
+        self.assertEqual((alert.status, alert.attempts), (Alert.STATUS_PENDING, 1))
+        self.assertGreater(alert.next_attempt_at, timezone.now())
+        self.assertEqual(alerts.process_batch(), (0, 0))
+
+        Alert.objects.update(next_attempt_at=timezone.now())
+        alerts.process_batch()
+        alert.refresh_from_db()
+        self.assertEqual((alert.status, alert.attempts), (Alert.STATUS_FAILED, 2))
+        self.assertIn("SMTP unavailable", alert.last_error)
+
+
+class PerformanceInstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.histograms.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="perf@example.com",
+            password="test123"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header_reports_queries_and_signals(self):
+        response = self.client.post(reverse('readings-list'), {
+            "user": self.user.pk, "systolic": 150, "diastolic": 95, "glucose_level": 100.0
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'signal;dur=[\d.]+')
+        self.assertRegex(timing, r'serializer;dur=[\d.]+')
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_only_feed_histograms(self):
+        response = self.client.get(reverse('readings-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertIn('route="readings-list",method="GET"', instrumentation.histograms.render_prometheus())
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('readings-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'tracker_request_duration_seconds_count{route="readings-list",method="GET"} 1',
+            response.content.decode()
+        )
+
+
+class ScalableAdminTests(TestCase):
+    def setUp(self):
+        self.superuser = get_user_model().objects.create_superuser(
+            email="root@example.com",
+            password="admin123"
+        )
+        self.client = Client()
+        self.client.force_login(self.superuser)
+        self.url = reverse('admin:tracker_reading_changelist')
+
+    def add_readings(self, count, systolic=121):
+        for index in range(count):
+            user = get_user_model().objects.create_user(email=f"patient{systolic}-{index}@example.com", password="x")
+            Reading.objects.create(user=user, systolic=systolic, diastolic=80, glucose_level=100.0)
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(captured.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_readings(2)
+        _, few = self.changelist_queries()
+        self.add_readings(10, systolic=122)
+        response, many = self.changelist_queries()
+        self.assertEqual(few, many)
+        self.assertContains(response, "patient122-9@example.com")
+
+    def test_numeric_and_email_prefix_search(self):
+        self.add_readings(1, systolic=131)
+        self.add_readings(1, systolic=132)
+        response, _ = self.changelist_queries({'q': '131'})
+        self.assertContains(response, "patient131-0@example.com")
+        self.assertNotContains(response, "patient132-0@example.com")
+        response, _ = self.changelist_queries({'q': 'PATIENT132'})
+        self.assertContains(response, "patient132-0@example.com")
+        self.assertNotContains(response, "patient131-0@example.com")
+
+    def test_user_filter_by_id(self):
+        self.add_readings(2, systolic=133)
+        user = get_user_model().objects.get(email="patient133-1@example.com")
+        response, _ = self.changelist_queries({'user': user.pk})
+        self.assertContains(response, "patient133-1@example.com")
+        self.assertNotContains(response, "patient133-0@example.com")
+
+
+class CaseInsensitiveEmailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="  Mixed.Case@Example.COM ",
+            password="Str0ng-pass-123",
+            first_name="Mixed",
+            last_name="Case"
+        )
+
+    def test_email_is_normalized_on_create(self):
+        self.assertEqual(self.user.email, "mixed.case@example.com")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # create() skips normalization; the Lower(email) constraint still catches it.
+            get_user_model().objects.create(email="MIXED.CASE@example.com")
+
+    def test_token_login_ignores_case(self):
+        response = self.client.post(reverse('token_obtain_pair'), {
+            "email": "MIXED.CASE@example.com", "password": "Str0ng-pass-123"
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+
+    def test_registration_rejects_case_duplicate(self):
+        response = self.client.post(reverse('register'), {
+            "email": "Mixed.Case@example.com", "first_name": "A", "last_name": "B",
+            "password": "Str0ng-pass-123", "password2": "Str0ng-pass-123",
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_profile_update_rejects_case_duplicate(self):
+        other = get_user_model().objects.create_user(email="other@example.com", password="x")
+        self.client.force_authenticate(user=other)
+        response = self.client.patch(
+            reverse('users-detail', args=[other.pk]), {"email": "MIXED.case@example.com"}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(
+            reverse('users-detail', args=[other.pk]), {"email": "Other.New@Example.com"}, format='json'
+        )
+        self.assertEqual(response.data["email"], "other.new@example.com")
+
+    def test_registration_checks_email_once(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('register'), {
+                "email": "New.User@example.com", "first_name": "A", "last_name": "B",
+                "password": "Str0ng-pass-123", "password2": "Str0ng-pass-123",
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        lookups = [q['sql'] for q in captured.captured_queries
+                   if q['sql'].startswith('SELECT') and '"email"' in q['sql']]
+        self.assertEqual(len(lookups), 1, lookups)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="jwt@example.com",
+            password="Str0ng-pass-123"
+        )
+        token = self.client.post(reverse('token_obtain_pair'), {
+            "email": "jwt@example.com", "password": "Str0ng-pass-123"
+        }, format='json').data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse('readings-recent_readings')
+
+    def user_table_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [query for query in captured.captured_queries if 'FROM "tracker_user"' in query['sql']]
+
+    def test_repeat_requests_skip_user_query(self):
+        self.assertEqual(len(self.user_table_queries()), 1)
+        self.assertEqual(len(self.user_table_queries()), 0)
+
+    def test_deactivation_and_deletion_revoke_immediately(self):
+        self.user_table_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_cache_holds_no_password_hash(self):
+        self.user_table_queries()
+        entry = cache.get(CachedJWTAuthentication()._cache_key(self.user.pk))
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(entry))
+        self.assertNotIsInstance(entry, get_user_model())
+
+        response = self.client.get(self.url)
+        user = response.wsgi_request.user
+        self.assertEqual((user.pk, user.email), (self.user.pk, self.user.email))
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_password_change_reloads_user(self):
+        self.user_table_queries()
+        self.user.set_password("An0ther-pass-456")
+        self.user.save()
+        self.assertEqual(len(self.user_table_queries()), 1)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tokens.membership.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="refresh@example.com",
+            password="Str0ng-pass-123"
+        )
+        self.refresh = self.client.post(reverse('token_obtain_pair'), {
+            "email": "refresh@example.com", "password": "Str0ng-pass-123"
+        }, format='json').data["refresh"]
+
+    def refresh_token(self, token):
+        return self.client.post(reverse('token_refresh'), {"refresh": token}, format='json')
+
+    def test_rotated_token_is_rejected(self):
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        self.assertEqual(self.refresh_token(response.data["refresh"]).status_code, 200)
+
+        verify = self.client.post(reverse('token_verify'), {"token": self.refresh}, format='json')
+        self.assertEqual(verify.status_code, 400)
+
+    @override_settings(JWT_BLACKLIST_SHARED_CACHE=True)
+    def test_unknown_jti_skips_database(self):
+        self.refresh_token(self.refresh)
+        self.assertFalse(tokens.membership.is_blacklisted("never-issued"))
+        with self.assertNumQueries(0):
+            self.assertFalse(tokens.membership.is_blacklisted("also-never-issued"))
+
+    def blacklist_elsewhere(self, token):
+        # Another worker's blacklist write: the row exists, our filter never heard of it.
+        outstanding = OutstandingToken.objects.get(jti=RefreshToken(token)['jti'])
+        return BlacklistedToken.objects.create(token=outstanding)
+
+    @override_settings(JWT_BLACKLIST_SHARED_CACHE=True)
+    def test_shared_cache_head_announces_other_workers_entries(self):
+        self.assertFalse(tokens.membership.is_blacklisted("never-issued"))
+        blacklisted = self.blacklist_elsewhere(self.refresh)
+        cache.set(tokens.HEAD_KEY, blacklisted.pk, timeout=None)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+
+    def test_process_local_cache_checks_database(self):
+        self.assertFalse(tokens.cache_is_shared())
+        self.assertFalse(tokens.membership.is_blacklisted("never-issued"))
+        self.blacklist_elsewhere(self.refresh)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        self.assertIsNone(tokens.membership._filter)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = tokens.BloomFilter(1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_prune_removes_only_expired_tokens(self):
+        self.refresh_token(self.refresh)
+        OutstandingToken.objects.create(
+            user=self.user, jti="expired", token="x",
+            created_at=timezone.now() - timedelta(days=2),
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti="expired"))
+
+        out = StringIO()
+        call_command('prune_tokens', batch_size=1, stdout=out)
+        self.assertIn("Pruned 1 expired tokens", out.getvalue())
+        self.assertFalse(OutstandingToken.objects.filter(jti="expired").exists())
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="async@example.com",
+            password="Str0ng-pass-123"
+        )
+        for systolic in (120, 150, 165):
+            Reading.objects.create(user=self.user, systolic=systolic, diastolic=95, glucose_level=110.0)
+        self.reading = Reading.objects.filter(user=self.user).first()
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.client = APIClient()
+        self.client.credentials(**self.auth)
+        self.async_client = AsyncClient()
+        self.headers = {"Authorization": self.auth["HTTP_AUTHORIZATION"]}
+
+    def test_async_views_match_sync_views(self):
+        urls = [
+            reverse('readings-list') + "?page_size=2",
+            reverse('readings-list') + "?category=Stage 2",
+            reverse('readings-recent_readings'),
+            reverse('readings-abnormal_readings'),
+            reverse('readings-detail', args=[self.reading.pk]),
+            reverse('users-list'),
+            reverse('users-detail', args=[self.user.pk]),
+        ]
+        for url in urls:
+            expected = self.client.get(url)
+            response = async_to_sync(self.async_client.get)(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.resolver_match.func.__module__, 'tracker.async_views', url)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content), url)
+
+    def test_async_abnormal_view_loads_rules_after_invalidation(self):
+        rules.invalidate()
+        url = reverse('readings-abnormal_readings')
+        response = async_to_sync(self.async_client.get)(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['id'] for item in json.loads(response.content)['results']},
+            set(Reading.objects.abnormal_readings(self.user).values_list('id', flat=True))
+        )
+
+    def test_async_views_authenticate_and_honour_etags(self):
+        url = reverse('readings-list')
+        response = async_to_sync(AsyncClient().get)(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        response = async_to_sync(self.async_client.get)(url, headers=self.headers)
+        cached = async_to_sync(self.async_client.get)(url, headers={**self.headers, "If-None-Match": response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+        missing = async_to_sync(self.async_client.get)(reverse('readings-detail', args=[10 ** 6]), headers=self.headers)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_writes_fall_through_to_sync_viewset(self):
+        response = async_to_sync(self.async_client.post)(
+            reverse('readings-list'),
+            {"systolic": 118, "diastolic": 76, "glucose_level": 95.0, "user": self.user.pk},
+            content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Reading.objects.filter(user=self.user).count(), 4)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=60, JWT_BLACKLIST_SHARED_CACHE=True)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="replica@example.com",
+            password="Str0ng-pass-123"
+        )
+        Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0)
+        self.client.force_authenticate(user=self.user)
+
+    def routed_reading_reads(self, request):
+        """Record where the router sends Reading reads, but run them on the test database."""
+        routed = []
+        decide = replicas.PrimaryReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            if model is Reading:
+                routed.append(decide(router, model, **hints))
+            return None
+
+        with mock.patch.object(replicas.PrimaryReplicaRouter, 'db_for_read', spy):
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return set(routed)
+
+    def create_reading(self):
+        return self.client.post(reverse('readings-list'), {
+            "systolic": 118, "diastolic": 76, "glucose_level": 95.0, "user": self.user.pk
+        }, format='json')
+
+    def test_reads_go_to_replica_and_writes_pin_to_primary(self):
+        list_readings = lambda: self.client.get(reverse('readings-list'))
+        self.assertEqual(self.routed_reading_reads(list_readings), {'replica'})
+
+        self.assertEqual(self.create_reading().status_code, 201)
+        self.assertEqual(self.routed_reading_reads(list_readings), {None})
+
+        cache.delete(replicas._pin_key(self.user.pk))
+        self.assertEqual(self.routed_reading_reads(list_readings), {'replica'})
+
+    @override_settings(JWT_BLACKLIST_SHARED_CACHE=None)
+    def test_process_local_cache_keeps_reads_on_primary(self):
+        # Another worker would not see this process's pin, so no replica reads at all.
+        list_readings = lambda: self.client.get(reverse('readings-list'))
+        self.assertEqual(self.routed_reading_reads(list_readings), {None})
+        self.assertIsNone(replicas.choose_read_alias(self.user.pk))
+
+    def test_router(self):
+        router = replicas.PrimaryReplicaRouter()
+        self.assertIsNone(router.db_for_read(Reading))
+        with replicas.read_from('replica'):
+            self.assertEqual(Reading.objects.all().db, 'replica')
+            self.assertEqual(router.db_for_write(Reading), 'default')
+        self.assertIsNone(router.db_for_read(Reading))
+        self.assertFalse(router.allow_migrate('replica', 'tracker'))
+        self.assertIsNone(router.allow_migrate('default', 'tracker'))
+
+
+@override_settings(READING_SHARDS=['shard_0', 'shard_1'])
+class ShardingTests(TestCase):
+    databases = {'default', 'shard_0', 'shard_1'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="sharded@example.com",
+            password="Str0ng-pass-123"
+        )
+        self.home = sharding.home_shard(self.user.pk)
+        self.other = 'shard_1' if self.home == 'shard_0' else 'shard_0'
+        self.client.force_authenticate(user=self.user)
+
+    def count(self, model, alias, user=None):
+        return model.objects.using(alias).filter(user=user or self.user).count()
+
+    def test_new_user_readings_live_on_home_shard(self):
+        self.assertEqual(sharding.shard_for_user(self.user.pk), self.home)
+        response = self.client.post(reverse('readings-list'), {
+            "systolic": 165, "diastolic": 100, "glucose_level": 100.0, "user": self.user.pk
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        for model in (Reading, ReadingRollup, Alert):
+            self.assertGreater(self.count(model, self.home), 0, model.__name__)
+            self.assertEqual(self.count(model, 'default'), 0, model.__name__)
+            self.assertEqual(self.count(model, self.other), 0, model.__name__)
+
+        response = self.client.get(reverse('readings-list'))
+        self.assertEqual([r['id'] for r in response.json()['results']], [response.json()['results'][0]['id']])
+        self.assertEqual(alerts.process_batch(), (1, 0))
+
+    def test_rebalance_moves_unplaced_user_to_home_shard(self):
+        sharding.assign([self.user.pk], alias='default')
+        reading = Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0)
+        Reading.objects.create(user=self.user, systolic=170, diastolic=105, glucose_level=100.0)
+        self.assertEqual(self.count(Reading, 'default'), 2)
+
+        out = StringIO()
+        call_command('rebalance_shards', stdout=out)
+        self.assertIn("Moved 1 users (2 readings)", out.getvalue())
+
+        self.assertEqual(sharding.shard_for_user(self.user.pk), self.home)
+        for model in (Reading, ReadingRollup, Alert):
+            self.assertEqual(self.count(model, 'default'), 0, model.__name__)
+        self.assertEqual(self.count(Reading, self.home), 2)
+        self.assertEqual(self.count(Alert, self.home), 1)
+        self.assertEqual(Alert.objects.using(self.home).get().readings.count(), 1)
+        self.assertTrue(ReadingTombstone.objects.using(self.home).filter(reading_id=reading.pk).exists())
+
+        response = self.client.get(reverse('readings-list'))
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_directory_is_read_through_without_a_shared_cache(self):
+        # Another worker moved the user; a process-local cache must not keep the old shard.
+        self.assertEqual(sharding.shard_for_user(self.user.pk), self.home)
+        UserShard.objects.filter(user=self.user).update(alias=self.other)
+        self.assertEqual(sharding.shard_for_user(self.user.pk), self.other)
+
+        with override_settings(JWT_BLACKLIST_SHARED_CACHE=True):
+            sharding.assign([self.user.pk], alias=self.home)
+            with self.assertNumQueries(0):
+                self.assertEqual(sharding.shard_for_user(self.user.pk), self.home)
+
+    def test_writes_during_move_are_fenced_or_carried_over(self):
+        before = Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0)
+        url = reverse('readings-recent_readings')
+        etag = self.client.get(url)['ETag']
+        copy_with_new_ids = sharding._copy_with_new_ids
+        late = []
+
+        def copy_then_write(model, *args, **kwargs):
+            mapping = copy_with_new_ids(model, *args, **kwargs)
+            if model is Reading and not late:
+                # A request past the fence commits on the source after the snapshot...
+                now = timezone.now()
+                late.extend(Reading.objects.db_manager(self.home).bulk_create([Reading(
+                    user=self.user, systolic=150, diastolic=95, glucose_level=100.0, created_at=now, updated_at=now
+                )]))
+                # ...while new requests are turned away until the move is done.
+                response = self.client.post(reverse('readings-list'), {
+                    "systolic": 130, "diastolic": 85, "glucose_level": 100.0, "user": self.user.pk
+                }, format='json')
+                self.assertEqual(response.status_code, 503)
+            return mapping
+
+        with mock.patch.object(sharding, '_copy_with_new_ids', side_effect=copy_then_write):
+            self.assertEqual(sharding.move_user(self.user.pk, self.other), 2)
+
+        self.assertEqual(self.count(Reading, self.home), 0)
+        moved = Reading.objects.using(self.other).filter(user=self.user)
+        self.assertEqual(sorted(moved.values_list('systolic', flat=True)), [before.systolic, 150])
+        self.assertFalse(UserShard.objects.get(user=self.user).moving)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    @skipUnless(dataset.available(), "pyarrow is not installed")
+    @mock.patch.object(dataset, 'WATERMARK_LAG', timedelta(0))
+    def test_export_after_move_deletes_ids_on_source_shard(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        deleted = Reading.objects.create(user=self.user, systolic=118, diastolic=78, glucose_level=95.0)
+        kept = Reading.objects.create(user=self.user, systolic=120, diastolic=80, glucose_level=100.0)
+        dataset.export(directory, user_fields=())
+        deleted_id = deleted.pk
+        deleted.delete()
+
+        self.assertEqual(sharding.move_user(self.user.pk, self.other), 1)
+        moved = Reading.objects.using(self.other).get(user=self.user)
+        manifest = dataset.export(directory, user_fields=(), incremental=True)
+
+        def rows(key):
+            return sorted(
+                (row['shard'], row['id'])
+                for part in manifest[key]
+                for row in dataset.pq.read_table(os.path.join(manifest['directory'], part['file'])).to_pylist()
+            )
+        self.assertEqual(rows('parts'), [(self.other, moved.pk)])
+        self.assertEqual(rows('deletions'), sorted([(self.home, deleted_id), (self.home, kept.pk)]))
+
+    def test_staff_query_gathers_every_shard(self):
+        other = get_user_model().objects.create_user(email="elsewhere@example.com", password="Str0ng-pass-123")
+        sharding.assign([other.pk], alias=self.other)
+        first = Reading.objects.create(user=self.user, systolic=170, diastolic=105, glucose_level=100.0)
+        second = Reading.objects.create(user=other, systolic=175, diastolic=110, glucose_level=100.0)
+        self.assertEqual(self.count(Reading, self.other, user=other), 1)
+
+        staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="Str0ng-pass-123", is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get(reverse('readings-all_abnormal'))
+        self.assertEqual([r['id'] for r in response.json()], [second.pk, first.pk])
+
+    def test_deleting_user_purges_shard_rows(self):
+        Reading.objects.create(user=self.user, systolic=170, diastolic=105, glucose_level=100.0)
+        self.assertEqual(self.count(Alert, self.home), 1)
+        self.user.delete()
+        for model in (Reading, ReadingRollup, Alert, ReadingTombstone):
+            self.assertEqual(model.objects.using(self.home).count(), 0, model.__name__)
+
+
+@skipUnless(analytics.available(), "numpy is not installed")
+class ReadingAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="analytics@example.com",
+            password="Str0ng-pass-123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('readings-reading_analytics')
+        now = timezone.now()
+        with synthetic.explicit_reading_timestamps():
+            Reading.objects.bulk_create([
+                Reading(
+                    user=self.user, systolic=systolic, diastolic=diastolic, glucose_level=glucose,
+                    created_at=now - timedelta(days=days_ago), updated_at=now
+                )
+                for systolic, diastolic, glucose, days_ago in (
+                    (120, 75, 60.0, 3), (130, 85, 100.0, 2), (140, 90, 250.0, 1),
+                )
+            ])
+
+    def test_analytics_payload(self):
+        with self.assertNumQueries(1):
+            result = analytics.analyze(self.user)
+        self.assertEqual(result['count'], 3)
+        systolic = result['metrics']['systolic']
+        self.assertEqual((systolic['mean'], systolic['sd'], systolic['cv_percent']), (130.0, 10.0, 7.69))
+        self.assertAlmostEqual(systolic['trend_per_day'], 10.0, places=3)
+        self.assertEqual(result['glucose_in_range']['in_range_percent'], 33.33)
+        self.assertEqual(result['glucose_in_range']['above_percent'], 33.33)
+        self.assertEqual([day['systolic'] for day in result['moving_averages']], [120.0, 125.0, 130.0])
+        self.assertEqual(sum(period['count'] for period in result['time_of_day'].values()), 3)
+        self.assertEqual(result['bp_categories']['Elevated'], 1)
+        self.assertEqual(result['bp_categories']['Hypertension Stage 2'], 1)
+        self.assertEqual(result['bp_categories']['Normal'], 0)
+
+        window = analytics.analyze(self.user, window=1)
+        self.assertEqual([day['systolic'] for day in window['moving_averages']], [120.0, 130.0, 140.0])
+        self.assertEqual(analytics.analyze(self.user, days=1)['count'], 0)
+
+    def test_endpoint_is_memoized_until_next_write(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['count'], 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, first.data)
+
+        Reading.objects.create(user=self.user, systolic=118, diastolic=70, glucose_level=90.0)
+        self.assertEqual(self.client.get(self.url).data['count'], 4)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'days': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'window': 'week'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'days': 30, 'window': 3}).status_code, 200)
+
+
+class ReadingBaselineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="baseline@example.com",
+            password="Str0ng-pass-123"
+        )
+        self.client.force_authenticate(user=self.user)
+        for index in range(12):
+            Reading.objects.create(
+                user=self.user, systolic=100 + index % 3, diastolic=65 + index % 2, glucose_level=88.0 + index % 4
+            )
+
+    def assertMatchesReadings(self):
+        baseline = ReadingBaseline.objects.get(user=self.user)
+        systolic = list(Reading.objects.filter(user=self.user).values_list('systolic', flat=True))
+        self.assertEqual(baseline.count, len(systolic))
+        self.assertAlmostEqual(baseline.systolic_mean, statistics.fmean(systolic))
+        self.assertAlmostEqual(baseline.std_dev('systolic'), statistics.pstdev(systolic))
+
+    def test_baseline_tracks_inserts_updates_and_deletes(self):
+        self.assertMatchesReadings()
+        reading = Reading.objects.filter(user=self.user).first()
+        reading.systolic = 130
+        reading.save()
+        self.assertMatchesReadings()
+        reading.delete()
+        self.assertMatchesReadings()
+
+    def test_reading_far_off_personal_norm_is_scored_and_alerted(self):
+        response = self.client.post(reverse('readings-list'), {
+            "systolic": 135, "diastolic": 85, "glucose_level": 180.0, "user": self.user.pk
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertGreaterEqual(response.data['anomaly_score'], 3.0)
+        reading = Reading.objects.get(pk=response.data['id'])
+        self.assertFalse(reading.is_abnormal)
+        self.assertEqual(list(Alert.objects.get(user=self.user).readings.all()), [reading])
+        self.assertIn("unusual compared with your own", Alert.objects.get(user=self.user).body)
+
+        typical = self.client.post(reverse('readings-list'), {
+            "systolic": 101, "diastolic": 66, "glucose_level": 89.0, "user": self.user.pk
+        }, format='json')
+        self.assertLess(typical.data['anomaly_score'], 3.0)
+        self.assertEqual(Alert.objects.filter(user=self.user).count(), 1)
+
+    def test_write_cost_does_not_grow_with_history(self):
+        def create():
+            with CaptureQueriesContext(connection) as captured:
+                Reading.objects.create(user=self.user, systolic=110, diastolic=70, glucose_level=95.0)
+            return len(captured.captured_queries)
+
+        before = create()
+        for _ in range(20):
+            Reading.objects.create(user=self.user, systolic=105, diastolic=68, glucose_level=90.0)
+        self.assertEqual(create(), before)
+
+    def test_rebuild_replays_incremental_state(self):
+        scores = dict(Reading.objects.values_list('id', 'anomaly_score'))
+        baseline = ReadingBaseline.objects.get(user=self.user)
+        call_command('rebuild_baselines', stdout=StringIO())
+        self.assertEqual(dict(Reading.objects.values_list('id', 'anomaly_score')), scores)
+        rebuilt = ReadingBaseline.objects.get(user=self.user)
+        self.assertAlmostEqual(rebuilt.glucose_mean, baseline.glucose_mean)
+        self.assertAlmostEqual(rebuilt.glucose_m2, baseline.glucose_m2)
+
+    def test_rebuild_publishes_changed_scores(self):
+        url = reverse('readings-list')
+        etag = self.client.get(url)['ETag']
+        stale, unchanged = Reading.objects.filter(user=self.user).order_by('id')[:2]
+        Reading.objects.filter(pk=stale.pk).update(anomaly_score=99.0)
+
+        call_command('rebuild_baselines', user_ids=[self.user.pk], stdout=StringIO())
+        rescored = Reading.objects.get(pk=stale.pk)
+        self.assertEqual(rescored.anomaly_score, stale.anomaly_score)
+        self.assertGreater(rescored.updated_at, stale.updated_at)
+        self.assertEqual(Reading.objects.get(pk=unchanged.pk).updated_at, unchanged.updated_at)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(READING_BASELINE_HALF_LIFE_DAYS=30)
+    def test_decay_weighs_older_readings_less(self):
+        ReadingBaseline.objects.filter(user=self.user).delete()
+        call_command('rebuild_baselines', stdout=StringIO())
+        now = timezone.now()
+        with synthetic.explicit_reading_timestamps():
+            old = Reading.objects.bulk_create([Reading(
+                user=self.user, systolic=140, diastolic=85, glucose_level=120.0,
+                created_at=now - timedelta(days=30), updated_at=now
+            )])
+        baselines.apply_readings(old)
+        baseline = ReadingBaseline.objects.get(user=self.user)
+        self.assertEqual(baseline.count, 13)
+        self.assertAlmostEqual(baseline.weight, 12.5, places=3)
+
+        Reading.objects.get(pk=old[0].pk).delete()
+        baseline.refresh_from_db()
+        self.assertAlmostEqual(baseline.weight, 12.0, places=3)
+        self.assertAlmostEqual(
+            baseline.systolic_mean,
+            statistics.fmean(Reading.objects.filter(user=self.user).values_list('systolic', flat=True)),
+            places=3
+        )
+
+
+class AlertRuleEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="rules@example.com",
+            password="Str0ng-pass-123"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def reading(self, user=None, systolic=118, diastolic=75, glucose_level=100.0):
+        return Reading.objects.create(
+            user=user or self.user, systolic=systolic, diastolic=diastolic, glucose_level=glucose_level
+        )
+
+    def alerted_ids(self, user=None):
+        return set(Alert.readings.through.objects.filter(alert__user=user or self.user).values_list('reading_id', flat=True))
+
+    def abnormal_ids(self, user=None):
+        return set(Reading.objects.abnormal_readings(user or self.user).values_list('id', flat=True))
+
+    def test_default_rules_match_previous_thresholds(self):
+        flagged = self.reading(glucose_level=12.0)
+        flagged.glucose_unit = 'mmol/L'
+        flagged.save()
+        normal = self.reading(systolic=139, diastolic=89, glucose_level=199.0)
+        high = self.reading(systolic=140)
+        self.assertEqual(self.abnormal_ids(), {flagged.pk, high.pk})
+        self.assertEqual(rules.evaluate([normal, high]), {high.pk: ['High systolic pressure']})
+
+    def test_condition_rules_and_user_overrides(self):
+        AlertRule.objects.create(name="Diabetic glucose", metric='glucose', threshold=180.0, condition='has_diabetes')
+        AlertRule.objects.create(name="Relaxed systolic", metric='systolic', threshold=160.0, user=self.user)
+        diabetic = get_user_model().objects.create_user(
+            email="diabetic@example.com", password="Str0ng-pass-123", has_diabetes=True
+        )
+
+        glucose = self.reading(user=diabetic, glucose_level=190.0)
+        self.assertEqual(self.abnormal_ids(diabetic), {glucose.pk})
+        self.assertEqual(self.alerted_ids(diabetic), {glucose.pk})
+        self.assertIn("Diabetic glucose", Alert.objects.get(user=diabetic).body)
+
+        self.reading(glucose_level=190.0)
+        self.reading(systolic=150)
+        severe = self.reading(systolic=165)
+        self.assertEqual(self.abnormal_ids(), {severe.pk})
+        self.assertEqual(self.alerted_ids(), {severe.pk})
+
+    def test_sustained_rule_agrees_between_alerting_and_query(self):
+        AlertRule.objects.create(name="Sustained systolic", metric='systolic', threshold=130.0, window=5, min_count=3)
+        for systolic in (132, 120, 133, 121):
+            self.reading(systolic=systolic)
+        self.assertEqual(self.alerted_ids(), set())
+        third = self.reading(systolic=134)
+        self.reading(systolic=119)
+
+        self.assertEqual(self.alerted_ids(), {third.pk})
+        self.assertEqual(self.abnormal_ids(), {third.pk})
+        response = self.client.get(reverse('readings-abnormal_readings'))
+        self.assertEqual([item['id'] for item in response.data['results']], [third.pk])
+
+    def test_sustained_rule_pages_forward_and_back(self):
+        AlertRule.objects.create(name="Sustained systolic", metric='systolic', threshold=130.0, window=2, min_count=2)
+        readings = [self.reading(systolic=135) for _ in range(6)]
+        expected = [reading.pk for reading in reversed(readings[1:])]
+        url = reverse('readings-abnormal_readings')
+
+        first = self.client.get(url, {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        third = self.client.get(second['next']).data
+        self.assertEqual(
+            [[item['id'] for item in page['results']] for page in (first, second, third)],
+            [expected[:2], expected[2:4], expected[4:]],
+        )
+        back = self.client.get(second['previous']).data
+        self.assertEqual([item['id'] for item in back['results']], expected[:2])
+
+    def test_batch_evaluation_matches_query(self):
+        AlertRule.objects.create(name="Sustained diastolic", metric='diastolic', threshold=85.0, window=3, min_count=2)
+        self.reading(diastolic=86)
+        response = self.client.post(reverse('readings-bulk_create'), [
+            {"systolic": 125, "diastolic": diastolic, "glucose_level": 100.0} for diastolic in (70, 87, 88, 72, 95)
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        created = Reading.objects.filter(pk__in=[item['id'] for item in response.data['created']])
+        self.assertEqual(set(rules.evaluate(list(created))), self.abnormal_ids())
+        self.assertEqual(self.alerted_ids(), self.abnormal_ids())
+        self.assertEqual(len(self.abnormal_ids()), 3)
+
+    def test_rule_set_is_cached_until_a_rule_changes(self):
+        rule_set = rules.get_rule_set()
+        with self.assertNumQueries(0):
+            self.assertIs(rules.get_rule_set(), rule_set)
+        AlertRule.objects.filter(metric='systolic').get().delete()
+        self.assertIsNot(rules.get_rule_set(), rule_set)
+        self.assertEqual(rules.evaluate([self.reading(systolic=150)]), {})
+
+
+class FeatureStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="features@example.com",
+            password="Str0ng-pass-123",
+            age=52, weight=80.0, height=175.0, has_diabetes=True
+        )
+        now = timezone.now()
+        with synthetic.explicit_reading_timestamps():
+            for systolic, days_ago in ((120, 0), (130, 1), (150, 12)):
+                created_at = now - timedelta(days=days_ago)
+                Reading.objects.create(
+                    user=self.user, systolic=systolic, diastolic=80, glucose_level=100.0,
+                    created_at=created_at, updated_at=created_at
+                )
+
+    def stored(self, user=None):
+        return features.as_dict(UserFeatures.objects.get(user=user or self.user))
+
+    def test_vector_follows_readings_and_profile(self):
+        vector = self.stored()
+        self.assertEqual(vector['systolic_mean_7d'], 125.0)
+        self.assertAlmostEqual(vector['systolic_mean_30d'], 400 / 3)
+        self.assertAlmostEqual(vector['systolic_sd_30d'], statistics.pstdev([120, 130, 150]))
+        self.assertAlmostEqual(vector['readings_per_day_30d'], 3 / 30)
+        self.assertEqual(vector['active_days_30d'], 3.0)
+        self.assertEqual((vector['bmi'], vector['age']), (self.user.calculate_bmi(), 52.0))
+        self.assertEqual((vector['has_diabetes'], vector['has_hypertension']), (1.0, 0.0))
+
+        Reading.objects.get(systolic=150).delete()
+        self.assertEqual(self.stored()['systolic_mean_30d'], 125.0)
+        self.user.weight = 90.0
+        self.user.save(update_fields=['weight'])
+        self.assertEqual(self.stored()['bmi'], self.user.calculate_bmi())
+        self.user.delete()
+        self.assertFalse(UserFeatures.objects.exists())
+
+    def test_user_without_readings_has_nan_reading_features(self):
+        other = get_user_model().objects.create_user(email="new@example.com", password="Str0ng-pass-123")
+        vector = self.stored(other)
+        self.assertIsNone(vector['systolic_mean_30d'])
+        self.assertIsNone(vector['bmi'])
+        self.assertEqual(vector['readings_per_day_30d'], 0.0)
+
+    @skipUnless(features.available(), "numpy is not installed")
+    def test_bulk_read_is_one_contiguous_matrix_without_raw_readings(self):
+        users = synthetic.generate(users=4, readings_per_user=20, days=20, email_prefix='features')
+        user_ids = [user.pk for user in users] + [self.user.pk, 0]
+        with CaptureQueriesContext(connection) as queries:
+            ids, matrix = features.read_matrix(user_ids)
+        self.assertFalse(any('tracker_reading' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(matrix.shape, (6, features.WIDTH))
+        self.assertTrue(matrix.flags['C_CONTIGUOUS'])
+        self.assertEqual(ids.tolist(), user_ids)
+        self.assertEqual(matrix[4].tolist()[:2], [125.0, 80.0])
+        self.assertTrue(all(value != value for value in matrix[5]))
+
+        ids, training = features.read_matrix()
+        self.assertEqual(ids.tolist(), sorted(user_ids[:5]))
+
+    def test_rebuild_matches_incremental_updates(self):
+        synthetic.generate(users=3, readings_per_user=15, days=40, email_prefix='rebuild')
+        before = dict(UserFeatures.objects.values_list('user_id', 'vector'))
+        UserFeatures.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_features', workers=1, chunk_size=2, stdout=out)
+        self.assertIn("Rebuilt features for 4/4 users", out.getvalue())
+        after = dict(UserFeatures.objects.values_list('user_id', 'vector'))
+        self.assertEqual({user_id: bytes(vector) for user_id, vector in after.items()},
+                         {user_id: bytes(vector) for user_id, vector in before.items()})
+
+    def test_online_lookup_recomputes_stale_vectors_from_rollups(self):
+        UserFeatures.objects.filter(user=self.user).update(computed_on=timezone.localdate() - timedelta(days=1))
+        with CaptureQueriesContext(connection) as queries:
+            current = features.get_features(self.user)
+        self.assertFalse(any('tracker_reading"' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(current.computed_on, timezone.localdate())
+        with self.assertNumQueries(1):
+            self.assertEqual(features.get_features(self.user).revision, current.revision)
+
+
+@skipUnless(recommendations.available(), "numpy is not installed")
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendations.results.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="recommend@example.com",
+            password="Str0ng-pass-123",
+            weight=110.0, height=170.0, has_hypertension=True
+        )
+        self.client.force_authenticate(user=self.user)
+        for systolic in (165, 170, 168):
+            Reading.objects.create(user=self.user, systolic=systolic, diastolic=100, glucose_level=95.0)
+
+    def codes(self, response):
+        return [item['code'] for item in response.data['recommendations']]
+
+    def test_recommendations_are_scored_from_features_and_cached(self):
+        url = reverse('users-recommendations')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['model'], f"stand-in-v{features.FEATURE_VERSION}")
+        self.assertIn('review_blood_pressure', self.codes(response))
+        self.assertIn('healthy_weight', self.codes(response))
+        self.assertNotIn('review_glucose', self.codes(response))
+        scores = [item['score'] for item in response.data['recommendations']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        with mock.patch.object(recommendations.LinearModel, 'predict') as predict:
+            self.assertEqual(self.client.get(url).data, response.data)
+        predict.assert_not_called()
+
+    def test_reading_changes_invalidate_cached_recommendations(self):
+        url = reverse('users-recommendations')
+        self.assertIn('review_blood_pressure', self.codes(self.client.get(url)))
+        Reading.objects.filter(user=self.user).delete()
+        for _ in range(3):
+            Reading.objects.create(user=self.user, systolic=115, diastolic=75, glucose_level=95.0)
+        self.assertNotIn('review_blood_pressure', self.codes(self.client.get(url)))
+
+    def test_concurrent_requests_share_one_predict_call(self):
+        np = recommendations.np
+        model = recommendations.stand_in_model()
+        calls = []
+
+        def predict(matrix):
+            calls.append(len(matrix))
+            return model.predict(matrix)
+
+        batcher = recommendations.MicroBatcher(predict, max_batch=8, max_wait=0.2)
+        rows = [np.full(features.WIDTH, float('nan')) for _ in range(5)]
+        futures = [batcher.submit(row) for row in rows]
+        results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(calls, [5])
+        self.assertEqual(np.vstack(results).tolist(), model.predict(np.vstack(rows)).tolist())
+
+    def test_model_artifact_round_trip(self):
+        model = recommendations.stand_in_model()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.npz')
+            model.save(path)
+            loaded = recommendations.LinearModel.load(path)
+        matrix = features.read_matrix([self.user.pk])[1]
+        self.assertEqual(loaded.codes, model.codes)
+        self.assertEqual(loaded.predict(matrix).tolist(), model.predict(matrix).tolist())
+
+    def test_async_view_serves_recommendations(self):
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        response = async_to_sync(AsyncClient().get)(reverse('users-recommendations'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.resolver_match.func.__module__, 'tracker.async_views')
+        # Features and the model change outside the data version: no validators on either path.
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('ETag', self.client.get(reverse('users-recommendations')))
+        self.assertIn('review_blood_pressure', [item['code'] for item in response.json()['recommendations']])
+
+
+class DatasetExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="dataset@example.com",
+            password="Str0ng-pass-123",
+            age=61, has_diabetes=True
+        )
+        self.readings = [
+            Reading.objects.create(user=self.user, systolic=systolic, diastolic=80, glucose_level=100.0)
+            for systolic in (118, 126, 134, 142, 150)
+        ]
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_plan_covers_ids_in_disjoint_ranges(self):
+        ranges = dataset.plan_ranges(timezone.now(), range_size=2)
+        ids = [pk for _, start, end in ranges for pk in range(start, end)]
+        self.assertEqual(ids, sorted({reading.pk for reading in self.readings}))
+        self.assertEqual({alias for alias, _, _ in ranges}, {'default'})
+        self.assertEqual(dataset.plan_ranges(timezone.now(), since=timezone.now()), [])
+
+    def test_pseudonyms_are_stable_per_key(self):
+        self.assertEqual(dataset.pseudonym(self.user.pk, 'one'), dataset.pseudonym(self.user.pk, 'one'))
+        self.assertNotEqual(dataset.pseudonym(self.user.pk, 'one'), dataset.pseudonym(self.user.pk, 'two'))
+        self.assertNotEqual(dataset.pseudonym(self.user.pk, 'one'), dataset.pseudonym(self.user.pk + 1, 'one'))
+
+    def read(self, manifest, key='parts'):
+        return dataset.pa.concat_tables([
+            dataset.pq.read_table(os.path.join(manifest['directory'], part['file'])) for part in manifest[key]
+        ]).to_pylist()
+
+    @skipUnless(dataset.available(), "pyarrow is not installed")
+    @mock.patch.object(dataset, 'WATERMARK_LAG', timedelta(0))
+    def test_full_then_incremental_export(self):
+        manifest = dataset.export(self.directory, user_fields=('age', 'has_diabetes'), pseudonym_key='k',
+                                  range_size=2, chunk_size=1)
+        self.assertEqual((manifest['kind'], manifest['rows'], len(manifest['parts'])), ('full', 5, 3))
+        rows = self.read(manifest)
+        self.assertEqual([row['id'] for row in rows], [reading.pk for reading in self.readings])
+        self.assertEqual({row['user_key'] for row in rows}, {dataset.pseudonym(self.user.pk, 'k')})
+        self.assertEqual((rows[0]['systolic'], rows[0]['age'], rows[0]['has_diabetes']), (118, 61, True))
+        self.assertNotIn('user_id', rows[0])
+
+        changed, deleted_id = self.readings[1], self.readings[2].pk
+        changed.systolic = 160
+        changed.save()
+        self.readings[2].delete()
+        added = Reading.objects.create(user=self.user, systolic=121, diastolic=79, glucose_level=95.0)
+        manifest = dataset.export(self.directory, user_fields=(), incremental=True, chunk_size=1)
+        self.assertEqual(manifest['kind'], 'incremental')
+        self.assertEqual([(row['id'], row['systolic']) for row in self.read(manifest)], [(changed.pk, 160), (added.pk, 121)])
+        self.assertEqual([row['id'] for row in self.read(manifest, 'deletions')], [deleted_id])
+
+    @skipUnless(dataset.available(), "pyarrow is not installed")
+    def test_command_rejects_unsupported_compression(self):
+        with self.assertRaises(CommandError):
+            call_command('export_dataset', self.directory, format='arrow', compression='gzip', workers=1)
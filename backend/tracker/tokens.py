@@ -0,0 +1,197 @@
+"""
+Refresh-token blacklist: fast membership checks and bounded growth.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh inserts
+an OutstandingToken and a BlacklistedToken row. `prune_expired` deletes rows
+whose tokens have expired in small transactions, so the tables only hold about
+one refresh lifetime of tokens.
+
+`membership` keeps an in-process Bloom filter of blacklisted JTIs. A miss means
+the token is definitely not blacklisted and needs no query; only filter hits
+(real blacklisted tokens and rare false positives) reach the database. New
+blacklist entries go into the local filter immediately and are announced
+through a shared-cache head key, which makes other processes pull in the new
+rows with one primary-key range query. The filter is only rebuilt, with a full
+scan, when `prune_expired` bumps the shared generation or the filter is full.
+
+That only holds when every process sees the same cache. With a per-process
+backend (LocMemCache) another worker never hears of a new blacklist entry, so
+no filter is kept and every check is an indexed lookup by JTI.
+JWT_BLACKLIST_SHARED_CACHE overrides the detection from the cache backend.
+"""
+import hashlib
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+HEAD_KEY = 'tracker:jwt-blacklist:head'
+GENERATION_KEY = 'tracker:jwt-blacklist:generation'
+
+# Rows committed slightly out of id order are still picked up by the next sync.
+SYNC_OVERLAP = 100
+MIN_CAPACITY = 1024
+# Backends whose keys other processes cannot see
+LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cache_is_shared():
+    shared = _setting('JWT_BLACKLIST_SHARED_CACHE', None)
+    if shared is None:
+        shared = not isinstance(caches[DEFAULT_CACHE_ALIAS], LOCAL_CACHES)
+    return shared
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistMembership:
+    """Process-local Bloom filter of blacklisted JTIs, kept in sync through the cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._filter = None
+        self._watermark = 0
+        self._head = None
+        self._generation = None
+
+    def _rows(self, min_id=None):
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        if min_id is not None:
+            rows = rows.filter(id__gt=min_id)
+        return rows.order_by('id').values_list('id', 'token__jti').iterator()
+
+    def _rebuild(self, generation, head):
+        known = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).count()
+        bloom = BloomFilter(max(known * 2, MIN_CAPACITY), _setting('JWT_BLACKLIST_FILTER_ERROR_RATE', 0.001))
+        watermark = 0
+        for pk, jti in self._rows():
+            bloom.add(jti)
+            watermark = max(watermark, pk)
+        self._filter, self._watermark = bloom, watermark
+        self._generation, self._head = generation, head
+
+    def _sync(self):
+        shared = cache.get_many([HEAD_KEY, GENERATION_KEY])
+        generation = shared.get(GENERATION_KEY, 0)
+        head = shared.get(HEAD_KEY)
+        if head is None:
+            head = BlacklistedToken.objects.aggregate(head=Max('id'))['head'] or 0
+            cache.add(HEAD_KEY, head, timeout=None)
+
+        with self._lock:
+            stale = (
+                self._filter is None
+                or generation != self._generation
+                or self._filter.count >= self._filter.capacity
+            )
+            if stale:
+                self._rebuild(generation, head)
+            elif head != self._head:
+                for pk, jti in self._rows(min_id=self._watermark - SYNC_OVERLAP):
+                    self._filter.add(jti)
+                    self._watermark = max(self._watermark, pk)
+                self._head = head
+            return self._filter
+
+    def might_contain(self, jti):
+        return jti in self._sync()
+
+    def is_blacklisted(self, jti):
+        # Without a shared cache the filter may miss entries made by other processes.
+        if cache_is_shared() and not self.might_contain(jti):
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def announce(self, blacklisted, jti):
+        """Add a new blacklist row locally now and publish it once its transaction commits."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        transaction.on_commit(lambda: cache.set(HEAD_KEY, blacklisted.pk, timeout=None))
+
+
+membership = BlacklistMembership()
+
+
+class TrackerRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check goes through `membership` first."""
+
+    def check_blacklist(self):
+        if membership.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted, created = super().blacklist()
+        if created:
+            membership.announce(blacklisted, self.payload[api_settings.JTI_CLAIM])
+        return blacklisted, created
+
+
+# -----------------------------
+# Pruning
+# -----------------------------
+def prune_expired(batch_size=1000, cutoff=None):
+    """
+    Delete expired outstanding tokens (and, by cascade, their blacklist rows) in
+    small transactions; return the number of outstanding tokens removed.
+    """
+    cutoff = cutoff or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lt=cutoff)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            total += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+    if total:
+        # Let every process rebuild a smaller filter.
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 1, timeout=None)
+    return total
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, ReadingViewSet, RegisterView
+from .views import UserViewSet, ReadingViewSet, RegisterView, MetricsView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -24,5 +24,8 @@ urlpatterns = [
         path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
         path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
         path('auth/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+
+        # 📈 Performance metrics (staff only)
+        path('metrics/', MetricsView.as_view(), name='metrics'),
     ])),
 ]
@@ -1,11 +1,26 @@
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.views import APIView
 from rest_framework.throttling import AnonRateThrottle
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from django.utils import timezone
-from .models import User, Reading
-from .serializers import UserSerializer, ReadingSerializer, RegisterSerializer
+from django.utils.dateparse import parse_date
+from .models import User, Reading, ReadingRollup
+from .serializers import (
+    UserSerializer, ReadingSerializer, RegisterSerializer, ReadingRollupSerializer, FastReadingSerializer
+)
+from .renderers import CSVRenderer, NDJSONRenderer
+from .conditional import ConditionalGetMixin
+from . import alerts, analytics, baselines, caching, export, features, recommendations, rollups, sharding, sync
+from .instrumentation import histograms
+from .pagination import ReadingCursorPagination
+from .replicas import ReplicaReadMixin
+from .sharding import UserShardMixin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,13 +60,27 @@ class RegisterView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+# -------------------------
+# Metrics View
+# -------------------------
+class MetricsView(APIView):
+    """Per-route request metrics of this worker process in Prometheus text format (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            histograms.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
 # -------------------------
 # User ViewSet
 # -------------------------
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(UserShardMixin, ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    conditional_actions = ('list', 'retrieve', 'summary')
 
     def get_queryset(self):
         return User.objects.filter(id=self.request.user.id)
@@ -62,30 +91,239 @@ class UserViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         instance.delete()
 
+    @action(detail=False, methods=['get'], url_path='me/summary', url_name='summary')
+    def summary(self, request):
+        """Dashboard summary for the current user, served from the cache when possible."""
+        return Response(caching.get_summary(request.user))
+
+    @action(detail=False, methods=['get'], url_path='me/recommendations', url_name='recommendations')
+    def recommendations(self, request):
+        """Recommendations for the current user, scored from their feature vector (see tracker.recommendations)."""
+        return Response(recommendations.get_recommendations(request.user))
+
 # -------------------------
 # Reading ViewSet
 # -------------------------
-class ReadingViewSet(viewsets.ModelViewSet):
+class ReadingViewSet(UserShardMixin, ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ReadingSerializer
     permission_classes = [IsAuthenticated]
+    conditional_actions = ('list', 'retrieve', 'recent_readings', 'abnormal_readings', 'stats')
+    pagination_class = ReadingCursorPagination
+    bulk_max_items = 500  # Upper bound on readings accepted by a single bulk request
 
     def get_queryset(self):
-        return Reading.objects.filter(user=self.request.user).order_by('-created_at')
+        category = self.request.query_params.get('category')
+        if category and self.action == 'list':
+            return Reading.objects.by_category(self.request.user, category)
+        return Reading.objects.for_user(self.request.user).order_by('-created_at')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # post_save handlers (alert outbox, rollups) commit or roll back with the reading.
+        with sharding.atomic():
+            serializer.save(user=self.request.user)
 
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
 
+    def paginated_readings_response(self, queryset):
+        """Paginate and serialize readings, using the .values() fast path when enabled."""
+        if not getattr(settings, 'READING_FAST_SERIALIZER', False):
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        page = self.paginate_queryset(queryset.values(*FastReadingSerializer.values_fields))
+        return self.get_paginated_response(FastReadingSerializer.serialize(page))
+
+    def list(self, request, *args, **kwargs):
+        return self.paginated_readings_response(self.filter_queryset(self.get_queryset()))
+
     @action(detail=False, methods=['get'], url_path='recent', url_name='recent_readings')
     def recent_readings(self, request):
         readings = Reading.objects.recent_readings(user=request.user)
-        serializer = self.get_serializer(readings, many=True)
-        return Response(serializer.data)
+        return self.paginated_readings_response(readings)
 
     @action(detail=False, methods=['get'], url_path='abnormal', url_name='abnormal_readings')
     def abnormal_readings(self, request):
         readings = Reading.objects.abnormal_readings(user=request.user)
-        serializer = self.get_serializer(readings, many=True)
+        return self.paginated_readings_response(readings)
+
+    @action(
+        detail=False, methods=['get'], url_path='all-abnormal', url_name='all_abnormal',
+        permission_classes=[IsAdminUser]
+    )
+    def all_abnormal(self, request):
+        """
+        Staff only: latest abnormal readings across all users (?limit=, default 100),
+        gathered from every shard when sharding is enabled.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), self.bulk_max_items)
+        except ValueError:
+            limit = 100
+        queryset = Reading.objects.filter(is_abnormal=True).order_by('-created_at', 'id')
+        readings = sharding.scatter_gather(queryset, limit=limit)
+        return Response(self.get_serializer(readings, many=True).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk_create')
+    def bulk_create(self, request):
+        """
+        Ingest a batch of readings queued offline by the mobile client.
+        Accepts a list (or {"readings": [...]}), validates every item, inserts the
+        valid ones in a single transaction and reports errors per item index.
+        """
+        items = request.data.get('readings') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Expected a non-empty list of readings."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {"error": f"A bulk request may contain at most {self.bulk_max_items} readings."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        readings, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "errors": {"non_field_errors": ["Expected an object."]}})
+                continue
+            serializer = self.get_serializer(data={**item, 'user': request.user.pk})
+            if serializer.is_valid():
+                readings.append(Reading(**{**serializer.validated_data, 'user': request.user}))
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        if not readings:
+            return Response({"created": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with sharding.atomic():
+            created = Reading.objects.bulk_create(readings)
+            rollups.apply_readings(created)
+            baselines.apply_readings(created)
+            features.refresh_users([request.user])
+            # bulk_create bypasses post_save, so abnormal detection runs once for the batch.
+            alerts.enqueue(request.user, created)
+        caching.invalidate_user(request.user.pk)
+
+        logger.info(f"Bulk created {len(created)} readings for user {request.user.id} ({len(errors)} rejected)")
+        return Response(
+            {
+                "created": self.get_serializer(created, many=True).data,
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['get'], url_path='stats', url_name='reading_stats')
+    def stats(self, request):
+        """
+        Return pre-aggregated trend buckets: ?bucket=day|week&from=YYYY-MM-DD&to=YYYY-MM-DD
+        """
+        bucket = request.query_params.get('bucket', ReadingRollup.BUCKET_DAY)
+        if bucket not in dict(ReadingRollup.BUCKETS):
+            return Response(
+                {"bucket": "Must be one of: day, week."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = ReadingRollup.objects.filter(user=request.user, bucket=bucket)
+        for param, lookup in (('from', 'period_start__gte'), ('to', 'period_start__lte')):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            day = parse_date(value)
+            if day is None:
+                return Response(
+                    {param: "Date must be in YYYY-MM-DD format."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if param == 'from':
+                # Include the ISO week that contains the start date.
+                day = rollups.period_start(bucket, day)
+            queryset = queryset.filter(**{lookup: day})
+
+        serializer = ReadingRollupSerializer(queryset.order_by('period_start'), many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='analytics', url_name='reading_analytics')
+    def analytics(self, request):
+        """
+        Trend analytics over the last ?days= days (default 90) with ?window=-day
+        moving averages (default 7): variability, trend slope, glucose time in
+        range, time-of-day profile and BP category distribution.
+        """
+        if not analytics.available():
+            return Response(
+                {"detail": "Analytics require numpy, which is not installed."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        params = {}
+        for param, default, maximum in (
+            ('days', analytics.DEFAULT_DAYS, analytics.MAX_DAYS),
+            ('window', analytics.DEFAULT_WINDOW, analytics.MAX_WINDOW),
+        ):
+            try:
+                params[param] = int(request.query_params.get(param, default))
+            except ValueError:
+                params[param] = 0
+            if not 1 <= params[param] <= maximum:
+                return Response(
+                    {param: f"Must be a whole number between 1 and {maximum}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return Response(analytics.get_analytics(request.user, **params))
+
+    @action(
+        detail=False, methods=['get'], url_path='export', url_name='export_readings',
+        renderer_classes=[CSVRenderer, NDJSONRenderer]
+    )
+    def export(self, request):
+        """
+        Stream the user's full reading history: ?format=csv (default) or ?format=ndjson.
+        The body is gzip-compressed on the fly when the client accepts it.
+        """
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            content, filename = export.stream_ndjson(request.user), 'readings.ndjson'
+        else:
+            content, filename = export.stream_csv(request.user), 'readings.csv'
+
+        accepts_gzip = export.accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if accepts_gzip:
+            content = compress_sequence(content)
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=f"{request.accepted_renderer.media_type}; charset=utf-8"
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if accepts_gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @action(detail=False, methods=['get'], url_path='changes', url_name='reading_changes')
+    def changes(self, request):
+        """
+        Delta sync: readings created/updated and ids deleted since ?since=<token>.
+        Keep calling with the returned next_token while has_more is true.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE)), settings.SYNC_PAGE_SIZE)
+        except ValueError:
+            limit = settings.SYNC_PAGE_SIZE
+        try:
+            changed, deleted, next_token, has_more = sync.get_changes(
+                request.user, since=request.query_params.get('since') or None, limit=max(limit, 1)
+            )
+        except sync.ExpiredSyncToken as e:
+            return Response({"error": str(e)}, status=status.HTTP_410_GONE)
+        except sync.InvalidSyncToken as e:
+            return Response({"since": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "changed": self.get_serializer(changed, many=True).data,
+            "deleted": deleted,
+            "next_token": next_token,
+            "has_more": has_more,
+        })